@@ -0,0 +1,61 @@
+"""
+Tax analytics over the stored invoices, served from the columnar copy in
+``services.invoiceColumns``. Each request first appends the invoices added
+since the previous one.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from .metrics import stage
+from .services.invoiceColumns import GROUP_KEYS, METRICS, columns
+
+router = APIRouter()
+
+
+def warmup() -> None:
+    """Load the invoices stored so far into columns and run one aggregation"""
+    columns.sync()
+    columns.aggregate(["month", "state"])
+
+
+def _names(value: Optional[str]) -> list:
+    return [name.strip() for name in value.split(",") if name.strip()] if value else []
+
+
+@router.get("/api/analytics/invoices")
+def invoice_analytics(
+    group_by: str = Query("month", description=f"Comma-separated keys: {', '.join(GROUP_KEYS)}"),
+    metrics: Optional[str] = Query(None, description=f"Comma-separated, default all: {', '.join(METRICS)}"),
+    date_from: Optional[str] = Query(None, description="Invoice date from (YYYY-MM-DD, inclusive)"),
+    date_to: Optional[str] = Query(None, description="Invoice date to (YYYY-MM-DD, inclusive)"),
+    seller: Optional[str] = Query(None, description="Seller GSTIN"),
+    buyer: Optional[str] = Query(None, description="Buyer GSTIN"),
+    state: Optional[str] = Query(None, description="Place of supply"),
+    status: Optional[str] = None,
+    hsn: Optional[str] = Query(None, description="HSN code (switches to line items)"),
+    sort: Optional[str] = Query(None, description="Metric to sort groups by, descending"),
+    limit: Optional[int] = Query(None, ge=1, le=100000),
+) -> dict:
+    """
+    Totals per group, e.g. tax by month and place of supply. Grouping or
+    filtering by ``hsn`` totals line items instead of invoices. Each item
+    counts its share of the invoice's amounts.
+    """
+    with stage("analytics"):
+        columns.sync()
+        try:
+            result = columns.aggregate(
+                _names(group_by),
+                _names(metrics) or METRICS,
+                date_from,
+                date_to,
+                {"seller": seller, "buyer": buyer, "state": state, "status": status, "hsn": hsn},
+                sort,
+                limit,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {**result, "invoices": columns.invoices.n}
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import os
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple, Union
+
+from .metrics import Counter, Gauge
+from .services.resultCache import content_hash
+from .uploads import UPLOAD_MAX_BYTES
+
+# Upper bound on OCR processes; requests may ask for fewer but never more.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(os.cpu_count() or 2)))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "5000"))
+
+INVOICE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp", ".pdf")
+
+# Corrupt, truncated, encrypted or unsupported archive members
+_ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError)
+
+# A batch item: (name, file bytes), or (name, the error that made it unreadable)
+BatchItem = Tuple[str, Union[bytes, Exception]]
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+BATCH_IN_FLIGHT = Gauge("ocr_batch_files_in_flight", "Batch files being processed")
+BATCH_FILES = Counter("ocr_batch_files_total", "Batch files finished, by outcome", ("result",))
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Shared OCR process pool, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=BATCH_CONCURRENCY, initializer=_init_worker)
+    return _executor
+
+
+def _init_worker() -> None:
+    from . import pdf_ingest
+
+    # The batch already runs one file per process; page threads would oversubscribe
+    pdf_ingest.PDF_PAGE_WORKERS = 1
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    """Decompress one member, never holding more than ``limit`` + 1 bytes of it"""
+    if info.file_size > limit:
+        raise ValueError(f"{info.file_size} bytes uncompressed, over the {limit}-byte limit")
+    with archive.open(info) as member:
+        # The declared size may lie (zip bombs): read at most one byte past the limit
+        content = member.read(limit + 1)
+    if len(content) > limit:
+        raise ValueError(f"over the {limit}-byte limit uncompressed")
+    return content
+
+
+def iter_zip_images(content: bytes, name: str = "", limit: int = UPLOAD_MAX_BYTES) -> Iterator[BatchItem]:
+    """
+    Yield (name, bytes) for every image or PDF in a ZIP archive, decompressing
+    lazily. A member that is corrupt or larger than ``limit`` uncompressed is
+    yielded with its error instead, and so is the archive itself (as ``name``)
+    when it cannot be opened.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except _ZIP_ERRORS as e:
+        yield name, ValueError(f"Unreadable ZIP archive: {e}")
+        return
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(INVOICE_EXTENSIONS):
+                continue
+            try:
+                yield info.filename, _read_member(archive, info, limit)
+            except (ValueError, *_ZIP_ERRORS) as e:
+                yield info.filename, ValueError(f"Unreadable ZIP member: {e}")
+
+
+def limit_files(items: Iterable[BatchItem]) -> Iterator[BatchItem]:
+    for count, item in enumerate(items):
+        if count >= BATCH_MAX_FILES:
+            raise ValueError(f"Batch exceeds {BATCH_MAX_FILES} files")
+        yield item
+
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+async def stream_batch(
+    items: Iterable[BatchItem],
+    concurrency: int,
+    engine: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    OCR and extract every item across the process pool, yielding one NDJSON
+    line per file in completion order followed by a summary line.
+
+    At most ``concurrency`` files are in flight, so only that many images are
+    held in worker memory regardless of batch size. An item carrying an error
+    (an unreadable ZIP member) gets a failed line without being OCRed.
+    """
+    # The OCR pipeline (Pillow, NumPy, engines) loads on the first batch, not at import
+    from .pipeline import lookup_cached, ocr_extract, store_result
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    source = iter(items)
+    in_flight: dict = {}
+    total = failed = 0
+
+    def lookup(name: str, content: bytes) -> Tuple[str, Optional[dict]]:
+        digest = content_hash(content)
+        return digest, lookup_cached(name, digest, engine)
+
+    async def process(name: str, content: bytes) -> dict:
+        # Hashing and the cache's disk tier run on a thread, off the event loop.
+        digest, result = await loop.run_in_executor(None, lookup, name, content)
+        if result is None:
+            result = await loop.run_in_executor(executor, ocr_extract, name, content, digest, engine)
+            await loop.run_in_executor(None, store_result, result)
+        return result
+
+    def submit_next() -> None:
+        item = next(source, None)
+        if item is None:
+            return
+        name, content = item
+        if isinstance(content, Exception):
+            future = loop.create_future()
+            future.set_result({"filename": name, "ok": False, "error": str(content)})
+        else:
+            future = asyncio.ensure_future(process(name, content))
+        in_flight[future] = name
+        BATCH_IN_FLIGHT.inc()
+
+    try:
+        for _ in range(max(1, concurrency)):
+            submit_next()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                name = in_flight.pop(future)
+                BATCH_IN_FLIGHT.dec()
+                try:
+                    result = future.result()
+                except Exception as e:  # worker crashed (e.g. BrokenProcessPool)
+                    result = {"filename": name, "ok": False, "error": str(e)}
+                BATCH_FILES.inc(("cached" if result.get("cached") else "ok" if result["ok"] else "failed",))
+                total += 1
+                failed += 0 if result["ok"] else 1
+                yield _ndjson(result)
+                submit_next()
+    except ValueError as e:
+        yield _ndjson({"ok": False, "error": str(e)})
+    finally:
+        for future in in_flight:
+            future.cancel()
+        BATCH_IN_FLIGHT.dec(amount=len(in_flight))
+
+    yield _ndjson({"done": True, "count": total, "failed": failed})
@@ -2,10 +2,19 @@ from __future__ import annotations
 
 import csv
 import io
-from typing import Iterable
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Tuple
 
 from .models import Gstr1B2BRow
 
+# Rows per CSV chunk when streaming: large enough to keep per-chunk overhead
+# low, small enough that memory stays flat however long the filing is.
+STREAM_CHUNK_ROWS = 1000
+
+# Longest NDJSON line accepted: a B2B row is a few hundred bytes, so anything
+# near this is not a row and is refused before it is buffered any further.
+NDJSON_MAX_LINE_BYTES = 64 * 1024
+
 
 GSTR1_B2B_HEADERS = [
     "GSTIN/UIN of Recipient",
@@ -24,27 +33,136 @@ GSTR1_B2B_HEADERS = [
 ]
 
 
+def _csv_fields(r: Gstr1B2BRow) -> List:
+    return [
+        r.gstin_uin_of_recipient,
+        r.receiver_name or "",
+        r.invoice_number or "",
+        r.invoice_date or "",
+        r.invoice_value if r.invoice_value is not None else "",
+        r.place_of_supply or "",
+        r.reverse_charge,
+        r.applicable_tax_rate or "",
+        r.invoice_type,
+        r.ecommerce_gstin or "",
+        r.rate if r.rate is not None else "",
+        r.taxable_value if r.taxable_value is not None else "",
+        r.cess_amount,
+    ]
+
+
 def rows_to_gstr1_b2b_csv(rows: Iterable[Gstr1B2BRow]) -> str:
     buf = io.StringIO()
     w = csv.writer(buf, lineterminator="\n")
     w.writerow(GSTR1_B2B_HEADERS)
     for r in rows:
-        w.writerow(
-            [
-                r.gstin_uin_of_recipient,
-                r.receiver_name or "",
-                r.invoice_number or "",
-                r.invoice_date or "",
-                r.invoice_value if r.invoice_value is not None else "",
-                r.place_of_supply or "",
-                r.reverse_charge,
-                r.applicable_tax_rate or "",
-                r.invoice_type,
-                r.ecommerce_gstin or "",
-                r.rate if r.rate is not None else "",
-                r.taxable_value if r.taxable_value is not None else "",
-                r.cess_amount,
-            ]
-        )
+        w.writerow(_csv_fields(r))
     return buf.getvalue()
 
+
+def _chunk_writer() -> Tuple[Any, Callable[[], str]]:
+    """A CSV writer plus a function that takes (and clears) what it has written"""
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+
+    def take() -> str:
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data
+
+    return w, take
+
+
+def iter_gstr1_b2b_csv(rows: Iterable[Gstr1B2BRow], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+    """Yield the CSV header at once, then the rows in chunks of ``chunk_rows``"""
+    w, take = _chunk_writer()
+    w.writerow(GSTR1_B2B_HEADERS)
+    yield take()
+    count = 0
+    for r in rows:
+        w.writerow(_csv_fields(r))
+        count += 1
+        if count % chunk_rows == 0:
+            yield take()
+    tail = take()
+    if tail:
+        yield tail
+
+
+async def iter_ndjson_rows(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = NDJSON_MAX_LINE_BYTES
+) -> AsyncIterator[Gstr1B2BRow]:
+    """
+    Parse and validate one :class:`Gstr1B2BRow` per NDJSON line as the body
+    arrives. Raises ``ValueError`` naming the line number of the first bad row,
+    or of a line longer than ``max_line_bytes``.
+
+    Only each new chunk is split; the unfinished line is kept as a list of
+    pieces, so a long line costs linear time and at most ``max_line_bytes``.
+    """
+    tail: List[bytes] = []
+    tail_len = 0
+    line_no = 0
+    async for chunk in chunks:
+        lines = chunk.split(b"\n")
+        if len(lines) > 1:
+            tail.append(lines[0])
+            lines[0] = b"".join(tail)
+            tail, tail_len = [], 0
+            for line in lines[:-1]:
+                line_no += 1
+                if len(line) > max_line_bytes:
+                    raise _line_too_long(line_no, max_line_bytes)
+                if line.strip():
+                    yield _parse_row(line, line_no)
+        tail.append(lines[-1])
+        tail_len += len(lines[-1])
+        if tail_len > max_line_bytes:
+            raise _line_too_long(line_no + 1, max_line_bytes)
+    pending = b"".join(tail)
+    if pending.strip():
+        yield _parse_row(pending, line_no + 1)
+
+
+def _line_too_long(line_no: int, max_line_bytes: int) -> ValueError:
+    return ValueError(f"Line {line_no} is longer than {max_line_bytes} bytes")
+
+
+def _parse_row(line: bytes, line_no: int) -> Gstr1B2BRow:
+    try:
+        return Gstr1B2BRow.model_validate_json(line)
+    except ValueError as e:  # pydantic.ValidationError is a ValueError
+        raise ValueError(f"Invalid row on line {line_no}: {e}") from None
+
+
+async def stream_gstr1_b2b_csv(rows: AsyncIterable[Gstr1B2BRow], chunk_rows: int = STREAM_CHUNK_ROWS) -> AsyncIterator[str]:
+    """:func:`iter_gstr1_b2b_csv` over rows that arrive asynchronously"""
+    w, take = _chunk_writer()
+    w.writerow(GSTR1_B2B_HEADERS)
+    yield take()
+    count = 0
+    async for r in rows:
+        w.writerow(_csv_fields(r))
+        count += 1
+        if count % chunk_rows == 0:
+            yield take()
+    tail = take()
+    if tail:
+        yield tail
+
+
+async def gzip_stream(chunks: AsyncIterable[str]) -> AsyncIterator[bytes]:
+    """gzip-encode text chunks, flushing each so clients can decode as they go"""
+    gz = zlib.compressobj(wbits=31)  # 31: gzip container
+    async for chunk in chunks:
+        yield gz.compress(chunk.encode("utf-8")) + gz.flush(zlib.Z_SYNC_FLUSH)
+    yield gz.flush()
+
+
+def gzip_iter(chunks: Iterable[str]) -> Iterator[bytes]:
+    """:func:`gzip_stream` for synchronous chunk iterators"""
+    gz = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield gz.compress(chunk.encode("utf-8")) + gz.flush(zlib.Z_SYNC_FLUSH)
+    yield gz.flush()
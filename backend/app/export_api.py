@@ -0,0 +1,149 @@
+"""
+GSTR-1 B2B exports: CSV from posted rows, streamed CSV from NDJSON, and the
+CSV template or portal JSON straight from the invoice store. Also bulk GSTIN
+validation, to check recipients before filing.
+"""
+from __future__ import annotations
+
+import os
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from .csv_export import (
+    gzip_iter,
+    gzip_stream,
+    iter_gstr1_b2b_csv,
+    iter_ndjson_rows,
+    rows_to_gstr1_b2b_csv,
+    stream_gstr1_b2b_csv,
+)
+from .gstin import cache_stats as gstin_cache_stats, check_gstin, check_gstins
+from .gstr1_export import iter_b2b_rows, iter_gstr1_b2b_json, parse_return_period
+from .metrics import stage, timed_aiter, timed_iter
+from .services.invoiceStore import iter_period_invoices
+from .services.mockInvoiceAI import random_invoice
+from .uploads import limit_request_body
+from .models import (
+    ExportGstr1B2BRequest,
+    GstinValidateRequest,
+)
+
+GSTIN_BULK_MAX = int(os.getenv("GSTIN_BULK_MAX", "100000"))
+GSTR1_STREAM_MAX_BYTES = int(os.getenv("GSTR1_STREAM_MAX_BYTES", str(256 * 1024 * 1024)))
+
+router = APIRouter()
+
+
+def warmup() -> None:
+    """Validate and write one row, so the row model and CSV writer are ready"""
+    rows = [row.model_dump() for row in iter_b2b_rows([random_invoice()])]
+    rows_to_gstr1_b2b_csv(ExportGstr1B2BRequest.model_validate({"rows": rows}).rows)
+
+
+@router.post("/api/gstr1/b2b.csv")
+async def export_gstr1_b2b_csv(payload: ExportGstr1B2BRequest) -> Response:
+    with stage("csv_export"):
+        csv_text = rows_to_gstr1_b2b_csv(payload.rows)
+    return Response(
+        content=csv_text,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="gstr1_b2b.csv"'},
+    )
+
+
+@router.post(limit_request_body("/api/gstr1/b2b/stream", GSTR1_STREAM_MAX_BYTES))
+async def stream_gstr1_b2b_export(request: Request, gzip: bool = False):
+    """
+    Stream a GSTR-1 B2B CSV from an NDJSON body (one Gstr1B2BRow per line).
+
+    Rows are validated and written as they arrive, so memory stays flat and
+    the header goes out at once. A bad first row (or an overlong line) is a
+    422; a bad row later on aborts the stream, leaving the client with a
+    truncated download. Bodies over ``GSTR1_STREAM_MAX_BYTES`` are a 413.
+    """
+    rows = iter_ndjson_rows(request.stream())
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def all_rows() -> AsyncIterator:
+        if first is not None:
+            yield first
+            async for row in rows:
+                yield row
+
+    body = timed_aiter("csv_export", stream_gstr1_b2b_csv(all_rows()))
+    headers = {"Content-Disposition": 'attachment; filename="gstr1_b2b.csv"'}
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="text/csv; charset=utf-8", headers=headers)
+
+
+@router.get("/api/gstr1/b2b/export")
+def export_gstr1_b2b(
+    gstin: str = Query(..., description="Supplier GSTIN filing the return"),
+    period: str = Query(..., description="Return period, MMYYYY (e.g. 032026) or YYYY-MM"),
+    format: str = Query("csv", pattern="^(csv|json)$", description="csv template or portal json"),
+    gzip: bool = False,
+):
+    """
+    Export a GSTIN's B2B invoices for a return period straight from the store,
+    as the CSV template or the portal's JSON (grouped per recipient), streamed.
+    Both go into the download's filename, so an invalid GSTIN is a 400.
+    """
+    try:
+        month = parse_return_period(period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    check = check_gstin(gstin)
+    if not check.valid:
+        raise HTTPException(status_code=400, detail=f"Invalid GSTIN {gstin!r}: {'; '.join(check.errors)}")
+    gstin = check.gstin
+
+    invoices = iter_period_invoices(month, seller_gstin=gstin)
+    if format == "json":
+        body = timed_iter("json_export", iter_gstr1_b2b_json(invoices, gstin, month))
+        media_type, filename = "application/json", f"gstr1_b2b_{gstin}_{period}.json"
+    else:
+        body = timed_iter("csv_export", iter_gstr1_b2b_csv(iter_b2b_rows(invoices)))
+        media_type, filename = "text/csv; charset=utf-8", f"gstr1_b2b_{gstin}_{period}.csv"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        body = gzip_iter(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@router.post("/api/gstin/validate")
+def validate_gstins(payload: GstinValidateRequest, invalid_only: bool = False) -> JSONResponse:
+    """
+    Validate up to ``GSTIN_BULK_MAX`` GSTINs. Each one is checked for
+    structure, state code, PAN and check character. Invalid ones get
+    OCR-misread suggestions that pass the checksum. Results keep the request
+    order; ``invalid_only`` leaves out the valid ones (each result carries its
+    ``index``).
+    """
+    if len(payload.gstins) > GSTIN_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {GSTIN_BULK_MAX} GSTINs per request")
+    with stage("gstin_validate"):
+        checks = check_gstins(payload.gstins)
+        results = [
+            {"index": i, **check.to_dict()}
+            for i, check in enumerate(checks)
+            if not (invalid_only and check.valid)
+        ]
+    valid = sum(check.valid for check in checks)
+    # JSONResponse directly: validating tens of thousands of result dicts against a response model is slow
+    return JSONResponse({
+        "count": len(checks),
+        "validCount": valid,
+        "invalidCount": len(checks) - valid,
+        "results": results,
+        "cache": gstin_cache_stats(),
+    })
@@ -1,57 +1,13 @@
 from __future__ import annotations
 
-import re
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
+from .scanner import TextScan, normalize_text, scan_invoice_text  # noqa: F401
+from .vendor_templates import scan_invoice
 
-GSTIN_RE = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z]\d[Z][A-Z0-9]\b")
-
-
-def normalize_text(text: str) -> str:
-    # Normalize common OCR artifacts
-    t = text.replace("₹", "Rs ").replace("INR", "Rs ")
-    t = re.sub(r"[ \t]+", " ", t)
-    return t
-
-
-def extract_gstin(text: str) -> Optional[str]:
-    m = GSTIN_RE.search(text.upper())
-    return m.group(0) if m else None
-
-
-AMOUNT_TOKEN_RE = re.compile(r"(?P<num>\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)")
-
-
-def _parse_amount_token(token: str) -> Optional[float]:
-    try:
-        cleaned = token.replace(",", "")
-        return float(cleaned)
-    except Exception:
-        return None
-
-
-def _best_amount_near_keyword(text: str, keyword_re: re.Pattern[str]) -> Optional[float]:
-    """
-    Find the first plausible amount on the same line (or close) as keyword.
-    """
-    lines = text.splitlines()
-    for i, line in enumerate(lines):
-        if not keyword_re.search(line):
-            continue
-        # Search current line first
-        candidates = [m.group("num") for m in AMOUNT_TOKEN_RE.finditer(line)]
-        # If none, peek next line (some invoices break lines)
-        if not candidates and i + 1 < len(lines):
-            candidates = [m.group("num") for m in AMOUNT_TOKEN_RE.finditer(lines[i + 1])]
-        # Choose the last numeric token (often the amount)
-        if candidates:
-            for tok in reversed(candidates):
-                val = _parse_amount_token(tok)
-                if val is not None and val > 0:
-                    return val
-    return None
-
+# Bump whenever extraction output changes, so cached results are recomputed.
+EXTRACTION_VERSION = "6"
 
 @dataclass
 class Amounts:
@@ -63,42 +19,31 @@ class Amounts:
     invoice_value: Optional[float] = None
 
 
-def extract_amounts(text: str) -> Amounts:
-    t = normalize_text(text)
-    # Common keywords in Indian invoices
-    invoice_value = _best_amount_near_keyword(
-        t,
-        re.compile(r"\b(grand\s*total|invoice\s*value|net\s*amount|total\s*amount|amount\s*payable)\b", re.I),
-    )
-    taxable = _best_amount_near_keyword(t, re.compile(r"\b(taxable\s*value|taxable\s*amount|sub\s*total)\b", re.I))
-    cgst = _best_amount_near_keyword(t, re.compile(r"\bCGST\b", re.I))
-    sgst = _best_amount_near_keyword(t, re.compile(r"\bSGST\b", re.I))
-    igst = _best_amount_near_keyword(t, re.compile(r"\bIGST\b", re.I))
-    total_tax = _best_amount_near_keyword(t, re.compile(r"\b(total\s*tax|gst\s*total|total\s*gst)\b", re.I))
+def _amounts_from_scan(scan: TextScan) -> Amounts:
+    amounts = Amounts(**scan.amounts)
 
     # If total_tax missing but components present
-    if total_tax is None:
-        parts = [x for x in (cgst, sgst, igst) if x is not None]
+    if amounts.total_tax is None:
+        parts = [x for x in (amounts.cgst, amounts.sgst, amounts.igst) if x is not None]
         if parts:
-            total_tax = float(sum(parts))
+            amounts.total_tax = float(sum(parts))
 
-    return Amounts(
-        taxable_value=taxable,
-        cgst=cgst,
-        sgst=sgst,
-        igst=igst,
-        total_tax=total_tax,
-        invoice_value=invoice_value,
-    )
+    return amounts
+
+
+def extract_amounts(text: str) -> Amounts:
+    return _amounts_from_scan(scan_invoice(text))
 
 
 def extract_invoice_fields(raw_text: str) -> Tuple[Optional[str], Amounts, list[str]]:
     warnings: list[str] = []
-    gstin = extract_gstin(raw_text)
+    # One scan of the text feeds every field (the vendor's template, if it has one)
+    scan = scan_invoice(raw_text)
+    gstin = scan.gstin
     if gstin is None:
         warnings.append("GSTIN not found")
 
-    amounts = extract_amounts(raw_text)
+    amounts = _amounts_from_scan(scan)
     if amounts.invoice_value is None:
         warnings.append("Invoice total not found")
     if amounts.taxable_value is None:
@@ -1,4 +1,5 @@
-import re
+from .gstin import check_gstin
+from .vendor_templates import scan_invoice
 
 
 def extract_invoice_data(text: str) -> dict:
@@ -11,52 +12,19 @@ def extract_invoice_data(text: str) -> dict:
     Returns:
         Dictionary containing extracted fields
     """
-    # GSTIN pattern: 2 digits + 5 uppercase letters + 4 digits + 1 uppercase + 1 digit + Z + 1 digit/letter
-    gstin_pattern = r'\d{2}[A-Z]{5}\d{4}[A-Z]\dZ[\dA-Z]'
-    gstin_list = re.findall(gstin_pattern, text)
-    
-    # Invoice number pattern
-    invoice_no_pattern = r'Invoice\s*No[:\-]?\s*(\S+)'
-    invoice_no_match = re.search(invoice_no_pattern, text, re.IGNORECASE)
-    
-    # Total amount pattern - look for various formats
-    total_patterns = [
-        r'Total[\s:]*(?:Amount)?[\s:]*(?:Rs\.?|INR)?[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-        r'Grand\s*Total[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-        r'Amount\s*Payable[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-    ]
-    
-    total_amount = None
-    for pattern in total_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            total_amount = match.group(1).replace(',', '')
-            break
-    
-    # Date extraction
-    date_patterns = [
-        r'(?:Invoice\s*)?Date[\s:]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',
-    ]
-    
-    invoice_date = None
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            invoice_date = match.group(1)
-            break
-    
+    scan = scan_invoice(text)
+
     return {
-        "gstin_found": gstin_list,
-        "invoice_number": invoice_no_match.group(1) if invoice_no_match else None,
-        "invoice_date": invoice_date,
-        "total_amount": total_amount
+        "gstin_found": list(scan.gstins),
+        "invoice_number": scan.invoice_no,
+        "invoice_date": scan.invoice_date,
+        "total_amount": scan.total_amount
     }
 
 
 def validate_gstin(gstin: str) -> bool:
     """
-    Validate GSTIN format.
+    Validate a GSTIN: format, state code, PAN and check character.
     
     Args:
         gstin: GSTIN string to validate
@@ -67,16 +35,7 @@ def validate_gstin(gstin: str) -> bool:
     if not gstin:
         return False
     
-    # Basic length check
-    if len(gstin) != 15:
-        return False
-    
-    # Pattern check: 2 digits + 5 letters + 4 digits + 1 letter + 1 digit + Z + 1 digit/letter
-    pattern = r'^\d{2}[A-Z]{5}\d{4}[A-Z]\dZ[\dA-Z]$'
-    if not re.match(pattern, gstin):
-        return False
-    
-    return True
+    return check_gstin(gstin).valid
 
 
 def validate_invoice_data(data: dict) -> dict:
@@ -95,15 +54,18 @@ def validate_invoice_data(data: dict) -> dict:
         "warnings": []
     }
     
-    # Validate GSTINs
+    # Validate GSTINs (one memoised check each)
     if data.get("gstin_found"):
-        valid_gstins = [g for g in data["gstin_found"] if validate_gstin(g)]
-        invalid_gstins = [g for g in data["gstin_found"] if not validate_gstin(g)]
+        checks = [check_gstin(g) for g in data["gstin_found"]]
+        invalid = [c for c in checks if not c.valid]
         
-        if invalid_gstins:
-            validation_results["warnings"].append(f"Invalid GSTIN format found: {invalid_gstins}")
+        for check in invalid:
+            warning = f"Invalid GSTIN {check.gstin}: {'; '.join(check.errors)}"
+            if check.suggestions:
+                warning += f" (possible OCR misread of {', '.join(check.suggestions)})"
+            validation_results["warnings"].append(warning)
         
-        if not valid_gstins:
+        if len(invalid) == len(checks):
             validation_results["errors"].append("No valid GSTIN found")
             validation_results["is_valid"] = False
     else:
@@ -0,0 +1,182 @@
+"""
+Application factory.
+
+:func:`create_app` builds the API from the routers a deployment enables
+(``APP_ROUTERS``, default all of them):
+
+- ``mock``: simulated extraction, the invoice list and the dashboard
+- ``ocr``: OCR uploads, jobs and batches
+- ``export``: GSTR-1 CSV/JSON exports and bulk GSTIN validation
+- ``analytics``: tax totals grouped by period, state, GSTIN or HSN code
+
+A disabled router is never imported, and the OCR router loads Pillow, NumPy
+and the engines only when it is first used (the analytics router needs NumPy
+at import). Job status, ``/metrics``, ``/health`` and ``/ready`` are always
+on.
+
+After startup, each enabled router's ``warmup()`` runs on a worker thread:
+it loads engine models, compiles patterns and opens the store. ``/health``
+answers right away, for liveness. ``/ready`` returns 503 until warmup has
+finished, then returns the cold-start timings. A failed step keeps the app
+unready and is logged. ``APP_WARMUP=0`` skips warmup, and ``/ready`` then
+turns green at startup.
+"""
+from __future__ import annotations
+
+import time
+
+# Taken before FastAPI and the routers load, so the cold-start time includes them
+IMPORTED_AT = time.perf_counter()
+
+import asyncio  # noqa: E402
+import importlib  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+from types import ModuleType  # noqa: E402
+from typing import Dict, Iterable, Optional, Union  # noqa: E402
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from .jobs import router as jobs_router  # noqa: E402
+from .metrics import Gauge, router as metrics_router  # noqa: E402
+from .telemetry import RequestMiddleware, configure_logging  # noqa: E402
+from .uploads import UploadLimitMiddleware, upload_lifespan  # noqa: E402
+
+# Router name -> module (relative to this package) exposing ``router`` and ``warmup``
+ROUTERS = {"mock": "mock_api", "ocr": "ocr_api", "export": "export_api", "analytics": "analytics_api"}
+
+_DEV_ORIGINS = [
+    f"http://{host}:{port}"
+    for port in (5173, 5174, 5175, 5176, 5177, 5178, 3000)
+    for host in ("localhost", "127.0.0.1")
+]
+
+APP_ROUTERS = os.getenv("APP_ROUTERS", ",".join(ROUTERS))
+APP_WARMUP = os.getenv("APP_WARMUP", "1") != "0"
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", ",".join(_DEV_ORIGINS)).split(",") if o.strip()]
+
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds", "Cold start: boot (imports to startup), each router's warmup, and total", ("phase",)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Warmup progress behind ``/ready``"""
+
+    def __init__(self, routers: Iterable[str]):
+        self.routers = list(routers)
+        self.ready = False
+        self.timings: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = round(seconds * 1000, 1)
+        STARTUP_SECONDS.set(seconds, (phase,))
+
+    def report(self) -> dict:
+        return {"ready": self.ready, "routers": self.routers, "startupMs": self.timings, "failed": self.failed}
+
+
+def _parse_routers(routers: Union[str, Iterable[str], None]) -> list:
+    if routers is None:
+        routers = APP_ROUTERS
+    if isinstance(routers, str):
+        routers = routers.split(",")
+    names = [name.strip() for name in routers if name.strip()]
+    unknown = [name for name in names if name not in ROUTERS]
+    if unknown:
+        raise ValueError(f"Unknown router(s) {', '.join(unknown)}; expected some of {', '.join(ROUTERS)}")
+    return names
+
+
+async def _warm_up(modules: Dict[str, ModuleType], readiness: Readiness) -> None:
+    for name, module in modules.items():
+        warmup = getattr(module, "warmup", None)
+        if warmup is None:
+            continue
+        start = time.perf_counter()
+        try:
+            await run_in_threadpool(warmup)
+        except Exception as e:
+            logger.exception("Warmup failed", extra={"router": name})
+            readiness.failed[name] = f"{type(e).__name__}: {e}"
+        readiness.record(name, time.perf_counter() - start)
+
+    readiness.record("total", time.perf_counter() - IMPORTED_AT)
+    readiness.ready = not readiness.failed
+    logger.info("ready" if readiness.ready else "warmup failed; not ready", extra=readiness.report())
+
+
+def create_app(
+    routers: Union[str, Iterable[str], None] = None,
+    title: str = "Invoice OCR API",
+    warmup: Optional[bool] = None,
+) -> FastAPI:
+    """
+    Build the app with ``routers`` (names from :data:`ROUTERS`, as a list or
+    a comma-separated string; default ``APP_ROUTERS``). ``warmup`` overrides
+    ``APP_WARMUP``.
+    """
+    names = _parse_routers(routers)
+    modules = {name: importlib.import_module(f".{ROUTERS[name]}", __package__) for name in names}
+    readiness = Readiness(names)
+    warm = APP_WARMUP if warmup is None else warmup
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        readiness.record("boot", time.perf_counter() - IMPORTED_AT)
+        if warm:
+            # In the background, so liveness probes pass while models load
+            task = asyncio.create_task(_warm_up(modules, readiness))
+        else:
+            task = None
+            readiness.record("total", time.perf_counter() - IMPORTED_AT)
+            readiness.ready = True
+        try:
+            async with upload_lifespan(app):
+                yield
+        finally:
+            if task is not None:
+                task.cancel()
+
+    configure_logging()
+    app = FastAPI(title=title, version="0.1.0", lifespan=lifespan)
+    app.state.readiness = readiness
+
+    # Inside CORS, so a browser can read its 413s
+    app.add_middleware(UploadLimitMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(RequestMiddleware)
+
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
+    for module in modules.values():
+        app.include_router(module.router)
+
+    @app.get("/")
+    def home():
+        return {"message": "GST AI Backend Running"}
+
+    @app.get("/health")
+    def health() -> dict:
+        """Liveness: the process is up and serving"""
+        return {"ok": True}
+
+    @app.get("/ready")
+    def ready() -> JSONResponse:
+        """Readiness: 200 once warmup has finished, with cold-start timings"""
+        return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+    return app
@@ -0,0 +1,189 @@
+"""
+GSTIN validation.
+
+A GSTIN has 15 characters:
+
+- a two-digit state code
+- the holder's PAN: five letters (the fourth is the holder type), four digits
+  and a letter
+- an entity number (1-9, then A-Z)
+- ``Z``
+- a mod-36 check character over the first 14 characters
+
+:func:`check_gstin` checks all of these and returns a :class:`GstinCheck`.
+Results are memoised in an LRU of ``GSTIN_CACHE_SIZE`` entries, because the
+same vendors come up again and again. An invalid GSTIN gets suggestions made
+by undoing common OCR confusions (0/O, 1/I, 5/S, 8/B, 2/Z). Only positions
+where the swapped character is allowed are tried, and the checksum then
+prunes the candidates, so there are at most a handful.
+
+Text scanners match GSTIN candidates with :data:`CANDIDATE_CHARS`, which
+also allow those confusions, and keep the ones :func:`is_gstin_candidate`
+accepts, so a misread GSTIN still reaches validation and its suggestions.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import re
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from .gstr1_export import STATE_CODES
+
+GSTIN_CACHE_SIZE = int(os.getenv("GSTIN_CACHE_SIZE", "65536"))
+
+GSTIN_CHARS = string.digits + string.ascii_uppercase
+# Fourth PAN character: company, person, HUF, firm, AOP, trust, BOI, local
+# authority, artificial juridical person, government
+PAN_HOLDER_TYPES = "CPHFATBLJG"
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+_DIGITS = string.digits
+_LETTERS = string.ascii_uppercase
+# Allowed characters at each of the 15 positions
+POSITION_CHARS = (
+    _DIGITS, _DIGITS,
+    _LETTERS, _LETTERS, _LETTERS, PAN_HOLDER_TYPES, _LETTERS,
+    _DIGITS, _DIGITS, _DIGITS, _DIGITS,
+    _LETTERS,
+    "123456789" + _LETTERS,
+    "Z",
+    GSTIN_CHARS,
+)
+_STRUCTURE_RE = re.compile("".join(f"[{chars}]" for chars in POSITION_CHARS))
+
+# Characters OCR mistakes for one another
+CONFUSABLE = {"0": "O", "O": "0", "1": "I", "I": "1", "5": "S", "S": "5", "8": "B", "B": "8", "2": "Z", "Z": "2"}
+
+# Characters each position may be read as: the allowed ones (any letter for
+# the PAN holder type, which validation reports on) and their OCR confusions.
+# The state code's first digit is taken as written, so a candidate always
+# starts with a digit.
+CANDIDATE_CHARS = (_DIGITS,) + tuple(
+    "".join(sorted(set(chars) | {CONFUSABLE[ch] for ch in chars if ch in CONFUSABLE}))
+    for chars in POSITION_CHARS[1:5] + (_LETTERS,) + POSITION_CHARS[6:]
+)
+# The shape scanners matched before confusions were allowed; always kept
+_SHAPE_RE = re.compile(f"[{_DIGITS}]{{2}}[{_LETTERS}]{{5}}[{_DIGITS}]{{4}}[{_LETTERS}][{_DIGITS}]Z[{GSTIN_CHARS}]")
+
+# Per-character checksum term for odd and even positions: value * weight, folded base 36
+_TERMS = tuple(
+    {ch: (value * weight) // 36 + (value * weight) % 36 for value, ch in enumerate(GSTIN_CHARS)}
+    for weight in (1, 2)
+)
+
+
+def gstin_check_char(body: str) -> str:
+    """Check character for the first 14 characters of a GSTIN (mod 36)"""
+    odd, even = _TERMS
+    total = 0
+    for i, ch in enumerate(body):
+        total += (even if i & 1 else odd)[ch]
+    return GSTIN_CHARS[-total % 36]
+
+
+@dataclass(frozen=True)
+class GstinCheck:
+    gstin: str  # uppercased, whitespace removed
+    valid: bool
+    state: Optional[str] = None
+    errors: Tuple[str, ...] = ()
+    suggestions: Tuple[str, ...] = ()  # valid GSTINs this may be an OCR misread of
+
+    def to_dict(self) -> dict:
+        return {
+            "gstin": self.gstin,
+            "valid": self.valid,
+            "state": self.state,
+            "errors": list(self.errors),
+            "suggestions": list(self.suggestions),
+        }
+
+
+def _is_valid(gstin: str) -> bool:
+    return (
+        _STRUCTURE_RE.fullmatch(gstin) is not None
+        and gstin[:2] in STATE_NAMES
+        and gstin_check_char(gstin[:14]) == gstin[14]
+    )
+
+
+def _errors(gstin: str) -> List[str]:
+    if len(gstin) != 15:
+        return [f"expected 15 characters, got {len(gstin)}"]
+    errors = []
+    if not gstin[:2].isdigit():
+        errors.append(f"state code {gstin[:2]!r} is not numeric")
+    elif gstin[:2] not in STATE_NAMES:
+        errors.append(f"unknown state code {gstin[:2]}")
+    pan = gstin[2:12]
+    if not re.fullmatch(f"[{_LETTERS}]{{5}}[{_DIGITS}]{{4}}[{_LETTERS}]", pan):
+        errors.append(f"PAN {pan} is not five letters, four digits and a letter")
+    elif pan[3] not in PAN_HOLDER_TYPES:
+        errors.append(f"PAN {pan} has unknown holder type {pan[3]!r}")
+    if gstin[12] not in POSITION_CHARS[12]:
+        errors.append(f"entity number {gstin[12]!r} is not 1-9 or A-Z")
+    if gstin[13] != "Z":
+        errors.append(f"14th character is {gstin[13]!r}, expected 'Z'")
+    if gstin[14] not in GSTIN_CHARS:
+        errors.append(f"check character {gstin[14]!r} is not a digit or letter")
+    elif not errors and gstin_check_char(gstin[:14]) != gstin[14]:
+        errors.append(f"check character is {gstin[14]!r}, expected {gstin_check_char(gstin[:14])!r}")
+    return errors
+
+
+def suggest_corrections(gstin: str) -> Tuple[str, ...]:
+    """Valid GSTINs that differ from ``gstin`` only by OCR-confusable characters"""
+    if len(gstin) != 15:
+        return ()
+    options = []
+    for ch, allowed in zip(gstin, POSITION_CHARS):
+        choices = [c for c in (ch, CONFUSABLE.get(ch)) if c is not None and c in allowed]
+        if not choices:
+            return ()
+        options.append(choices)
+    # Only confusable characters that fit either way branch, so this is a few candidates at most
+    return tuple(
+        candidate
+        for candidate in ("".join(chars) for chars in itertools.product(*options))
+        if candidate != gstin and _is_valid(candidate)
+    )
+
+
+@lru_cache(maxsize=GSTIN_CACHE_SIZE)
+def check_gstin(gstin: str) -> GstinCheck:
+    """Validate structure, state code, PAN and check character of one GSTIN"""
+    normalized = "".join(gstin.split()).upper()
+    if _is_valid(normalized):
+        return GstinCheck(normalized, True, STATE_NAMES[normalized[:2]])
+    return GstinCheck(
+        normalized,
+        False,
+        STATE_NAMES.get(normalized[:2]),
+        tuple(_errors(normalized)),
+        suggest_corrections(normalized),
+    )
+
+
+def is_gstin_candidate(token: str) -> bool:
+    """
+    True if a 15-character token matched with :data:`CANDIDATE_CHARS` is worth
+    reporting: GSTIN-shaped, valid, or an OCR misread of a valid GSTIN
+    """
+    token = token.upper()
+    if _SHAPE_RE.fullmatch(token):
+        return True
+    check = check_gstin(token)
+    return check.valid or bool(check.suggestions)
+
+
+def check_gstins(gstins: Iterable[str]) -> List[GstinCheck]:
+    return [check_gstin(gstin) for gstin in gstins]
+
+
+def cache_stats() -> dict:
+    info = check_gstin.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxSize": info.maxsize}
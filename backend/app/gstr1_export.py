@@ -0,0 +1,190 @@
+"""
+Server-side GSTR-1 B2B export straight from the invoice store.
+
+Maps the store's camelCase invoice records to :class:`Gstr1B2BRow` for the
+CSV template, or to the GST portal's B2B JSON (invoices grouped per recipient
+GSTIN). Both are generators, so a filing streams out without being built in
+memory. Invoices without a buyer GSTIN are B2C supplies and are left out.
+"""
+from __future__ import annotations
+
+import json
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .models import Gstr1B2BRow
+
+# GST state codes, as used in GSTINs and the place-of-supply column.
+STATE_CODES = {
+    "Jammu and Kashmir": "01",
+    "Himachal Pradesh": "02",
+    "Punjab": "03",
+    "Chandigarh": "04",
+    "Uttarakhand": "05",
+    "Haryana": "06",
+    "Delhi": "07",
+    "Rajasthan": "08",
+    "Uttar Pradesh": "09",
+    "Bihar": "10",
+    "Sikkim": "11",
+    "Arunachal Pradesh": "12",
+    "Nagaland": "13",
+    "Manipur": "14",
+    "Mizoram": "15",
+    "Tripura": "16",
+    "Meghalaya": "17",
+    "Assam": "18",
+    "West Bengal": "19",
+    "Jharkhand": "20",
+    "Odisha": "21",
+    "Chhattisgarh": "22",
+    "Madhya Pradesh": "23",
+    "Gujarat": "24",
+    "Dadra and Nagar Haveli and Daman and Diu": "26",
+    "Maharashtra": "27",
+    "Karnataka": "29",
+    "Goa": "30",
+    "Lakshadweep": "31",
+    "Kerala": "32",
+    "Tamil Nadu": "33",
+    "Puducherry": "34",
+    "Andaman and Nicobar Islands": "35",
+    "Telangana": "36",
+    "Andhra Pradesh": "37",
+    "Ladakh": "38",
+    "Other Territory": "97",
+}
+_STATE_BY_CODE = {code: name for name, code in STATE_CODES.items()}
+_STATE_BY_LOWER = {name.lower(): code for name, code in STATE_CODES.items()}
+
+GST_RATES = (0, 0.1, 0.25, 1, 1.5, 3, 5, 6, 7.5, 12, 18, 28)
+
+_MMYYYY_RE = re.compile(r"(0[1-9]|1[0-2])(\d{4})")
+_YYYY_MM_RE = re.compile(r"(\d{4})-(0[1-9]|1[0-2])")
+
+# Pieces buffered per yielded chunk, so a large filing is not thousands of tiny writes
+_JSON_CHUNK_PIECES = 500
+
+
+def parse_return_period(period: str) -> str:
+    """Return period as "YYYY-MM", from the portal's "MMYYYY" or "YYYY-MM" """
+    m = _MMYYYY_RE.fullmatch(period)
+    if m:
+        return f"{m.group(2)}-{m.group(1)}"
+    if _YYYY_MM_RE.fullmatch(period):
+        return period
+    raise ValueError(f"Invalid return period {period!r}: expected MMYYYY or YYYY-MM")
+
+
+def portal_period(period: str) -> str:
+    """"YYYY-MM" as the portal's "MMYYYY" (the ``fp`` field)"""
+    return period[5:7] + period[:4]
+
+
+def state_code(place_of_supply: Optional[str]) -> Optional[str]:
+    """Two-digit state code for a state name, "27", or "27-Maharashtra" """
+    if not place_of_supply:
+        return None
+    code = place_of_supply[:2]
+    if code.isdigit() and code in _STATE_BY_CODE:
+        return code
+    return _STATE_BY_LOWER.get(place_of_supply.strip().lower())
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _rate(invoice: Dict) -> Optional[float]:
+    """Tax rate implied by totals, snapped to the nearest GST slab"""
+    taxable = invoice.get("taxableValue")
+    if not taxable:
+        return None
+    rate = (invoice.get("totalTax") or 0) / taxable * 100
+    nearest = min(GST_RATES, key=lambda r: abs(r - rate))
+    return nearest if abs(nearest - rate) < 0.5 else round(rate, 2)
+
+
+def invoice_to_b2b_row(invoice: Dict) -> Gstr1B2BRow:
+    """Map a stored invoice to one row of the GSTR-1 B2B CSV template"""
+    code = state_code(invoice.get("placeOfSupply"))
+    invoice_date = _parse_date(invoice.get("invoiceDate"))
+    return Gstr1B2BRow(
+        gstin_uin_of_recipient=invoice.get("buyerGSTIN") or "",
+        receiver_name=invoice.get("buyerName"),
+        invoice_number=invoice.get("invoiceNumber"),
+        invoice_date=invoice_date.strftime("%d-%b-%Y") if invoice_date else invoice.get("invoiceDate"),
+        invoice_value=invoice.get("totalAmount"),
+        place_of_supply=f"{code}-{_STATE_BY_CODE[code]}" if code else invoice.get("placeOfSupply"),
+        rate=_rate(invoice),
+        taxable_value=invoice.get("taxableValue"),
+        cess_amount=invoice.get("cess") or 0.0,
+    )
+
+
+def iter_b2b_rows(invoices: Iterable[Dict]) -> Iterator[Gstr1B2BRow]:
+    for invoice in invoices:
+        if invoice.get("buyerGSTIN"):
+            yield invoice_to_b2b_row(invoice)
+
+
+def invoice_to_portal(invoice: Dict) -> Dict:
+    """One entry of a recipient's ``inv`` list in the portal's B2B JSON"""
+    invoice_date = _parse_date(invoice.get("invoiceDate"))
+    rate = _rate(invoice) or 0
+    return {
+        "inum": invoice.get("invoiceNumber"),
+        "idt": invoice_date.strftime("%d-%m-%Y") if invoice_date else invoice.get("invoiceDate"),
+        "val": invoice.get("totalAmount"),
+        "pos": state_code(invoice.get("placeOfSupply")),
+        "rchrg": "N",
+        "inv_typ": "R",
+        "itms": [
+            {
+                "num": int(rate * 100) + 1,
+                "itm_det": {
+                    "txval": invoice.get("taxableValue"),
+                    "rt": rate,
+                    "iamt": invoice.get("igst") or 0,
+                    "camt": invoice.get("cgst") or 0,
+                    "samt": invoice.get("sgst") or 0,
+                    "csamt": invoice.get("cess") or 0,
+                },
+            }
+        ],
+    }
+
+
+def iter_gstr1_b2b_json(invoices: Iterable[Dict], gstin: str, period: str) -> Iterator[str]:
+    """
+    Stream the portal's GSTR-1 JSON with the ``b2b`` section filled in.
+    ``invoices`` must arrive grouped by buyer GSTIN (as
+    ``iter_period_invoices`` returns them).
+    """
+    pieces: List[str] = [f'{{"gstin": {json.dumps(gstin)}, "fp": "{portal_period(period)}", "b2b": [']
+    yield pieces.pop()
+    current = None
+    for invoice in invoices:
+        ctin = invoice.get("buyerGSTIN")
+        if not ctin:
+            continue
+        if ctin != current:
+            opener = f'{{"ctin": {json.dumps(ctin)}, "inv": ['
+            pieces.append(opener if current is None else "]}, " + opener)
+            current = ctin
+        else:
+            pieces.append(", ")
+        pieces.append(json.dumps(invoice_to_portal(invoice)))
+        if len(pieces) >= _JSON_CHUNK_PIECES:
+            yield "".join(pieces)
+            pieces.clear()
+    pieces.append("]}]}" if current is not None else "]}")
+    yield "".join(pieces)
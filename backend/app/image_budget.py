@@ -0,0 +1,121 @@
+"""
+Resolution and memory budgets for OCR input images.
+
+Images are scaled so the page's short side lands near ``OCR_TARGET_SHORT_SIDE``
+(about 300 DPI across an A4 page). Upscaling is capped at ``OCR_MAX_UPSCALE``,
+and every image stays under the hard ceiling of ``OCR_MAX_PIXELS``. JPEGs
+that are larger than needed are decoded straight to grayscale at a reduced
+scale via the decoder's draft mode, so a 48 MP photo never exists at full
+size in memory.
+
+``memory_budget`` keeps concurrent OCR work in this process within
+``OCR_MEMORY_BUDGET_MB``. Each job reserves its estimated working set before
+decoding and waits while others hold the budget.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Tuple, Union
+
+from PIL import Image, ImageOps
+
+OCR_TARGET_SHORT_SIDE = int(os.getenv("OCR_TARGET_SHORT_SIDE", "2480"))
+OCR_MAX_UPSCALE = float(os.getenv("OCR_MAX_UPSCALE", "2"))
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(9_000_000)))
+OCR_MEMORY_BUDGET_MB = int(os.getenv("OCR_MEMORY_BUDGET_MB", "1024"))  # per process, 0 disables
+
+# Working set per output pixel: the grayscale image, the preprocessing
+# pipeline's copies and Tesseract's own buffers
+WORKING_BYTES_PER_PIXEL = 6
+
+
+def settings_fingerprint() -> str:
+    """The settings that change OCR input (part of the OCR cache key)"""
+    return f"budget|{OCR_TARGET_SHORT_SIDE}|{OCR_MAX_UPSCALE}|{OCR_MAX_PIXELS}"
+
+
+def target_size(width: int, height: int) -> Tuple[int, int]:
+    """Size to OCR a ``width`` x ``height`` image at"""
+    scale = min(OCR_MAX_UPSCALE, OCR_TARGET_SHORT_SIDE / max(1, min(width, height)))
+    if width * height * scale * scale > OCR_MAX_PIXELS:
+        scale = math.sqrt(OCR_MAX_PIXELS / (width * height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_image(image: Image.Image) -> Image.Image:
+    """Grayscale ``image`` resized to :func:`target_size`"""
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("RGB")
+    image = image.convert("L")
+    size = target_size(*image.size)
+    if size != image.size:
+        # reducing_gap shrinks by an integer factor first, then resamples
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return image
+
+
+def decode_for_ocr(image: Image.Image) -> Image.Image:
+    """Decode a lazily opened image at no more resolution than OCR will use, upright and grayscale"""
+    if image.format == "JPEG":
+        # The decoder picks the smallest 1/2, 1/4 or 1/8 scale still >= the
+        # target (the scale factor does not depend on EXIF rotation)
+        image.draft("L", target_size(*image.size))
+    image = ImageOps.exif_transpose(image)
+    return fit_image(image)
+
+
+def open_for_ocr(source: Union[str, BinaryIO]) -> Image.Image:
+    """:func:`decode_for_ocr` of an image path or file-like object"""
+    return decode_for_ocr(Image.open(source))
+
+
+def estimate_bytes(image: Image.Image) -> int:
+    """Working set for OCR of an image, from its header alone (conservative for JPEG draft decodes)"""
+    width, height = image.size
+    out_w, out_h = target_size(width, height)
+    return width * height * len(image.getbands()) + out_w * out_h * WORKING_BYTES_PER_PIXEL
+
+
+class MemoryBudget:
+    """Counting semaphore over bytes. A request larger than the whole budget runs alone."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        if self.budget_bytes <= 0:
+            yield
+            return
+        nbytes = min(nbytes, self.budget_bytes)
+        with self._cond:
+            if self.in_use + nbytes > self.budget_bytes:
+                self.waits += 1
+                self._cond.wait_for(lambda: self.in_use + nbytes <= self.budget_bytes)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "budgetBytes": self.budget_bytes,
+                "inUseBytes": self.in_use,
+                "peakBytes": self.peak,
+                "waits": self.waits,
+            }
+
+
+memory_budget = MemoryBudget(OCR_MEMORY_BUDGET_MB * 1024 * 1024)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+from fastapi import APIRouter, HTTPException
+
+from .services.jobQueue import QueueFullError, cancel_job, get_future, get_job, submit_job
+
+router = APIRouter()
+
+
+def enqueue(fn: Callable[..., Any], *args: Any, kind: str = "extract") -> dict:
+    """Submit a job, translating a full queue into a 503."""
+    try:
+        return submit_job(fn, *args, kind=kind)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+async def run_in_job(fn: Callable[..., Any], *args: Any, kind: str = "extract") -> Any:
+    """
+    Run ``fn`` on the job pool and await its result without blocking the loop.
+    If the caller is cancelled (client gone, server shutting down), the job is
+    cancelled too rather than left queued or running with nobody waiting.
+    """
+    job = enqueue(fn, *args, kind=kind)
+    future = get_future(job["id"])
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        cancel_job(job["id"])
+        raise
+
+
+def job_response(job: dict) -> dict:
+    return {**job, "statusUrl": f"/api/jobs/{job['id']}"}
+
+
+@router.get("/api/jobs/{job_id}")
+def job_status(job_id: str) -> dict:
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+
+@router.delete("/api/jobs/{job_id}")
+def job_cancel(job_id: str) -> dict:
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
@@ -0,0 +1,283 @@
+"""
+In-process Prometheus metrics.
+
+Counters, gauges and histograms are plain dicts behind one lock each, so an
+update costs about a microsecond and needs no client library. ``GET /metrics``
+renders them in the Prometheus text format. Values that other modules already
+track (job queue depth, OCR cache counters, the decode memory budget) are read
+when scraped, not on the hot path.
+
+``stage(name)`` times one pipeline stage (upload, decode, preprocess, ocr,
+extract, store, csv_export, ...). It updates the stage histogram, the stage's
+in-flight gauge and its error counter, and it adds to the per-request timings
+that the request log line reports.
+"""
+from __future__ import annotations
+
+import bisect
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .services.jobQueue import queue_stats
+from .services.resultCache import cache_stats
+
+Labels = Tuple[str, ...]
+
+# Seconds; OCR of a large page sits in the upper buckets, regex work in the lowest
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+# Stage name -> milliseconds for the current request; None outside requests
+stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        """(suffix, label values, extra label, value) for every series"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_label_text(self.labelnames, values, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield "", labels, "", value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                yield "_bucket", labels, f'le="{le}"', cumulative
+            yield "_sum", labels, "", total
+            yield "_count", labels, "", cumulative
+
+
+class Collected(_Metric):
+    """A metric whose values are read from ``collect`` at scrape time"""
+
+    def __init__(self, name: str, help: str, kind: str, collect: Callable[[], Iterable[Tuple[Labels, float]]],
+                 labelnames: Labels = ()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        try:
+            values = list(self.collect())
+        except Exception:  # a broken collector must not break the scrape
+            return
+        for labels, value in values:
+            yield "", labels, "", value
+
+
+STAGE_SECONDS = Histogram("invoice_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+STAGE_IN_FLIGHT = Gauge("invoice_stage_in_flight", "Calls currently inside each pipeline stage", ("stage",))
+STAGE_ERRORS = Counter("invoice_stage_errors_total", "Pipeline stage calls that raised", ("stage",))
+
+Collected(
+    "job_queue_depth", "Jobs waiting for a worker (OCR and extraction)", "gauge",
+    lambda: [((), queue_stats()["pending"])],
+)
+Collected(
+    "job_running", "Jobs running on the worker pool", "gauge",
+    lambda: [((), queue_stats()["running"])],
+)
+Collected(
+    "ocr_cache_events_total", "OCR result cache lookups and writes", "counter",
+    lambda: [((event,), value) for event, value in cache_stats().items()
+             if event in ("memoryHits", "diskHits", "misses", "stores", "evictions")],
+    ("event",),
+)
+
+
+def _memory_budget_in_use():
+    # image_budget pulls in Pillow; deployments without OCR never load it
+    image_budget = sys.modules.get(f"{__package__}.image_budget")
+    return [((), image_budget.memory_budget.stats()["inUseBytes"])] if image_budget else []
+
+
+Collected(
+    "ocr_memory_budget_bytes", "Decode memory budget reserved by OCR jobs in this process", "gauge",
+    _memory_budget_in_use,
+)
+
+
+def _record(name: str, elapsed: float) -> None:
+    STAGE_SECONDS.observe(elapsed, (name,))
+    timings = stage_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 3)
+
+
+class _Stage:
+    # A class, not @contextmanager: this sits on the hot path of every request
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.labels = (name,)
+
+    def __enter__(self) -> None:
+        STAGE_IN_FLIGHT.inc(self.labels)
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self.start
+        STAGE_IN_FLIGHT.dec(self.labels)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.labels)
+        _record(self.name, elapsed)
+
+
+def stage(name: str) -> _Stage:
+    """Time the enclosed ``with`` block as pipeline stage ``name``"""
+    return _Stage(name)
+
+
+def timed_iter(name: str, chunks: Iterable) -> Iterator:
+    """
+    Yield from ``chunks``, timing only the work of producing them (not the
+    time the consumer spends sending them) as stage ``name``.
+    """
+    labels = (name,)
+    iterator = iter(chunks)
+    busy = 0.0
+    STAGE_IN_FLIGHT.inc(labels)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                busy += time.perf_counter() - start
+                break
+            except BaseException:
+                STAGE_ERRORS.inc(labels)
+                raise
+            busy += time.perf_counter() - start
+            yield chunk
+    finally:
+        STAGE_IN_FLIGHT.dec(labels)
+        _record(name, busy)
+
+
+async def timed_aiter(name: str, chunks: AsyncIterable) -> AsyncIterator:
+    """:func:`timed_iter` for async iterables (time spent awaiting input counts too)"""
+    labels = (name,)
+    iterator = chunks.__aiter__()
+    busy = 0.0
+    STAGE_IN_FLIGHT.inc(labels)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                busy += time.perf_counter() - start
+                break
+            except BaseException:
+                STAGE_ERRORS.inc(labels)
+                raise
+            busy += time.perf_counter() - start
+            yield chunk
+    finally:
+        STAGE_IN_FLIGHT.dec(labels)
+        _record(name, busy)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Every metric in the Prometheus text exposition format"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
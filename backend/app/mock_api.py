@@ -0,0 +1,198 @@
+"""
+Simulated extraction and the invoice store it fills: the invoice list, the
+dashboard and its live feed.
+"""
+from __future__ import annotations
+
+import datetime
+import hashlib
+import os
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, File, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from .jobs import enqueue, job_response, run_in_job
+from .metrics import Gauge, stage
+from .services.invoiceFeed import encode_event, feed
+from .services.mockInvoiceAI import process_invoice_mock
+from .services.invoiceStore import (
+    add_invoice,
+    get_breakdowns,
+    get_stats,
+    query_invoices,
+    store_version,
+)
+from .uploads import IMAGE_TYPES, PDF_TYPES, UPLOAD_MAX_BYTES, SpooledUpload, limit_request_body, spool_upload
+
+MOCK_UPLOAD_TYPES = IMAGE_TYPES | PDF_TYPES
+# Seconds between keepalive comments on an idle feed, so proxies keep it open
+FEED_HEARTBEAT = float(os.getenv("FEED_HEARTBEAT", "15"))
+
+FEED_CLIENTS = Gauge("invoice_feed_clients", "Open /api/invoices/events streams")
+
+router = APIRouter()
+
+
+def warmup() -> None:
+    """Open the invoice store and build its stats once"""
+    get_stats()
+    get_breakdowns()
+
+
+def _extract_and_store(upload: SpooledUpload) -> dict:
+    """Blocking extraction pipeline, run on the job pool."""
+    # The upload is already saved under its content hash by spool_upload
+
+    # Use mock AI extraction (simulated while OCR is being trained)
+    with stage("mock_extract"):
+        extracted_data = process_invoice_mock(upload.filename)
+
+    # Save to storage
+    with stage("store"):
+        return add_invoice(extracted_data)
+
+
+@router.post(limit_request_body("/api/invoices/extract", UPLOAD_MAX_BYTES))
+async def extract_invoice(file: UploadFile = File(...)):
+    """
+    Upload an invoice and extract data using simulated AI.
+    For demo: Uses mock extractor while OCR model is being trained.
+    """
+    upload = await spool_upload(file, MOCK_UPLOAD_TYPES)
+    saved_invoice = await run_in_job(_extract_and_store, upload)
+
+    return {
+        "message": "AI extracted successfully",
+        "data": saved_invoice
+    }
+
+
+@router.post(limit_request_body("/api/jobs/extract", UPLOAD_MAX_BYTES), status_code=202)
+async def submit_extract_job(file: UploadFile = File(...)):
+    """Queue an invoice for extraction; poll `GET /api/jobs/{id}` for the result"""
+    upload = await spool_upload(file, MOCK_UPLOAD_TYPES)
+    return job_response(enqueue(_extract_and_store, upload))
+
+
+def _project(invoice: dict, fields: Optional[set]) -> dict:
+    if fields is None:
+        return invoice
+    return {k: v for k, v in invoice.items() if k == "_id" or k in fields}
+
+
+def _iso_date(value: Optional[str], name: str) -> Optional[str]:
+    """A YYYY-MM-DD query parameter, checked so a typo is a 400 rather than an empty page"""
+    if value is None:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} {value!r}: expected YYYY-MM-DD") from None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak If-None-Match comparison: ``*``, or any listed tag with the same opaque value"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+@router.get("/api/invoices")
+def list_invoices(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for every match"),
+    cursor: Optional[str] = Query(None, description="`nextCursor` from the previous page"),
+    gstin: Optional[str] = Query(None, description="Seller or buyer GSTIN"),
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="Invoice date from (YYYY-MM-DD, inclusive)"),
+    date_to: Optional[str] = Query(None, description="Invoice date to (YYYY-MM-DD, inclusive)"),
+    place_of_supply: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. invoiceNumber,totalAmount"),
+):
+    """Get extracted invoices newest first, optionally filtered and paginated"""
+    date_from, date_to = _iso_date(date_from, "date_from"), _iso_date(date_to, "date_to")
+    # Same store version + same query = same body, so the ETag is known
+    # before touching any invoice.
+    etag = 'W/"%s"' % hashlib.sha1(f"{store_version()}?{request.url.query}".encode()).hexdigest()[:20]
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        page, next_cursor = query_invoices(
+            limit, cursor, gstin, status, date_from, date_to, place_of_supply
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    wanted = {f.strip() for f in fields.split(",") if f.strip()} if fields else None
+
+    return JSONResponse(
+        {
+            "invoices": [_project(inv, wanted) for inv in page],
+            "nextCursor": next_cursor,
+            "stats": get_stats()
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/api/dashboard/stats")
+async def dashboard_stats():
+    """Get dashboard statistics"""
+    return get_stats()
+
+
+@router.get("/api/dashboard/breakdowns")
+async def dashboard_breakdowns():
+    """Get totals by return period (month), place of supply and status"""
+    return get_breakdowns()
+
+
+@router.get("/api/invoices/events")
+async def invoice_events(
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource on reconnect"),
+    since: Optional[int] = Query(None, ge=0, description="Resume after this event id (for clients that can't set headers)"),
+):
+    """
+    Server-Sent Events: one ``invoice`` event per new invoice, carrying the
+    invoice and the dashboard stats fields it changed.
+
+    A fresh connection starts with ``ready`` (the full stats). Then it gets
+    only new events, so load ``GET /api/invoices`` after ``ready``. On
+    reconnect, only the events the client missed are replayed. ``reset``
+    (full stats again) means the client missed more than the server keeps, or
+    the store was cleared, and should reload the list.
+    """
+    cursor = since
+    if last_event_id is not None and last_event_id.isdigit():
+        cursor = int(last_event_id)
+
+    async def events() -> AsyncIterator[bytes]:
+        nonlocal cursor
+        FEED_CLIENTS.inc()
+        try:
+            yield b"retry: 3000\n\n"
+            if cursor is None:
+                cursor = feed.last_id
+                yield encode_event("ready", {"stats": get_stats()}, cursor)
+            while True:
+                missed = feed.since(cursor)
+                if missed is None:
+                    cursor = feed.last_id
+                    yield encode_event("reset", {"stats": get_stats()}, cursor)
+                elif missed:
+                    cursor = missed[-1][0]
+                    yield b"".join(message for _, message in missed)
+                elif not await feed.wait(cursor, FEED_HEARTBEAT):
+                    yield b": keepalive\n\n"
+        finally:
+            FEED_CLIENTS.dec()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -14,13 +14,26 @@ class MoneyBreakdown(BaseModel):
     invoice_value: Optional[float] = None
 
 
+class LineItem(BaseModel):
+    description: Optional[str] = None
+    hsn: Optional[str] = None
+    quantity: Optional[float] = None
+    rate: Optional[float] = None
+    amount: float
+    confidence: Optional[float] = None  # lowest word confidence in the row, 0-100
+    page: int = 1
+    box: List[int] = Field(default_factory=list)  # left, top, right, bottom in page pixels
+
+
 class InvoiceExtraction(BaseModel):
     gstin: Optional[str] = None
     invoice_no: Optional[str] = None
     invoice_date: Optional[str] = None  # keep as string for now (OCR is messy)
     money: MoneyBreakdown = Field(default_factory=MoneyBreakdown)
 
-    ocr_confidence: Optional[float] = None
+    ocr_confidence: Optional[float] = None  # mean word confidence, 0-100
+    field_confidence: Dict[str, float] = Field(default_factory=dict)  # lowest word confidence per field
+    line_items: List[LineItem] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
     raw_text: str
 
@@ -48,3 +61,7 @@ class Gstr1B2BRow(BaseModel):
 class ExportGstr1B2BRequest(BaseModel):
     rows: List[Gstr1B2BRow]
 
+
+
+class GstinValidateRequest(BaseModel):
+    gstins: List[str]
@@ -0,0 +1,180 @@
+"""
+OCR routes: single uploads, queued jobs and streamed batches.
+
+Pillow, NumPy and the OCR engines load on the first OCR request or in
+:func:`warmup`, not when this module is imported. That way, enabling the
+router costs nothing at import time.
+"""
+from __future__ import annotations
+
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from .batch import BATCH_CONCURRENCY, iter_zip_images, limit_files, stream_batch
+from .extractor import extract_invoice_data, validate_invoice_data
+from .jobs import enqueue, job_response, run_in_job
+from .metrics import stage
+from .services.resultCache import cache_stats
+from .telemetry import request_id
+from .uploads import (
+    IMAGE_TYPES,
+    PDF_TYPES,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_ZIP_MAX_BYTES,
+    ZIP_TYPES,
+    SpooledUpload,
+    limit_request_body,
+    spool_upload,
+)
+from .vendor_templates import registry as template_registry
+
+INVOICE_TYPES = IMAGE_TYPES | PDF_TYPES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Touches every field pattern once, so regex compilation happens at startup
+WARMUP_TEXT = (
+    "TAX INVOICE\nGSTIN: 27ABCPE1234F1ZB\nInvoice No: INV-1  Date: 01/04/2026\n"
+    "Taxable Value 100.00\nCGST 9.00\nSGST 9.00\nTotal Amount 118.00"
+)
+
+
+def warmup() -> None:
+    """Import the OCR pipeline, load the default engine's models and compile the field patterns"""
+    from . import pipeline  # noqa: F401  (Pillow, NumPy and the engines behind it)
+    from .extract import extract_invoice_fields
+    from .ocr_backends import get_engine
+
+    get_engine().warmup()
+    extract_invoice_fields(WARMUP_TEXT)
+    validate_invoice_data(extract_invoice_data(WARMUP_TEXT))
+
+
+def _ocr_invoice(upload: SpooledUpload, engine: Optional[str] = None) -> dict:
+    """Blocking OCR pipeline, run on the job pool."""
+    from .pipeline import cached_ocr_extract
+
+    # Extract raw text using OCR from the in-memory upload (skipped when this
+    # exact file was seen before)
+    result = cached_ocr_extract(upload.filename, upload.content, upload.digest, engine)
+    if not result["ok"]:
+        raise RuntimeError(result["error"])
+    extraction = result["extraction"]
+    extracted_text = extraction["raw_text"]
+
+    with stage("extract"):
+        # Extract structured GST invoice data
+        invoice_data = extract_invoice_data(extracted_text)
+
+        # Validate the extracted data
+        validation = validate_invoice_data(invoice_data)
+
+    return {
+        "raw_text": extracted_text,
+        "extracted_data": invoice_data,
+        "validation": validation,
+        "ocr_confidence": extraction.get("ocr_confidence"),
+        "field_confidence": extraction.get("field_confidence", {}),
+        "line_items": extraction.get("line_items", []),
+        "engine": result.get("engine"),
+        "cached": result.get("cached", False),
+        "pages": result.get("pages", []),
+    }
+
+
+@router.get("/api/cache/stats")
+def ocr_cache_stats() -> dict:
+    """OCR result cache hit/miss counters"""
+    return cache_stats()
+
+
+@router.get("/api/templates")
+def list_vendor_templates() -> dict:
+    """Loaded vendor templates, files that failed to load, and the registry version"""
+    template_registry.refresh()
+    return template_registry.stats()
+
+
+@router.post("/api/templates/reload")
+def reload_vendor_templates() -> dict:
+    """Re-read the vendor template directory now, without waiting for the change check"""
+    return template_registry.reload()
+
+
+@router.get("/api/ocr/engines")
+def ocr_engines() -> dict:
+    """OCR engines installed in this deployment, and the default"""
+    from .ocr_backends import OCR_ENGINE, available_engines
+
+    return {"default": OCR_ENGINE, "available": available_engines()}
+
+
+def _check_engine(engine: Optional[str]) -> None:
+    from .ocr_backends import available_engines
+
+    if engine and engine not in available_engines():
+        raise HTTPException(status_code=400, detail=f"OCR engine {engine!r} is not installed on this server")
+
+
+@router.post(limit_request_body("/upload-invoice/", UPLOAD_MAX_BYTES))
+async def upload_invoice(
+    file: UploadFile = File(...),
+    engine: Optional[str] = Query(None, description="OCR engine, e.g. tesseract or rapidocr"),
+):
+    """Upload an invoice image or PDF and extract GST data using OCR."""
+    try:
+        _check_engine(engine)
+        upload = await spool_upload(file, INVOICE_TYPES)
+        return await run_in_job(_ocr_invoice, upload, engine, kind="ocr")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("OCR upload failed", extra={"upload": file.filename})
+        return {
+            "error": str(e),
+            "requestId": request_id.get(),
+        }
+
+
+@router.post(limit_request_body("/api/jobs/upload-invoice", UPLOAD_MAX_BYTES), status_code=202)
+async def submit_upload_job(
+    file: UploadFile = File(...),
+    engine: Optional[str] = Query(None, description="OCR engine, e.g. tesseract or rapidocr"),
+):
+    """Queue an invoice image for OCR; poll `GET /api/jobs/{id}` for the result"""
+    _check_engine(engine)
+    upload = await spool_upload(file, INVOICE_TYPES)
+    return job_response(enqueue(_ocr_invoice, upload, engine, kind="ocr"))
+
+
+# A batch of loose files gets the same budget as one ZIP of them
+@router.post(limit_request_body("/api/invoices/batch", max(UPLOAD_MAX_BYTES, UPLOAD_ZIP_MAX_BYTES)))
+async def extract_invoice_batch(
+    files: List[UploadFile] = File(...),
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=BATCH_CONCURRENCY),
+    engine: Optional[str] = Query(None, description="OCR engine, e.g. tesseract or rapidocr"),
+):
+    """
+    OCR many invoice images (or a single ZIP of images) in parallel.
+    Results stream back as NDJSON, one line per file in completion order.
+    """
+    _check_engine(engine)
+    uploads = [await spool_upload(f, INVOICE_TYPES | ZIP_TYPES) for f in files]
+
+    def items():
+        for upload in uploads:
+            if upload.content_type in ZIP_TYPES:
+                yield from iter_zip_images(upload.content, upload.filename)
+            else:
+                yield upload.filename, upload.content
+
+    return StreamingResponse(
+        stream_batch(limit_files(items()), concurrency, engine),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,465 @@
+"""
+Pluggable OCR engines.
+
+Every engine turns a page image into an :class:`OcrResult` in one
+recognition: the text, plus the recognised words with their boxes, line and
+block ids and confidences, held in arrays (:class:`OcrWords`). ``OCR_ENGINE`` picks
+the default, and callers may name another one per request.
+
+- ``tesseract``: the persistent tesserocr pool when installed, otherwise
+  pytesseract. The binary comes from ``TESSERACT_CMD`` or ``PATH``.
+- ``rapidocr``: RapidOCR models on ONNX Runtime (CPU), loaded once per
+  process. Concurrent requests are micro-batched: requests that arrive within
+  ``OCR_BATCH_WINDOW_MS`` of each other share one batch. Detection runs per
+  page and recognition runs once over the text crops of every page in the batch.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from .ocr_pool import get_pool
+
+try:  # optional: ONNX Runtime OCR models
+    from rapidocr_onnxruntime import RapidOCR
+except ImportError:  # pragma: no cover - depends on the deployment
+    RapidOCR = None
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "tesseract")
+OCR_BATCH_WINDOW_MS = float(os.getenv("OCR_BATCH_WINDOW_MS", "10"))
+OCR_BATCH_MAX = int(os.getenv("OCR_BATCH_MAX", "8"))
+OCR_BATCH_TIMEOUT = float(os.getenv("OCR_BATCH_TIMEOUT", "120"))  # seconds a request waits for its batch
+
+# Tesseract configuration for better invoice OCR
+TESSERACT_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,:/-@%&() '
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+_WINDOWS_TESSERACT = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+# Use the in-process engine pool (tesserocr) when available; set to 0 to force
+# the pytesseract subprocess path.
+USE_ENGINE_POOL = os.getenv("OCR_ENGINE_POOL", "1") != "0"
+
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+elif os.name == "nt" and not shutil.which("tesseract") and os.path.exists(_WINDOWS_TESSERACT):
+    # The default installer does not add itself to PATH
+    pytesseract.pytesseract.tesseract_cmd = _WINDOWS_TESSERACT
+
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom
+
+
+WordLine = Tuple[int, Sequence[Tuple[str, Box, float]]]  # block id, then (word, box, confidence) per word
+
+
+def _ints(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.int32)
+
+
+@dataclass
+class OcrWords:
+    """
+    Recognised words as parallel arrays, one entry per word in reading order
+    (about 40 bytes a word, where a list of word objects costs several
+    hundred). ``start``/``end`` are offsets into :attr:`OcrResult.text`, so
+    a match in the text maps back to its words.
+    """
+
+    start: np.ndarray  # int32
+    end: np.ndarray  # int32
+    boxes: np.ndarray  # (n, 4) int32: left, top, right, bottom in page pixels
+    conf: np.ndarray  # float32, 0-100
+    line: np.ndarray  # int32, numbered through the document
+    block: np.ndarray  # int32
+    page: np.ndarray  # int32, 0-based
+
+    @classmethod
+    def empty(cls) -> "OcrWords":
+        none = _ints([])
+        return cls(none, none, none.reshape(0, 4), np.zeros(0, np.float32), none, none, none)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def shifted(self, chars: int = 0, lines: int = 0, blocks: int = 0, page: Optional[int] = None,
+                offsets: Any = 0) -> "OcrWords":
+        """Copy placed after ``chars`` characters, ``lines`` lines and ``blocks`` blocks, boxes moved by ``offsets``"""
+        return OcrWords(
+            self.start + chars,
+            self.end + chars,
+            (self.boxes + np.asarray(offsets, dtype=np.int32)).astype(np.int32),
+            self.conf,
+            self.line + lines,
+            self.block + blocks,
+            self.page if page is None else np.full(len(self), page, np.int32),
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["OcrWords"]) -> "OcrWords":
+        if not parts:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(p, name) for p in parts]) for name in
+                     ("start", "end", "boxes", "conf", "line", "block", "page")))
+
+
+@dataclass
+class OcrResult:
+    text: str
+    words: OcrWords = field(default_factory=OcrWords.empty)
+    engine: str = ""
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[WordLine], engine: str = "") -> "OcrResult":
+        """
+        Build the text (words joined by spaces, lines by newlines) and the word
+        arrays together, so offsets always match. Empty lines are dropped and
+        block ids renumbered from 0.
+        """
+        texts: List[str] = []
+        start: List[int] = []
+        end: List[int] = []
+        boxes: List[Box] = []
+        conf: List[float] = []
+        line_ids: List[int] = []
+        block_ids: List[int] = []
+        blocks: Dict[int, int] = {}
+        offset = 0
+        for block, words in lines:
+            if not words:
+                continue
+            block = blocks.setdefault(block, len(blocks))
+            for text, box, confidence in words:
+                start.append(offset)
+                end.append(offset + len(text))
+                offset += len(text) + 1
+                boxes.append(box)
+                conf.append(confidence)
+                line_ids.append(len(texts))
+                block_ids.append(block)
+            texts.append(" ".join(text for text, _, _ in words))
+        words = OcrWords(
+            _ints(start),
+            _ints(end),
+            _ints(boxes).reshape(-1, 4),
+            np.asarray(conf, dtype=np.float32),
+            _ints(line_ids),
+            _ints(block_ids),
+            np.zeros(len(start), np.int32),
+        )
+        return cls("\n".join(texts), words, engine)
+
+    @property
+    def confidence(self) -> Optional[float]:
+        """Mean word confidence, weighted by word length"""
+        weight = self.words.end - self.words.start
+        if not weight.sum():
+            return None
+        return float(np.average(self.words.conf, weights=weight))
+
+    def span_confidence(self, start: int, end: int) -> Optional[float]:
+        """Lowest confidence of the words overlapping ``text[start:end]``, or None without words"""
+        hit = (self.words.start < end) & (self.words.end > start)
+        return float(self.words.conf[hit].min()) if hit.any() else None
+
+    def word_texts(self) -> List[str]:
+        return [self.text[s:e] for s, e in zip(self.words.start.tolist(), self.words.end.tolist())]
+
+    def shifted(self, offsets: Any) -> "OcrResult":
+        """The same result with word boxes moved by ``offsets`` ((dx, dy, dx, dy), or one row per word)"""
+        return OcrResult(self.text, self.words.shifted(offsets=offsets), self.engine)
+
+    @classmethod
+    def join(cls, parts: Sequence["OcrResult"], pages: Optional[Sequence[int]] = None) -> "OcrResult":
+        """
+        Concatenate results, as the texts joined by newlines. Line and block
+        ids continue from one part to the next. ``pages`` gives each part's
+        page index; without it words keep their page.
+        """
+        texts: List[str] = []
+        words: List[OcrWords] = []
+        chars = lines = blocks = 0
+        for i, part in enumerate(parts):
+            if not part.text:
+                continue
+            if len(part.words):
+                words.append(part.words.shifted(chars, lines, blocks, None if pages is None else pages[i]))
+                lines += int(part.words.line.max()) + 1
+                blocks += int(part.words.block.max()) + 1
+            texts.append(part.text)
+            chars += len(part.text) + 1
+        engine = next((p.engine for p in parts if p.engine), "")
+        return cls("\n".join(texts), OcrWords.concat(words), engine)
+
+
+class OcrEngine:
+    """An OCR backend. Subclasses implement :meth:`recognize`."""
+
+    name = ""
+    # Whether the engine wants the binarised output of the preprocessing
+    # pipeline, or just the upright grayscale page
+    binarize = True
+
+    @classmethod
+    def version(cls) -> str:
+        """The settings that change this engine's output (part of the OCR cache key)"""
+        raise NotImplementedError
+
+    def recognize(self, image: Image.Image) -> OcrResult:
+        raise NotImplementedError
+
+    def recognize_text(self, image: Image.Image) -> str:
+        return self.recognize(image).text
+
+    def warmup(self) -> None:
+        """Load models ahead of the first request"""
+        self.recognize(Image.new("L", (64, 32), 255))
+
+
+def recognize(image: Image.Image, use_pool: bool = USE_ENGINE_POOL) -> str:
+    """Run Tesseract on a preprocessed image, preferring the persistent engine pool."""
+    pool = get_pool(TESSERACT_CONFIG) if use_pool else None
+    if pool is not None:
+        return pool.recognize(image)
+    return pytesseract.image_to_string(
+        image,
+        lang='eng',
+        config=TESSERACT_CONFIG
+    )
+
+
+class TesseractEngine(OcrEngine):
+    name = "tesseract"
+
+    @classmethod
+    def version(cls) -> str:
+        return f"tesseract|eng|{TESSERACT_CONFIG}"
+
+    def recognize_text(self, image: Image.Image) -> str:
+        # Text alone skips the word iteration
+        return recognize(image)
+
+    def recognize(self, image: Image.Image) -> OcrResult:
+        pool = get_pool(TESSERACT_CONFIG) if USE_ENGINE_POOL else None
+        if pool is not None:
+            return OcrResult.from_lines(pool.recognize_lines(image), self.name)
+
+        data = pytesseract.image_to_data(
+            image, lang="eng", config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT
+        )
+        lines: Dict[Tuple[int, int, int], List[Tuple[str, Box, float]]] = {}
+        for i, word in enumerate(data["text"]):
+            word = word.strip()
+            conf = float(data["conf"][i])
+            if not word or conf < 0:
+                continue
+            left, top = data["left"][i], data["top"][i]
+            box = (left, top, left + data["width"][i], top + data["height"][i])
+            lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append((word, box, conf))
+        return OcrResult.from_lines(((key[0], words) for key, words in lines.items()), self.name)
+
+    def warmup(self) -> None:
+        if USE_ENGINE_POOL:
+            get_pool(TESSERACT_CONFIG)
+
+
+class MicroBatcher:
+    """
+    Runs ``run_batch`` on one worker thread over items submitted from any
+    thread. The worker waits up to ``window_ms`` after the first item for
+    more, up to ``max_batch`` items per call. ``run_batch`` must return one
+    result per item, in order; if it raises or returns a different number of
+    results, every item in the batch fails.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Sequence[Any]],
+        window_ms: float,
+        max_batch: int,
+        name: str,
+        timeout: Optional[float] = OCR_BATCH_TIMEOUT,
+    ):
+        self.run_batch = run_batch
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self.timeout = timeout
+        self.batches = 0
+        self.items = 0
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        """
+        Process ``item`` in the next batch and return its result. Raises
+        ``TimeoutError`` if that takes longer than ``timeout`` seconds.
+        """
+        future: Future = Future()
+        self._queue.put((item, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # still queued: the worker will skip it
+            raise TimeoutError(f"{self.name}: no result within {self.timeout}s") from None
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Drop items whose caller timed out while they were queued
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = list(self.run_batch([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: {len(results)} results for a batch of {len(batch)}")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "meanBatch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def _rects(quads: np.ndarray, width: int, height: int) -> List[Box]:
+    """
+    Axis-aligned boxes of detected text quads, clipped to the image. Quads
+    can reach past the edges (a negative index would wrap the crop around);
+    any left empty by clipping are dropped.
+    """
+    rects = []
+    for q in quads:
+        left, top = max(0, int(q[:, 0].min())), max(0, int(q[:, 1].min()))
+        right, bottom = min(width, int(np.ceil(q[:, 0].max()))), min(height, int(np.ceil(q[:, 1].max())))
+        if right > left and bottom > top:
+            rects.append((left, top, right, bottom))
+    return rects
+
+
+def _reading_order(words: List[Tuple[str, Box, float]]) -> List[List[Tuple[str, Box, float]]]:
+    """Rows of (text, box, score) segments, top to bottom, each left to right"""
+    rows: List[List[Tuple[str, Box, float]]] = []
+    row_bottom = 0.0
+    for word in sorted(words, key=lambda w: w[1][1]):
+        top, bottom = word[1][1], word[1][3]
+        # A segment starting above the middle of the current row's last line joins it
+        if not rows or top >= row_bottom - (bottom - top) / 2:
+            rows.append([])
+            row_bottom = bottom
+        else:
+            row_bottom = max(row_bottom, bottom)
+        rows[-1].append(word)
+    return [sorted(row, key=lambda w: w[1][0]) for row in rows]
+
+
+class RapidOcrEngine(OcrEngine):
+    """
+    RapidOCR (PaddleOCR models on ONNX Runtime). It detects text lines, so
+    each word is a line segment with its recognition score.
+    """
+
+    name = "rapidocr"
+    binarize = False  # the detector is trained on natural grayscale/colour images
+
+    def __init__(self):
+        if RapidOCR is None:
+            raise RuntimeError("The rapidocr engine needs rapidocr-onnxruntime (pip install rapidocr-onnxruntime)")
+        self.model = RapidOCR()
+        self.batcher = MicroBatcher(self._run_batch, OCR_BATCH_WINDOW_MS, OCR_BATCH_MAX, "rapidocr-batch")
+
+    @classmethod
+    def version(cls) -> str:
+        try:
+            return f"rapidocr|{metadata.version('rapidocr-onnxruntime')}"
+        except metadata.PackageNotFoundError:
+            return "rapidocr|missing"
+
+    def _run_batch(self, images: List[Image.Image]) -> List[OcrResult]:
+        pages: List[List[Box]] = []
+        crops: List[np.ndarray] = []
+        for image in images:
+            array = np.asarray(image.convert("RGB"))
+            boxes, _ = self.model.text_det(array)
+            rects = _rects(boxes, array.shape[1], array.shape[0]) if boxes is not None and len(boxes) else []
+            pages.append(rects)
+            crops.extend(array[top:bottom, left:right] for left, top, right, bottom in rects)
+
+        # One recognition call over every page's crops; the recogniser pads
+        # crops of similar width into fixed-size inference batches
+        recognised = self.model.text_rec(crops)[0] if crops else []
+        results, k = [], 0
+        for rects in pages:
+            words = []
+            for box in rects:
+                text, score = recognised[k][0], recognised[k][1]
+                k += 1
+                if text.strip():
+                    words.append((text.strip(), box, float(score) * 100))
+            # The detector finds no blocks: every row is in block 0
+            results.append(OcrResult.from_lines(((0, row) for row in _reading_order(words)), self.name))
+        return results
+
+    def recognize(self, image: Image.Image) -> OcrResult:
+        return self.batcher.submit(image)
+
+
+ENGINES: Dict[str, type] = {
+    "tesseract": TesseractEngine,
+    "rapidocr": RapidOcrEngine,
+}
+_instances: Dict[str, OcrEngine] = {}
+_instances_lock = threading.Lock()
+
+
+def get_engine(name: Optional[str] = None) -> OcrEngine:
+    """The process-wide instance of an engine (``OCR_ENGINE`` by default), created on first use"""
+    name = name or OCR_ENGINE
+    engine = _instances.get(name)
+    if engine is not None:
+        return engine
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine {name!r}; expected one of {', '.join(ENGINES)}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = ENGINES[name]()
+        return _instances[name]
+
+
+def available_engines() -> List[str]:
+    """Engines whose dependencies are installed"""
+    names = ["tesseract"]
+    if RapidOCR is not None:
+        names.append("rapidocr")
+    return names
@@ -1,58 +1,118 @@
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+import hashlib
+import io
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
-# Configure Tesseract path - update this to match your installation
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+from PIL import Image, ImageOps
 
-# Tesseract configuration for better invoice OCR
-TESSERACT_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,:/-@%&() '
+from . import image_budget, roi_ocr
+from .image_budget import decode_for_ocr, estimate_bytes, fit_image, memory_budget, open_for_ocr
+from .metrics import stage
+from .ocr_backends import ENGINES, OCR_ENGINE, TESSERACT_CONFIG, USE_ENGINE_POOL, OcrResult, get_engine, recognize  # noqa: F401
+from .pdf_ingest import is_pdf, read_pdf, settings_fingerprint
+from .preprocess import PREPROCESS_PIPELINE, run_pipeline
 
 
-def extract_text(image_path: str) -> str:
-    """Extract text from an image using Tesseract OCR with enhanced preprocessing."""
-    # Open image using PIL
+def engine_version(pipeline: str = PREPROCESS_PIPELINE, engine: Optional[str] = None) -> str:
+    """Short fingerprint of the settings that affect OCR output (used in cache keys)."""
+    backend = ENGINES[engine or OCR_ENGINE]
+    pipeline = pipeline if backend.binarize else "grayscale"
+    settings = f"{backend.version()}|{pipeline}|{settings_fingerprint()}|{image_budget.settings_fingerprint()}|{roi_ocr.settings_fingerprint()}"
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+
+
+def recognize_page(image: Image.Image, engine: Optional[str] = None) -> OcrResult:
+    """
+    OCR a prepared page: a known vendor's template regions when templates list
+    regions, header and totals regions first with ``OCR_MODE=roi``, else the
+    whole page. One recognition gives both the text and the word boxes.
+    """
+    backend = get_engine(engine)
+    with stage("ocr"):
+        if roi_ocr.uses_vendor_regions():
+            return roi_ocr.recognize_vendor_page(image, backend.recognize)
+        if roi_ocr.OCR_MODE == "roi":
+            return roi_ocr.recognize_regions(image, backend.recognize)
+        return backend.recognize(image)
+
+
+def preprocess_image(image_path: Union[str, BinaryIO], pipeline: str = PREPROCESS_PIPELINE) -> Image.Image:
+    """Load an image (path or file-like object) and prepare it for OCR with the given pipeline."""
+    # Decode upright, grayscale and within the pixel budget (JPEGs at reduced scale)
+    image = open_for_ocr(image_path)
+
+    # Contrast, sharpen, denoise and binarise
+    return run_pipeline(image, pipeline)
+
+
+def prepare_image(image: Image.Image, pipeline: str = PREPROCESS_PIPELINE, binarize: bool = True) -> Image.Image:
+    """Prepare an already decoded image (e.g. a rendered PDF page) for OCR."""
+    with stage("preprocess"):
+        image = fit_image(ImageOps.exif_transpose(image))
+        return run_pipeline(image, pipeline) if binarize else image
+
+
+def read_image_file(
+    image_path: Union[str, BinaryIO],
+    pipeline: str = PREPROCESS_PIPELINE,
+    engine: Optional[str] = None,
+) -> OcrResult:
+    """OCR an image (path or file-like object) with the OCR engine and enhanced preprocessing."""
+    backend = get_engine(engine)
+    # Only the header is read here; decoding waits for room in the memory budget
     image = Image.open(image_path)
-    
-    # Convert to RGB if necessary (handles PNG with transparency)
-    if image.mode in ('RGBA', 'P'):
-        image = image.convert('RGB')
-    
-    # Convert to grayscale
-    image = image.convert('L')
-    
-    # Auto-rotate if needed
-    image = ImageOps.exif_transpose(image)
-    
-    # Resize image to improve OCR (scale up small images)
-    width, height = image.size
-    if width < 1000 or height < 1000:
-        scale = max(2, 2000 // min(width, height))
-        image = image.resize((width * scale, height * scale), Image.Resampling.LANCZOS)
-    
-    # Enhance contrast more aggressively
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(2.5)
-    
-    # Enhance sharpness
-    sharpener = ImageEnhance.Sharpness(image)
-    image = sharpener.enhance(2.0)
-    
-    # Apply sharpening filter
-    image = image.filter(ImageFilter.SHARPEN)
-    
-    # Denoise
-    image = image.filter(ImageFilter.MedianFilter(size=3))
-    
-    # Binarization (convert to pure black and white)
-    threshold = 128
-    image = image.point(lambda x: 0 if x < threshold else 255, '1')
-    image = image.convert('L')
-    
-    # Extract text using Tesseract with custom config
-    text = pytesseract.image_to_string(
-        image, 
-        lang='eng',
-        config=TESSERACT_CONFIG
-    )
-    
-    return text.strip()
+    with memory_budget.reserve(estimate_bytes(image)):
+        with stage("decode"):
+            image = decode_for_ocr(image)
+        if backend.binarize:
+            with stage("preprocess"):
+                image = run_pipeline(image, pipeline)
+        return recognize_page(image, backend.name)
+
+
+def extract_text(
+    image_path: Union[str, BinaryIO],
+    pipeline: str = PREPROCESS_PIPELINE,
+    engine: Optional[str] = None,
+) -> str:
+    """Extract text from an image (path or file-like object) with the OCR engine and enhanced preprocessing."""
+    return read_image_file(image_path, pipeline, engine).text.strip()
+
+
+def read_image(image: Image.Image, pipeline: str = PREPROCESS_PIPELINE, engine: Optional[str] = None) -> OcrResult:
+    """OCR an already decoded image."""
+    backend = get_engine(engine)
+    with memory_budget.reserve(estimate_bytes(image)):
+        return recognize_page(prepare_image(image, pipeline, backend.binarize), backend.name)
+
+
+def ocr_image(image: Image.Image, pipeline: str = PREPROCESS_PIPELINE, engine: Optional[str] = None) -> str:
+    """Text of an already decoded image."""
+    return read_image(image, pipeline, engine).text.strip()
+
+
+def read_document(
+    content: bytes,
+    pipeline: str = PREPROCESS_PIPELINE,
+    engine: Optional[str] = None,
+) -> Tuple[OcrResult, List[Dict]]:
+    """
+    OCR result of an uploaded invoice (image or PDF) plus per-page timings.
+    PDF pages use their text layer when present and are OCRed in parallel otherwise.
+    """
+    if is_pdf(content):
+        return read_pdf(content, lambda image: read_image(image, pipeline, engine))
+    start = time.perf_counter()
+    result = read_image_file(io.BytesIO(content), pipeline, engine)
+    ocr_ms = round((time.perf_counter() - start) * 1000, 2)
+    return result, [{"page": 1, "source": "ocr", "chars": len(result.text), "textMs": 0.0, "renderMs": 0.0, "ocrMs": ocr_ms}]
+
+
+def extract_document_text(
+    content: bytes,
+    pipeline: str = PREPROCESS_PIPELINE,
+    engine: Optional[str] = None,
+) -> Tuple[str, List[Dict]]:
+    """Text of an uploaded invoice (image or PDF) plus per-page timings."""
+    result, pages = read_document(content, pipeline, engine)
+    return result.text, pages
@@ -0,0 +1,173 @@
+"""
+Structure read off the OCR word boxes: line items and field confidence.
+
+Both work on the :class:`~app.ocr_backends.OcrResult` that the OCR pass
+already produced, so they cost array work and no extra recognition.
+
+Line items come from the item table. Its header is the first line with an
+amount column and at least one other column name (description, HSN/SAC,
+quantity, rate). Header words close together form one cell ("Unit Price"),
+and column borders fall midway between neighbouring cells. Each later line
+is a row, its words assigned to columns by their centres, until a totals
+line (sub total, taxable value, taxes) or a new page. A row without an
+amount continues the description above it.
+
+Field confidence is the lowest confidence among the words an extracted
+value was read from. Text values are found as written. Amounts are matched
+against the numeric words, and the last match wins because totals follow the
+items.
+
+Pages read from a PDF text layer have no words, so they add neither.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .models import LineItem
+from .ocr_backends import OcrResult
+from .scanner import AMOUNT_TOKEN_RE
+
+# Column name -> header word prefixes (lowercased, letters only)
+COLUMNS = (
+    ("hsn", ("hsn", "sac")),
+    ("quantity", ("qty", "quantity")),
+    ("rate", ("rate", "price")),
+    ("amount", ("amount", "amt", "value", "total")),
+    ("description", ("description", "particular", "item", "product", "goods", "service")),
+)
+# A line starting with one of these ends the item table
+TOTALS_RE = re.compile(r"(?:sub\s*-?\s*total|grand\s*total|total|taxable|cgst|sgst|igst|round|amount\s*in\s*words)\b", re.I)
+
+_LETTERS_RE = re.compile(r"[^a-z]")
+_CURRENCY_RE = re.compile(r"^(?:rs\.?|inr|₹)", re.I)
+_HSN_RE = re.compile(r"\d{4,8}")
+# Header words closer than this (in word heights) belong to one cell
+_CELL_GAP = 0.8
+
+
+def _column_name(word: str) -> Optional[str]:
+    token = _LETTERS_RE.sub("", word.lower())
+    for name, prefixes in COLUMNS:
+        if token and token.startswith(prefixes):
+            return name
+    return None
+
+
+def parse_number(word: str) -> Optional[float]:
+    """The amount a word spells ("1,250.00", "Rs.90"), or None"""
+    m = AMOUNT_TOKEN_RE.fullmatch(_CURRENCY_RE.sub("", word).strip(":/-"))
+    return float(m.group("num").replace(",", "")) if m else None
+
+
+def _header(index: np.ndarray, texts: List[str], boxes: np.ndarray) -> Optional[Tuple[Dict[str, int], np.ndarray]]:
+    """Column index per name and the borders between columns, if this line is a table header"""
+    cells: List[list] = []  # [name, left, right]
+    for i in index.tolist():
+        if any(ch.isdigit() for ch in texts[i]):
+            return None
+        name = _column_name(texts[i])
+        left, top, right, bottom = boxes[i].tolist()
+        if cells and left - cells[-1][2] < (bottom - top) * _CELL_GAP and not (name and cells[-1][0]):
+            cells[-1][0] = cells[-1][0] or name
+            cells[-1][2] = right
+        else:
+            cells.append([name, left, right])
+    names = [cell[0] for cell in cells]
+    if "amount" not in names or len(set(names) - {None}) < 2:
+        return None
+    columns: Dict[str, int] = {}
+    for k, name in enumerate(names):
+        # Tax tables repeat "Amount" per tax; the line amount is the rightmost one
+        if name and (name not in columns or name == "amount"):
+            columns[name] = k
+    borders = np.array([(a[2] + b[1]) / 2 for a, b in zip(cells, cells[1:])])
+    return columns, borders
+
+
+def _first_number(cell: Optional[str], last: bool = False) -> Optional[float]:
+    words = (cell or "").split()
+    for word in reversed(words) if last else words:
+        value = parse_number(word)
+        if value is not None:
+            return value
+    return None
+
+
+def _union(box: List[int], boxes: np.ndarray) -> List[int]:
+    """Bounding box of ``box`` (may be empty) and the rows of ``boxes``"""
+    if box:
+        boxes = np.vstack([boxes, box])
+    return [int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max())]
+
+
+def line_items(result: OcrResult) -> List[LineItem]:
+    """Rows of the item table(s) in ``result``"""
+    words = result.words
+    if not len(words):
+        return []
+    texts = result.word_texts()
+    centres = (words.boxes[:, 0] + words.boxes[:, 2]) / 2
+    items: List[LineItem] = []
+    table: Optional[Tuple[Dict[str, int], np.ndarray]] = None
+    table_page = -1
+    for index in np.split(np.arange(len(words)), np.flatnonzero(np.diff(words.line)) + 1):
+        page = int(words.page[index[0]])
+        if table is None or page != table_page:
+            table, table_page = _header(index, texts, words.boxes), page
+            continue
+        if TOTALS_RE.match(result.text, int(words.start[index[0]])):
+            table = None
+            continue
+
+        columns, borders = table
+        cells: Dict[int, List[str]] = {}
+        for i, k in zip(index.tolist(), np.searchsorted(borders, centres[index]).tolist()):
+            cells.setdefault(k, []).append(texts[i])
+        row = {name: " ".join(cells[k]) for name, k in columns.items() if k in cells}
+        amount = _first_number(row.get("amount"), last=True)
+        if amount is None:
+            # A wrapped description: nothing but text in the description column
+            if items and items[-1].page == page + 1 and set(cells) == {columns.get("description")}:
+                item = items[-1]
+                item.description = f"{item.description or ''} {row['description']}".strip()
+                item.box = _union(item.box, words.boxes[index])
+            continue
+
+        hsn = _HSN_RE.search(row.get("hsn", ""))
+        items.append(LineItem(
+            description=row.get("description"),
+            hsn=hsn.group(0) if hsn else None,
+            quantity=_first_number(row.get("quantity")),
+            rate=_first_number(row.get("rate")),
+            amount=amount,
+            confidence=round(float(words.conf[index].min()), 1),
+            page=page + 1,
+            box=_union([], words.boxes[index]),
+        ))
+    return items
+
+
+def field_confidence(result: OcrResult, fields: Dict[str, Union[str, float, None]]) -> Dict[str, float]:
+    """Lowest word confidence (0-100) behind each found field value"""
+    if not len(result.words):
+        return {}
+    upper = result.text.upper()
+    numbers: Optional[np.ndarray] = None
+    confidence: Dict[str, float] = {}
+    for name, value in fields.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            start = upper.find(value.upper())
+            score = result.span_confidence(start, start + len(value)) if start >= 0 else None
+        else:
+            if numbers is None:
+                numbers = np.array([parse_number(w) or np.nan for w in result.word_texts()], dtype=np.float64)
+            hits = np.flatnonzero(np.isclose(numbers, value, rtol=0, atol=0.005))
+            score = float(result.words.conf[hits[-1]]) if hits.size else None
+        if score is not None:
+            confidence[name] = round(score, 1)
+    return confidence
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import queue
+import shlex
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:  # optional: in-process Tesseract bindings
+    import tesserocr
+except ImportError:  # pragma: no cover - depends on the deployment
+    tesserocr = None
+
+
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", str(os.cpu_count() or 2)))
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """
+    Split a pytesseract-style config string into (oem, psm, variables).
+    Tokenised with shlex, exactly as pytesseract passes it to the CLI.
+    """
+    oem: Optional[int] = None
+    psm: Optional[int] = None
+    variables: Dict[str, str] = {}
+    tokens = shlex.split(config)
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok == "--oem" and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif tok == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif tok == "-c" and i + 1 < len(tokens):
+            name, _, value = tokens[i + 1].partition("=")
+            variables[name] = value
+            i += 1
+        i += 1
+    return oem, psm, variables
+
+
+class TesseractPool:
+    """
+    Long-lived, pre-initialised Tesseract API handles.
+
+    Each handle loads the traineddata once and keeps the parsed config, so a
+    recognition is just SetImage + Recognize on an in-memory image: no temp
+    files and no process fork. Handles are checked out one per worker thread.
+    """
+
+    def __init__(self, config: str, lang: str = "eng", size: int = OCR_POOL_SIZE):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self.size = max(1, size)
+        self.oem, self.psm, self.variables = parse_tesseract_config(config)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Fail fast on a broken install instead of on the first request.
+        self._idle.put(self._new_handle())
+
+    def _new_handle(self):
+        kwargs = {"lang": self.lang}
+        if self.oem is not None:
+            kwargs["oem"] = self.oem
+        if self.psm is not None:
+            kwargs["psm"] = self.psm
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in self.variables.items():
+            api.SetVariable(name, value)
+        self._created += 1
+        return api
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                return self._new_handle()
+        return self._idle.get()
+
+    def recognize(self, image: Image.Image) -> str:
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def recognize_lines(self, image: Image.Image) -> List[Tuple[int, List[Tuple[str, Tuple[int, int, int, int], float]]]]:
+        """(block, [(word, box, confidence), ...]) for every text line, from one recognition"""
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            lines: List[Tuple[int, List[Tuple[str, Tuple[int, int, int, int], float]]]] = []
+            iterator = api.GetIterator()
+            if iterator is None:  # nothing recognised
+                return lines
+            block = 0
+            level = tesserocr.RIL.WORD
+            for r in tesserocr.iterate_level(iterator, level):
+                if lines and r.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block += 1
+                if not lines or r.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    lines.append((block, []))
+                word = r.GetUTF8Text(level)
+                if word and word.strip():
+                    lines[-1][1].append((word.strip(), r.BoundingBox(level), r.Confidence(level)))
+            return lines
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[TesseractPool] = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_pool(config: str, lang: str = "eng") -> Optional[TesseractPool]:
+    """
+    Process-wide pool, created on first use. Returns None when tesserocr is
+    unavailable or fails to initialise, so callers can fall back to pytesseract.
+    """
+    global _pool, _pool_failed
+    if _pool is not None or _pool_failed or tesserocr is None:
+        return _pool
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                _pool = TesseractPool(config, lang=lang)
+            except Exception:
+                _pool_failed = True
+    return _pool
@@ -0,0 +1,180 @@
+"""
+Multi-page PDF invoices.
+
+Each page uses its embedded text layer when it has one (born-digital PDFs
+skip OCR entirely). Otherwise the page is rasterised at ``PDF_RENDER_DPI``
+and OCRed. Pages are read lazily through a sliding window of
+``PDF_PAGE_WORKERS`` pages, so at most that many rendered bitmaps are alive
+while their OCR runs in parallel. Page results are merged in page order. Once a
+page shows a grand total or amount payable with no item row after it, later
+pages (terms, annexures) are skipped.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .metrics import stage
+from .ocr_backends import OcrResult
+from .scanner import AMOUNT_TOKEN_RE
+
+try:  # optional: PDF rendering and text extraction
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - depends on the deployment
+    pdfium = None
+
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "300"))
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", str(os.cpu_count() or 2)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+# Fewer non-space characters than this and the text layer is treated as absent
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "20"))
+PDF_STOP_AT_TOTALS = os.getenv("PDF_STOP_AT_TOTALS", "1") != "0"
+# Labels that only the final total of an invoice carries
+_FINAL_TOTAL_RE = re.compile(r"\b(?:grand\s*total|(?:net\s*|total\s*)?amount\s*payable|total\s*payable)\b", re.I)
+
+# pdfium is not thread-safe: every call into it holds this lock
+_pdfium_lock = threading.Lock()
+_executors: Dict[int, ThreadPoolExecutor] = {}
+
+
+def is_pdf(content: bytes) -> bool:
+    return content[:5] == b"%PDF-"
+
+
+def settings_fingerprint() -> str:
+    """The settings that change PDF text output (part of the OCR cache key)"""
+    return f"pdf2|{PDF_RENDER_DPI}|{PDF_TEXT_MIN_CHARS}|{PDF_STOP_AT_TOTALS}|{PDF_MAX_PAGES}"
+
+
+@dataclass
+class PageTiming:
+    page: int  # 1-based
+    source: str  # "text" (embedded layer) or "ocr"
+    chars: int
+    textMs: float  # reading the text layer
+    renderMs: float = 0.0
+    ocrMs: float = 0.0
+
+
+def _is_item_row(line: str) -> bool:
+    # Quantity, rate and amount: three or more figures on one line
+    return len(AMOUNT_TOKEN_RE.findall(line)) >= 3
+
+
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+    # One shared pool per size; in practice only PDF_PAGE_WORKERS is used
+    with _pdfium_lock:
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-ocr")
+        return _executors[workers]
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _has_totals(text: str) -> bool:
+    """
+    True if the page ends the invoice: a grand total or amount payable with a
+    figure, and no item row after it. "Total Amount" in a table header or a
+    "Sub Total" does not count, and neither does a total above more items.
+    """
+    lines = text.split("\n")
+    for i in range(len(lines) - 1, -1, -1):
+        if _FINAL_TOTAL_RE.search(lines[i]):
+            figures = AMOUNT_TOKEN_RE.findall(lines[i]) or AMOUNT_TOKEN_RE.findall(lines[i + 1] if i + 1 < len(lines) else "")
+            if any(float(f.replace(",", "")) > 0 for f in figures):
+                return True
+        elif _is_item_row(lines[i]):
+            return False
+    return False
+
+
+def _timed_ocr(recognize_page: Callable[[Image.Image], OcrResult], image: Image.Image) -> Tuple[OcrResult, float]:
+    start = time.perf_counter()
+    return recognize_page(image), _ms(start)
+
+
+def read_pdf(
+    content: bytes,
+    recognize_page: Callable[[Image.Image], OcrResult],
+    dpi: int = PDF_RENDER_DPI,
+    workers: Optional[int] = None,
+) -> Tuple[OcrResult, List[Dict]]:
+    """
+    OCR result of a PDF invoice, plus one timing dict per page read. Words
+    carry their 0-based page; text-layer pages add text but no words.
+
+    ``recognize_page`` OCRs one rendered page (grayscale PIL image).
+    """
+    if pdfium is None:
+        raise RuntimeError("PDF invoices need pypdfium2 (pip install pypdfium2)")
+    workers = max(1, workers or PDF_PAGE_WORKERS)
+    executor = _get_executor(workers) if workers > 1 else None
+
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(content)
+        n = min(len(pdf), PDF_MAX_PAGES)
+    results: List[Optional[OcrResult]] = [None] * n
+    timings: List[PageTiming] = []
+    pending: Dict[int, Tuple[Future, PageTiming]] = {}
+    read = done = 0
+
+    def read_page(i: int) -> None:
+        start = time.perf_counter()
+        with _pdfium_lock:
+            page = pdf[i]
+            textpage = page.get_textpage()
+            text = textpage.get_text_bounded().replace("\r\n", "\n")
+            textpage.close()
+        timing = PageTiming(page=i + 1, source="text", chars=len(text), textMs=_ms(start))
+        if sum(not c.isspace() for c in text) >= PDF_TEXT_MIN_CHARS:
+            with _pdfium_lock:
+                page.close()
+            results[i] = OcrResult(text)
+            timings.append(timing)
+            return
+
+        start = time.perf_counter()
+        with _pdfium_lock, stage("pdf_render"):
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+            page.close()
+        timing.source = "ocr"
+        timing.renderMs = _ms(start)
+        if executor is None:
+            results[i], timing.ocrMs = _timed_ocr(recognize_page, image)
+            timing.chars = len(results[i].text)
+            timings.append(timing)
+        else:
+            pending[i] = (executor.submit(_timed_ocr, recognize_page, image), timing)
+
+    try:
+        while done < n:
+            # Keep up to ``workers`` pages ahead of the merge point in flight
+            while read < n and read < done + workers:
+                read_page(read)
+                read += 1
+            if done in pending:
+                future, timing = pending.pop(done)
+                results[done], timing.ocrMs = future.result()
+                timing.chars = len(results[done].text)
+                timings.append(timing)
+            done += 1
+            if PDF_STOP_AT_TOTALS and _has_totals(results[done - 1].text):
+                break
+    finally:
+        for future, _ in pending.values():
+            future.cancel()
+        with _pdfium_lock:
+            pdf.close()
+
+    merged = OcrResult.join(results[:done], pages=range(done))
+    timings.sort(key=lambda t: t.page)
+    return merged, [asdict(t) for t in timings if t.page <= done]
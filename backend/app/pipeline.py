@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Optional
+
+from .extract import EXTRACTION_VERSION, extract_invoice_fields
+from .metrics import stage
+from .models import InvoiceExtraction, MoneyBreakdown
+from .ocr_engine import OCR_ENGINE, engine_version, read_document
+from .ocr_layout import field_confidence, line_items
+from .services.resultCache import content_hash, get_cached, put_cached
+from .vendor_templates import registry
+
+
+@lru_cache(maxsize=None)
+def _settings_version(engine: Optional[str] = None) -> str:
+    return f"{engine_version(engine=engine)}-{EXTRACTION_VERSION}"
+
+
+def result_version(engine: Optional[str] = None) -> str:
+    """Cache entries depend on the OCR engine and settings, the extraction logic and the vendor templates."""
+    version = _settings_version(engine)
+    registry.refresh()
+    return version if registry.version == "none" else f"{version}-{registry.version}"
+
+
+def ocr_extract(filename: str, content: bytes, digest: Optional[str] = None, engine: Optional[str] = None) -> dict:
+    """
+    OCR an in-memory invoice (image or PDF) and extract GST fields.
+
+    Top-level and picklable so it can run in a process pool. Failures are
+    reported in the result instead of raised, so one bad file never aborts a
+    batch.
+    """
+    digest = digest or content_hash(content)
+    engine = engine or OCR_ENGINE
+    try:
+        result, pages = read_document(content, engine=engine)
+        with stage("extract"):
+            gstin, amounts, warnings = extract_invoice_fields(result.text)
+        # Both read the word boxes from the same OCR pass
+        with stage("layout"):
+            items = line_items(result)
+            confidence = field_confidence(result, {"gstin": gstin, **asdict(amounts)})
+    except Exception as e:
+        return {"filename": filename, "contentHash": digest, "engine": engine, "ok": False, "error": str(e)}
+
+    extraction = InvoiceExtraction(
+        gstin=gstin,
+        money=MoneyBreakdown(**asdict(amounts)),
+        ocr_confidence=None if result.confidence is None else round(result.confidence, 1),
+        field_confidence=confidence,
+        line_items=items,
+        warnings=warnings,
+        raw_text=result.text,
+    )
+    return {
+        "filename": filename,
+        "contentHash": digest,
+        "engine": engine,
+        "ok": True,
+        "extraction": extraction.model_dump(),
+        "pages": pages,
+    }
+
+
+def lookup_cached(filename: str, digest: str, engine: Optional[str] = None) -> Optional[dict]:
+    """Cached result for an upload hash, shaped like :func:`ocr_extract` output."""
+    engine = engine or OCR_ENGINE
+    cached = get_cached(digest, result_version(engine))
+    if cached is None:
+        return None
+    return {"filename": filename, "contentHash": digest, "engine": engine, "ok": True, "cached": True, "extraction": cached}
+
+
+def store_result(result: dict) -> None:
+    """Cache a successful :func:`ocr_extract` result."""
+    if result.get("ok") and not result.get("cached"):
+        put_cached(result["contentHash"], result_version(result.get("engine") or OCR_ENGINE), result["extraction"])
+
+
+def cached_ocr_extract(filename: str, content: bytes, digest: Optional[str] = None, engine: Optional[str] = None) -> dict:
+    """:func:`ocr_extract` behind the content-addressed result cache."""
+    digest = digest or content_hash(content)
+    result = lookup_cached(filename, digest, engine)
+    if result is None:
+        result = ocr_extract(filename, content, digest, engine)
+        store_result(result)
+    return result
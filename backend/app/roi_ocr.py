@@ -0,0 +1,251 @@
+"""
+Region-of-interest OCR.
+
+Most of an invoice page is the line-item table, but extraction needs the
+header (seller GSTIN, invoice number and date) and the totals block (taxable
+value, taxes, invoice value). A cheap layout pass finds the text lines on a
+downscaled copy of the binarised page from ink projection profiles, with no
+recognition. Then only the header band and the bottom totals band are
+recognised at full resolution, stacked into a single image so it costs one
+engine call. If the fields that ``extract.py`` requires are still missing, the
+whole page is OCRed as before.
+
+Vendor templates may list the regions that hold their fields. While any
+does, every page starts with its top ``VENDOR_PROBE_FRACTION``, cut at a gap
+between lines. When that shows a GSTIN with such a template, only the
+template's regions are read next. Otherwise the rest of the page is read, so
+other vendors' pages cost one extra engine call and no extra pixels (with
+``OCR_MODE=roi`` the ROI pass follows, and the top is read twice).
+
+Word boxes from cropped or stacked images are moved back to page
+coordinates, so results look the same as a whole-page read.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from . import vendor_templates
+from .ocr_backends import OcrResult
+from .vendor_templates import scan_invoice
+
+OCR_MODE = os.getenv("OCR_MODE", "full")  # "full" or "roi"
+ROI_LAYOUT_SCALE = int(os.getenv("ROI_LAYOUT_SCALE", "4"))  # layout pass runs at 1/scale
+ROI_HEADER_FRACTION = float(os.getenv("ROI_HEADER_FRACTION", "0.3"))  # of the text's height
+ROI_TOTALS_FRACTION = float(os.getenv("ROI_TOTALS_FRACTION", "0.35"))
+# Pages with fewer lines, or whose regions would cover most of the page, go straight to full OCR
+ROI_MIN_LINES = int(os.getenv("ROI_MIN_LINES", "8"))
+ROI_MAX_AREA = float(os.getenv("ROI_MAX_AREA", "0.75"))
+
+# Rows or columns darker than this are borders, rules or scan shadows, not text
+_SOLID_FRACTION = 0.6
+# Gap (in full-resolution pixels) between stacked regions
+_REGION_GAP = 40
+
+
+@dataclass
+class Line:
+    top: int
+    bottom: int
+    left: int
+    right: int
+
+
+def settings_fingerprint() -> str:
+    """The settings that change OCR text (part of the OCR cache key)"""
+    if OCR_MODE != "roi":
+        return "full"
+    return f"roi|{ROI_LAYOUT_SCALE}|{ROI_HEADER_FRACTION}|{ROI_TOTALS_FRACTION}|{ROI_MIN_LINES}|{ROI_MAX_AREA}"
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) of every run of True in a 1-D mask"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def detect_lines(image: Image.Image, scale: int = ROI_LAYOUT_SCALE) -> List[Line]:
+    """Text lines of a binarised page, in full-resolution coordinates, top to bottom"""
+    small = image.reduce(scale) if scale > 1 else image
+    ink = np.asarray(small) < 160
+    height, width = ink.shape
+    if not height or not width:
+        return []
+    ink[:, ink.mean(axis=0) > _SOLID_FRACTION] = False
+    ink[ink.mean(axis=1) > _SOLID_FRACTION, :] = False
+
+    rows = ink.sum(axis=1) >= max(1, width // 400)
+    # Close one-row gaps, so dots and underscores stay with their line
+    rows[1:-1] |= rows[:-2] & rows[2:]
+    lines = []
+    for top, bottom in _runs(rows):
+        if bottom - top < 2:
+            continue  # specks
+        cols = np.flatnonzero(ink[top:bottom].any(axis=0))
+        lines.append(Line(top * scale, bottom * scale, int(cols[0]) * scale, (int(cols[-1]) + 1) * scale))
+    return lines
+
+
+def _band(lines: List[Line], pad: int, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    width, height = size
+    return (
+        max(0, min(line.left for line in lines) - pad),
+        max(0, lines[0].top - pad),
+        min(width, max(line.right for line in lines) + pad),
+        min(height, lines[-1].bottom + pad),
+    )
+
+
+def select_regions(lines: List[Line], size: Tuple[int, int]) -> Optional[List[Tuple[int, int, int, int]]]:
+    """Header and totals boxes for a page, or None when OCRing the whole page is the better deal"""
+    if len(lines) < ROI_MIN_LINES:
+        return None
+    top, bottom = lines[0].top, lines[-1].bottom
+    span = bottom - top
+    # Lines run top to bottom, so the header is a prefix and the totals a suffix
+    n_header = sum(line.top < top + span * ROI_HEADER_FRACTION for line in lines)
+    n_totals = sum(line.bottom > bottom - span * ROI_TOTALS_FRACTION for line in lines[n_header:])
+    header, totals = lines[:n_header], lines[len(lines) - n_totals:]
+    pad = int(np.median([line.bottom - line.top for line in lines])) // 2 + 1
+    boxes = [_band(group, pad, size) for group in (header, totals) if group]
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+    if area > ROI_MAX_AREA * size[0] * size[1]:
+        return None
+    return boxes
+
+
+def stack_regions(image: Image.Image, boxes: List[Tuple[int, int, int, int]]) -> Image.Image:
+    """Crop ``boxes`` out of ``image`` and stack them top to bottom on white"""
+    crops = [image.crop(box) for box in boxes]
+    canvas = Image.new(image.mode, (
+        max(c.width for c in crops) + 2 * _REGION_GAP,
+        sum(c.height for c in crops) + _REGION_GAP * (len(crops) + 1),
+    ), 255)
+    y = _REGION_GAP
+    for crop in crops:
+        canvas.paste(crop, (_REGION_GAP, y))
+        y += crop.height + _REGION_GAP
+    return canvas
+
+
+def unstack_words(result: OcrResult, boxes: List[Tuple[int, int, int, int]]) -> OcrResult:
+    """``result`` of a :func:`stack_regions` image, with word boxes moved back to the page"""
+    tops = _REGION_GAP + np.cumsum([0] + [y1 - y0 + _REGION_GAP for _, y0, _, y1 in boxes[:-1]])
+    middle = (result.words.boxes[:, 1] + result.words.boxes[:, 3]) // 2
+    region = np.clip(np.searchsorted(tops - _REGION_GAP // 2, middle, side="right") - 1, 0, len(boxes) - 1)
+    origins = np.asarray([(x0 - _REGION_GAP, y0 - top) for (x0, y0, _, _), top in zip(boxes, tops.tolist())])
+    return result.shifted(np.tile(origins[region], 2))
+
+
+def has_required_fields(text: str) -> bool:
+    """True if ``text`` yields every field ``extract_invoice_fields`` warns about"""
+    scan = scan_invoice(text)
+    return (
+        scan.gstin is not None
+        and scan.amounts["invoice_value"] is not None
+        and scan.amounts["taxable_value"] is not None
+    )
+
+
+class RoiStats:
+    """Counters for how often the ROI pass was enough and how much of each page it read"""
+
+    def __init__(self):
+        self.pages = 0
+        self.roi_pages = 0
+        self.fallbacks = 0
+        self.pixels = 0
+        self.ocr_pixels = 0
+        self._lock = threading.Lock()
+
+    def record(self, page_pixels: int, ocr_pixels: int, roi: bool, fallback: bool) -> None:
+        with self._lock:
+            self.pages += 1
+            self.roi_pages += roi
+            self.fallbacks += fallback
+            self.pixels += page_pixels
+            self.ocr_pixels += ocr_pixels
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "roiPages": self.roi_pages,
+                "fallbacks": self.fallbacks,
+                "ocrPixelRatio": round(self.ocr_pixels / self.pixels, 3) if self.pixels else 0.0,
+            }
+
+
+roi_stats = RoiStats()
+
+
+def recognize_regions(image: Image.Image, recognize: Callable[[Image.Image], OcrResult]) -> OcrResult:
+    """
+    OCR the header and totals of a binarised page with ``recognize``, falling
+    back to the whole page when required fields are missing from them.
+    """
+    pixels = image.width * image.height
+    boxes = select_regions(detect_lines(image), image.size)
+    if boxes is None:
+        roi_stats.record(pixels, pixels, roi=False, fallback=False)
+        return recognize(image)
+
+    stacked = stack_regions(image, boxes)
+    result = recognize(stacked)
+    if has_required_fields(result.text):
+        roi_stats.record(pixels, stacked.width * stacked.height, roi=True, fallback=False)
+        return unstack_words(result, boxes)
+    roi_stats.record(pixels, stacked.width * stacked.height + pixels, roi=True, fallback=True)
+    return recognize(image)
+
+
+def _probe_cut(lines: List[Line], height: int) -> int:
+    """y of the gap after the last line starting in the top ``VENDOR_PROBE_FRACTION`` of the page"""
+    limit = height * vendor_templates.VENDOR_PROBE_FRACTION
+    n_top = sum(line.top < limit for line in lines)
+    if n_top == 0:
+        return int(limit)
+    if n_top == len(lines):
+        return height
+    return (lines[n_top - 1].bottom + lines[n_top].top) // 2
+
+
+def uses_vendor_regions() -> bool:
+    vendor_templates.registry.refresh()
+    return vendor_templates.registry.has_regions()
+
+
+def recognize_vendor_page(image: Image.Image, recognize: Callable[[Image.Image], OcrResult]) -> OcrResult:
+    """
+    OCR the top of a binarised page, then only its vendor template's regions
+    if it has some and they yield every field it has rules for. Otherwise
+    the rest of the page, or with ``OCR_MODE=roi`` the usual ROI pass.
+    """
+    width, height = image.size
+    cut = _probe_cut(detect_lines(image), height)
+    top = recognize(image.crop((0, 0, width, cut)))
+    template, gstins = vendor_templates.registry.detect(top.text)
+    ocr_pixels = width * cut
+    if template is not None and template.regions:
+        boxes = [
+            (int(left * width), int(upper * height), int(right * width), int(lower * height))
+            for left, upper, right, lower in template.regions
+        ]
+        stacked = stack_regions(image, boxes)
+        result = OcrResult.join([top, unstack_words(recognize(stacked), boxes)])
+        ocr_pixels += stacked.width * stacked.height
+        if not template.scan(result.text, gstins)[1] & template.fields:
+            roi_stats.record(width * height, ocr_pixels, roi=True, fallback=False)
+            return result
+        roi_stats.record(width * height, ocr_pixels + width * (height - cut), roi=True, fallback=True)
+    elif OCR_MODE == "roi":
+        return recognize_regions(image, recognize)
+    if cut >= height:
+        return top
+    rest = recognize(image.crop((0, cut, width, height))).shifted((0, cut, 0, cut))
+    return OcrResult.join([top, rest])
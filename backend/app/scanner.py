@@ -0,0 +1,206 @@
+"""
+Single-pass field scanner over OCR text.
+
+One combined regex runs once over the lowercased text. It finds the anchor
+words that every field label contains (``invoice``, ``date``, ``total``,
+``amount``, ``value``, ``gst``), plus GSTINs (misread ones too, when
+``gstin.check_gstin`` can suggest the real one) and bare dates. The anchors are
+single words and never overlap, so none is hidden by an earlier match, and
+every line or position that could hold a label is found. Then only there:
+
+- the amount label patterns run on that line, and amounts are tokenised at
+  most once per line;
+- the invoice number, labelled date and total patterns are matched on the
+  raw text at the anchor, so they read the text exactly as written (an
+  invoice number starting with ``INR``, a value after blank lines).
+
+This gives the same output as searching the text once per field. Both
+``extract.py`` and ``extractor.py`` build their results from the
+:class:`TextScan` this produces, unless the invoice is from a vendor with a
+template (``vendor_templates.py``).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .gstin import CANDIDATE_CHARS, is_gstin_candidate
+
+AMOUNT_FIELDS = ("invoice_value", "taxable_value", "cgst", "sgst", "igst", "total_tax")
+
+# Label patterns per amount field, run on a normalised, lowercased line
+AMOUNT_LABELS = {
+    "invoice_value": re.compile(r"\b(?:grand\s*total|invoice\s*value|net\s*amount|total\s*amount|amount\s*payable)\b"),
+    "taxable_value": re.compile(r"\b(?:taxable\s*value|taxable\s*amount|sub\s*total)\b"),
+    "cgst": re.compile(r"\bcgst\b"),
+    "sgst": re.compile(r"\bsgst\b"),
+    "igst": re.compile(r"\bigst\b"),
+    "total_tax": re.compile(r"\b(?:total\s*tax|gst\s*total|total\s*gst)\b"),
+}
+# Every amount label contains one of these words
+_AMOUNT_ANCHORS = frozenset(("total", "amount", "value", "gst"))
+# GSTIN candidate (OCR confusions allowed, see gstin.CANDIDATE_CHARS) and bare
+# dd/mm/yyyy date share their leading digit, so a digit that starts neither
+# fails after one character.
+_GSTIN_TAIL = "".join(f"[{chars.lower()}]" for chars in CANDIDATE_CHARS[1:])
+_DIGIT_PATTERN = r"[0-9](?:" + _GSTIN_TAIL + r"|[0-9]?[/-][0-9][0-9]?[/-][0-9]{4})"
+
+# Plain alternation, no capture groups: every branch starts with a literal or
+# a digit, which lets the regex engine skip ahead with a first-character
+# check (capture groups would disable that).
+FIELD_RE = re.compile("invoice|date|total|amount|value|gst|" + _DIGIT_PATTERN)
+# For the rare text whose lowercase form has a different length
+_FIELD_RE_I = re.compile(FIELD_RE.pattern, re.I)
+
+AMOUNT_TOKEN_RE = re.compile(r"(?P<num>\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)")
+INVOICE_NO_RE = re.compile(r"Invoice\s*No[:\-]?\s*(\S+)", re.I)
+LABELLED_DATE_RE = re.compile(r"(?:Invoice\s*)?Date[\s:]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", re.I)
+TOTAL_RE = re.compile(r"Total[\s:]*(?:Amount)?[\s:]*(?:Rs\.?|INR)?[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)", re.I)
+PAYABLE_RE = re.compile(r"Amount\s*Payable[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)", re.I)
+# Single spaces are left alone; only runs and tabs need rewriting.
+_SPACES_RE = re.compile(r"[ \t]{2,}|\t")
+
+
+def _replace_inr(text: str) -> str:
+    # Only a leading INR is a currency marker; inside a token it may be part
+    # of a GSTIN's PAN (e.g. 29AINRP...), which must survive normalisation.
+    parts = text.split("INR")
+    out = [parts[0]]
+    for part in parts[1:]:
+        out.append("INR" if _is_word_char(out[-1][-1:]) else "Rs ")
+        out.append(part)
+    return "".join(out)
+
+
+def normalize_text(text: str) -> str:
+    # Normalize common OCR artifacts
+    t = text.replace("₹", "Rs ")
+    if "INR" in t:
+        t = _replace_inr(t)
+    return _SPACES_RE.sub(" ", t)
+
+
+@dataclass
+class TextScan:
+    """Fields found in one OCR text. Shared via a small cache: treat as read-only."""
+    amounts: Dict[str, Optional[float]] = field(default_factory=lambda: dict.fromkeys(AMOUNT_FIELDS))
+    gstins: List[str] = field(default_factory=list)  # every GSTIN-shaped or misread-GSTIN token, uppercased
+    gstin: Optional[str] = None  # first GSTIN standing as a whole word
+    invoice_no: Optional[str] = None
+    invoice_date: Optional[str] = None
+    total_amount: Optional[str] = None  # first "Total ..." / "Amount Payable" figure, commas stripped
+    template: Optional[str] = None  # GSTIN of the vendor template used, if any
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] has a word boundary on both sides."""
+    return not _is_word_char(text[start - 1:start]) and not _is_word_char(text[end:end + 1])
+
+
+def _positive_amount(tokens: List[str]) -> Optional[float]:
+    # Choose the last numeric token (often the amount)
+    for tok in reversed(tokens):
+        val = float(tok.replace(",", ""))
+        if val > 0:
+            return val
+    return None
+
+
+def _anchors(text: str, scan: TextScan) -> List[tuple]:
+    """
+    Run the combined regex once over the text. GSTINs and the first bare date
+    go straight into ``scan``; anchor words are returned as (position, line
+    number, word), in text order.
+    """
+    lower = text.lower()
+    if len(lower) == len(text):
+        matches = FIELD_RE.finditer(lower)
+    else:
+        lower = text
+        matches = _FIELD_RE_I.finditer(text)
+    anchors = []
+    line_no = last = 0
+    for m in matches:
+        start, end = m.span()
+        line_no += lower.count("\n", last, start)
+        last = start
+        word = m.group()
+        if not word[0].isdigit():
+            anchors.append((start, line_no, word.lower()))
+        elif len(word) == 15:  # GSTIN candidate
+            value = word.upper()
+            if not is_gstin_candidate(value):
+                continue
+            scan.gstins.append(value)
+            if scan.gstin is None and _is_word(lower, start, end):
+                scan.gstin = value
+        elif scan.invoice_date is None:
+            scan.invoice_date = text[start:end]
+    return anchors
+
+
+@lru_cache(maxsize=64)
+def scan_invoice_text(text: str) -> TextScan:
+    """Extract every supported field from OCR text in one pass."""
+    scan = TextScan()
+    anchors = _anchors(text, scan)
+    normalized = normalize_text(text)
+    lines = normalized.split("\n")
+    amounts = scan.amounts
+    missing_amounts = list(AMOUNT_FIELDS)
+    tokens_cache: Dict[int, List[str]] = {}
+    checked = -1
+    labelled_date = first_total = first_payable = None
+
+    def tokens(i: int) -> List[str]:
+        if i not in tokens_cache:
+            tokens_cache[i] = AMOUNT_TOKEN_RE.findall(lines[i])
+        return tokens_cache[i]
+
+    for pos, i, word in anchors:
+        # Amount fields: first line with the label and a positive amount on
+        # it (or on the next line, when this one has no numbers at all).
+        if word in _AMOUNT_ANCHORS and i != checked and missing_amounts:
+            checked = i
+            line = lines[i].lower()
+            for name in list(missing_amounts):
+                if not AMOUNT_LABELS[name].search(line):
+                    continue
+                candidates = tokens(i)
+                if not candidates and i + 1 < len(lines):
+                    candidates = tokens(i + 1)
+                value = _positive_amount(candidates)
+                if value is not None:
+                    amounts[name] = value
+                    missing_amounts.remove(name)
+
+        # Every match of these patterns starts at its anchor word, so the
+        # first anchor that matches gives the first match in the text
+        if word == "invoice":
+            if scan.invoice_no is None:
+                m = INVOICE_NO_RE.match(text, pos)
+                if m:
+                    scan.invoice_no = m.group(1)
+            if labelled_date is None:
+                m = LABELLED_DATE_RE.match(text, pos)
+                labelled_date = m.group(1) if m else None
+        elif word == "date" and labelled_date is None:
+            m = LABELLED_DATE_RE.match(text, pos)
+            labelled_date = m.group(1) if m else None
+        elif word == "total" and first_total is None:
+            m = TOTAL_RE.match(text, pos)
+            first_total = m.group(1) if m else None
+        elif word == "amount" and first_payable is None:
+            m = PAYABLE_RE.match(text, pos)
+            first_payable = m.group(1) if m else None
+
+    scan.invoice_date = labelled_date or scan.invoice_date
+    total = first_total or first_payable
+    scan.total_amount = total.replace(",", "") if total else None
+    return scan
@@ -0,0 +1,110 @@
+"""Live feed of invoice store changes, for Server-Sent Events.
+
+Every change gets a sequence number. Each event is encoded as an SSE message
+once, when it is published, and kept in one shared ring of the last
+``FEED_REPLAY`` events. A client holds only the sequence number it has seen,
+so a slow or disconnected client costs no memory. If it falls further behind
+than the ring reaches, it gets a ``reset`` and reloads.
+
+Idle clients wait on a future, so open dashboards cost nothing until an
+invoice arrives. Publishing wakes each event loop with a single thread-safe
+callback. The feed lives in one process: with several workers, each worker's
+clients see that worker's inserts.
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+FEED_REPLAY = int(os.getenv("FEED_REPLAY", "1000"))
+
+
+def encode_event(event: str, data: Dict, seq: int) -> bytes:
+    """One SSE message; ``seq`` becomes the id a reconnecting client sends back"""
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def _wake_all(futures: Set[asyncio.Future]) -> None:
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+class InvoiceFeed:
+    def __init__(self, replay: int = FEED_REPLAY):
+        self._events: Deque[Tuple[int, bytes]] = deque(maxlen=replay)
+        self._seq = 0
+        self._stats: Dict = {}
+        self._lock = threading.Lock()
+        # Waiting clients, grouped by event loop so each loop is woken once
+        self._waiters: Dict[asyncio.AbstractEventLoop, Set[asyncio.Future]] = {}
+
+    @property
+    def last_id(self) -> int:
+        return self._seq
+
+    def publish(self, event: str, data: Dict, stats: Optional[Dict] = None, full: bool = False) -> int:
+        """
+        Append an event and wake waiting clients. ``stats`` is the store's
+        new ``get_stats()``; only the fields that changed since the last
+        event go out, under ``data["stats"]``, or all of them with ``full``.
+        """
+        with self._lock:
+            if stats is not None:
+                changed = stats if full else {k: v for k, v in stats.items() if self._stats.get(k) != v}
+                data = {**data, "stats": dict(changed)}
+                self._stats = dict(stats)
+            self._seq += 1
+            self._events.append((self._seq, encode_event(event, data, self._seq)))
+            waiters, self._waiters = self._waiters, {}
+        for loop, futures in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake_all, futures)
+            except RuntimeError:  # that loop has shut down
+                pass
+        return self._seq
+
+    def since(self, last_id: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Encoded events after ``last_id``, or None if some of them are gone (or from before a restart)"""
+        with self._lock:
+            if last_id > self._seq:
+                return None
+            if last_id == self._seq:
+                return []
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            if last_id + 1 < oldest:
+                return None
+            return list(itertools.islice(self._events, last_id + 1 - oldest, None))
+
+    async def wait(self, last_id: int, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for an event after ``last_id``; False on timeout"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._seq > last_id:
+                return True
+            self._waiters.setdefault(loop, set()).add(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                futures = self._waiters.get(loop)
+                if futures is not None:
+                    futures.discard(future)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "lastId": self._seq,
+                "buffered": len(self._events),
+                "waiting": sum(len(futures) for futures in self._waiters.values()),
+            }
+
+
+feed = InvoiceFeed()
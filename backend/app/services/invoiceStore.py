@@ -1,33 +1,271 @@
-"""Simple in-memory invoice storage for demo purposes"""
-from typing import List, Dict, Optional
+"""Simple in-memory invoice storage for demo purposes
+
+Invoices live in an append-only log (oldest first) with hash indexes on
+``_id``, ``invoiceNumber``, ``sellerGSTIN``, ``buyerGSTIN`` and return period
+that map to log positions, so inserts and lookups are O(1) and newest-first
+reads walk the log backwards instead of copying it. Dashboard totals and breakdowns are
+running aggregates updated on insert, so reading them is O(1) too.
+
+With ``INVOICE_STORE=sqlite`` the same functions persist to a SQLite (WAL)
+database instead (see ``sqliteStore``), which survives restarts and can be
+shared by several uvicorn workers.
+
+Every insert is also published to ``invoiceFeed.feed`` with the stats fields
+it changed, for the dashboard's live feed, in insert order: under the write
+lock in memory, and from the SQLite writer thread right after each commit.
+A ``reset`` from ``clear_all`` carries the full stats.
+"""
+import itertools
+import os
+import re
+import threading
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+from .invoiceFeed import feed
+
+STORE_BACKEND = os.getenv("INVOICE_STORE", "memory")
+
 # In-memory storage - in production, use MongoDB/PostgreSQL
-_invoices_db: List[Dict] = []
+_invoices_db: List[Dict] = []  # append-only log, oldest first
+_by_id: Dict[str, int] = {}
+_by_number: Dict[str, int] = {}  # newest invoice with that number
+_by_seller: Dict[str, List[int]] = defaultdict(list)
+_by_buyer: Dict[str, List[int]] = defaultdict(list)
+_by_period: Dict[str, List[int]] = defaultdict(list)  # "YYYY-MM" of invoiceDate
+
+# Running aggregates for get_stats / get_breakdowns
+_totals: Dict[str, float] = {}
+BREAKDOWN_NAMES = ("byMonth", "byPlaceOfSupply", "byStatus")
+_breakdowns: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{2})")
+_DMY_DATE_RE = re.compile(r"^\d{1,2}[/-](\d{1,2})[/-](\d{4})$")
+
+# Bumped on every write; list ETags are derived from it
+_version = 0
+
+# Never reset, so ids stay unique across clear_all
+_id_seq = itertools.count(1)
+# Writers come from the job pool threads; readers need no lock
+_write_lock = threading.Lock()
+
+def return_period(invoice_date: Optional[str]) -> Optional[str]:
+    """Month ("YYYY-MM") of an ISO or dd/mm/yyyy invoice date"""
+    if not invoice_date:
+        return None
+    m = _ISO_DATE_RE.match(invoice_date)
+    if m:
+        return f"{m.group(1)}-{m.group(2)}"
+    m = _DMY_DATE_RE.match(invoice_date)
+    if m:
+        return f"{m.group(2)}-{int(m.group(1)):02d}"
+    return None
+
+def _reset_aggregates():
+    _totals.clear()
+    _totals.update(count=0, taxableValue=0, totalTax=0, confidence=0, valid=0, warning=0)
+    _breakdowns.clear()
+    for name in BREAKDOWN_NAMES:
+        _breakdowns[name] = {}
+
+def _breakdown_keys(inv: Dict) -> Dict[str, Optional[str]]:
+    return {
+        "byMonth": return_period(inv.get("invoiceDate")),
+        "byPlaceOfSupply": inv.get("placeOfSupply"),
+        "byStatus": inv.get("status"),
+    }
+
+def _update_aggregates(inv: Dict):
+    _totals["count"] += 1
+    _totals["taxableValue"] += inv.get("taxableValue", 0)
+    _totals["totalTax"] += inv.get("totalTax", 0)
+    _totals["confidence"] += inv.get("confidenceScore", 0)
+    if inv.get("status") in ("valid", "warning"):
+        _totals[inv["status"]] += 1
+
+    for name, key in _breakdown_keys(inv).items():
+        key = key or "unknown"
+        bucket = _breakdowns[name].get(key)
+        if bucket is None:
+            bucket = _breakdowns[name][key] = {"count": 0, "taxableValue": 0, "totalTax": 0, "totalAmount": 0}
+        bucket["count"] += 1
+        bucket["taxableValue"] += inv.get("taxableValue", 0)
+        bucket["totalTax"] += inv.get("totalTax", 0)
+        bucket["totalAmount"] += inv.get("totalAmount", 0)
+
+_reset_aggregates()
+
+def _publish_committed(invoices: List[Dict]) -> None:
+    # On the SQLite writer thread, so stats snapshots follow commit order
+    stats = get_stats()
+    for invoice in invoices:
+        feed.publish("invoice", {"invoice": invoice}, stats)
+
+_sqlite = None
+if STORE_BACKEND == "sqlite":
+    from .sqliteStore import SqliteInvoiceStore
+    _sqlite = SqliteInvoiceStore(on_commit=_publish_committed)
 
 def add_invoice(invoice: Dict) -> Dict:
     """Add invoice to storage with generated ID"""
-    invoice_with_id = {
-        "_id": f"inv_{datetime.now().strftime('%Y%m%d%H%M%S')}_{len(_invoices_db)}",
-        **invoice
-    }
-    _invoices_db.insert(0, invoice_with_id)  # Newest first
+    if _sqlite is not None:
+        # Several processes share the database, so a per-process counter
+        # cannot make ids unique there.
+        invoice_with_id = {
+            "_id": f"inv_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:12]}",
+            **invoice
+        }
+        # Published by _publish_committed before this returns
+        _sqlite.add(invoice_with_id, _breakdown_keys(invoice_with_id))
+        return invoice_with_id
+    with _write_lock:
+        invoice_with_id = {
+            "_id": f"inv_{datetime.now().strftime('%Y%m%d%H%M%S')}_{next(_id_seq)}",
+            **invoice
+        }
+        pos = len(_invoices_db)
+        _invoices_db.append(invoice_with_id)
+        _by_id[invoice_with_id["_id"]] = pos
+        if invoice_with_id.get("invoiceNumber"):
+            _by_number[invoice_with_id["invoiceNumber"]] = pos
+        if invoice_with_id.get("sellerGSTIN"):
+            _by_seller[invoice_with_id["sellerGSTIN"]].append(pos)
+        if invoice_with_id.get("buyerGSTIN"):
+            _by_buyer[invoice_with_id["buyerGSTIN"]].append(pos)
+        period = return_period(invoice_with_id.get("invoiceDate"))
+        if period:
+            _by_period[period].append(pos)
+        _update_aggregates(invoice_with_id)
+        global _version
+        _version += 1
+        # Under the lock, so feed order matches insert order
+        feed.publish("invoice", {"invoice": invoice_with_id}, get_stats())
     return invoice_with_id
 
+def iter_invoices() -> Iterator[Dict]:
+    """Iterate stored invoices newest first, without copying"""
+    if _sqlite is not None:
+        return _sqlite.iter_invoices()
+    return reversed(_invoices_db)
+
+def iter_appended(after: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """
+    (sequence number, invoice) for invoices stored after sequence number
+    ``after``, oldest first. Sequence numbers start at 1 and may be reused
+    after ``clear_all``; check ``id_at`` to tell.
+    """
+    if _sqlite is not None:
+        return _sqlite.iter_after(after)
+    return ((pos + 1, _invoices_db[pos]) for pos in range(after, len(_invoices_db)))
+
+def id_at(seq: int) -> Optional[str]:
+    """``_id`` of the invoice with sequence number ``seq``, if it still exists"""
+    if _sqlite is not None:
+        return _sqlite.id_at(seq)
+    db = _invoices_db
+    return db[seq - 1]["_id"] if 0 < seq <= len(db) else None
+
 def get_all_invoices() -> List[Dict]:
-    """Get all stored invoices"""
-    return _invoices_db.copy()
+    """Get all stored invoices, newest first"""
+    return list(iter_invoices())
 
 def get_invoice_by_id(invoice_id: str) -> Optional[Dict]:
-    """Get specific invoice by ID"""
-    for inv in _invoices_db:
-        if inv.get("_id") == invoice_id or inv.get("invoiceNumber") == invoice_id:
-            return inv
-    return None
+    """Get specific invoice by ID or invoice number"""
+    if _sqlite is not None:
+        return _sqlite.get(invoice_id)
+    pos = _by_id.get(invoice_id)
+    if pos is None:
+        pos = _by_number.get(invoice_id)
+    return _invoices_db[pos] if pos is not None else None
+
+def get_invoices_by_gstin(gstin: str, role: str = "any") -> List[Dict]:
+    """Get invoices where the GSTIN is the seller, the buyer or ("any") either, newest first"""
+    if _sqlite is not None:
+        return _sqlite.by_gstin(gstin, role)
+    positions: List[int] = []
+    if role in ("seller", "any"):
+        positions.extend(_by_seller.get(gstin, ()))
+    if role in ("buyer", "any"):
+        positions.extend(_by_buyer.get(gstin, ()))
+    return [_invoices_db[pos] for pos in sorted(set(positions), reverse=True)]
+
+def iter_period_invoices(period: str, seller_gstin: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Iterate invoices dated in a return period ("YYYY-MM"), optionally only
+    those a seller issued, grouped by buyer GSTIN and oldest first within each
+    """
+    if _sqlite is not None:
+        return _sqlite.iter_period(period, seller_gstin)
+    positions = _by_period.get(period, ())
+    if seller_gstin is not None:
+        positions = [pos for pos in positions if _invoices_db[pos].get("sellerGSTIN") == seller_gstin]
+    ordered = sorted(positions, key=lambda pos: (_invoices_db[pos].get("buyerGSTIN") or "", pos))
+    return (_invoices_db[pos] for pos in ordered)
+
+def _matches(inv: Dict, status: Optional[str], date_from: Optional[str], date_to: Optional[str],
+             place_of_supply: Optional[str]) -> bool:
+    if status is not None and inv.get("status") != status:
+        return False
+    if place_of_supply is not None and inv.get("placeOfSupply") != place_of_supply:
+        return False
+    if date_from is not None or date_to is not None:
+        date = inv.get("invoiceDate") or ""
+        if (date_from is not None and date < date_from) or (date_to is not None and date > date_to):
+            return False
+    return True
+
+def query_invoices(
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    gstin: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    place_of_supply: Optional[str] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Get one page of invoices newest first, and the ``_id`` to pass as ``after``
+    for the next page (None on the last page). ``gstin`` matches seller or
+    buyer; dates are inclusive ISO (YYYY-MM-DD) bounds on ``invoiceDate``.
+    """
+    if _sqlite is not None:
+        return _sqlite.query(limit, after, gstin, status, date_from, date_to, place_of_supply)
+
+    start = len(_invoices_db)
+    if after is not None:
+        start = _by_id.get(after, -1)
+        if start < 0:
+            raise ValueError(f"Unknown cursor: {after}")
+    positions: Iterable[int]
+    if gstin is not None:
+        matched = set(_by_seller.get(gstin, ())) | set(_by_buyer.get(gstin, ()))
+        positions = sorted((pos for pos in matched if pos < start), reverse=True)
+    else:
+        positions = range(start - 1, -1, -1)
+
+    page: List[Dict] = []
+    for pos in positions:
+        inv = _invoices_db[pos]
+        if not _matches(inv, status, date_from, date_to, place_of_supply):
+            continue
+        if limit is not None and len(page) == limit:
+            return page, page[-1]["_id"]
+        page.append(inv)
+    return page, None
+
+def store_version() -> str:
+    """Changes whenever invoices are added or cleared"""
+    if _sqlite is not None:
+        return _sqlite.version()
+    return str(_version)
 
 def get_stats() -> Dict:
     """Get dashboard statistics"""
-    total = len(_invoices_db)
+    totals = _sqlite.totals() if _sqlite is not None else _totals
+    total = totals["count"]
     if total == 0:
         return {
             "totalInvoices": 0,
@@ -37,22 +275,41 @@ def get_stats() -> Dict:
             "validCount": 0,
             "warningCount": 0
         }
-    
-    total_value = sum(inv.get("taxableValue", 0) for inv in _invoices_db)
-    total_tax = sum(inv.get("totalTax", 0) for inv in _invoices_db)
-    avg_conf = sum(inv.get("confidenceScore", 0) for inv in _invoices_db) / total
-    valid = sum(1 for inv in _invoices_db if inv.get("status") == "valid")
-    warnings = sum(1 for inv in _invoices_db if inv.get("status") == "warning")
-    
+
     return {
         "totalInvoices": total,
-        "totalTaxableValue": total_value,
-        "totalTax": total_tax,
-        "avgConfidence": round(avg_conf, 2),
-        "validCount": valid,
-        "warningCount": warnings
+        "totalTaxableValue": totals["taxableValue"],
+        "totalTax": totals["totalTax"],
+        "avgConfidence": round(totals["confidence"] / total, 2),
+        "validCount": totals["valid"],
+        "warningCount": totals["warning"]
     }
 
+def get_breakdowns() -> Dict[str, List[Dict]]:
+    """Get totals by return period (month), place of supply and status"""
+    if _sqlite is not None:
+        return _sqlite.breakdowns(BREAKDOWN_NAMES)
+    with _write_lock:
+        return {
+            name: [{"key": key, **bucket} for key, bucket in sorted(buckets.items())]
+            for name, buckets in _breakdowns.items()
+        }
+
 def clear_all():
     """Clear all invoices - for testing only"""
-    _invoices_db.clear()
+    if _sqlite is not None:
+        with _sqlite.commit_lock:
+            _sqlite.clear()
+            feed.publish("reset", {}, get_stats(), full=True)
+        return
+    with _write_lock:
+        _invoices_db.clear()
+        _by_id.clear()
+        _by_number.clear()
+        _by_seller.clear()
+        _by_buyer.clear()
+        _by_period.clear()
+        _reset_aggregates()
+        global _version
+        _version += 1
+        feed.publish("reset", {}, get_stats(), full=True)
@@ -0,0 +1,132 @@
+"""Bounded background job queue for invoice extraction.
+
+Blocking work (file I/O, OCR, the mock extractor's sleep) runs on a fixed-size
+thread pool so request handlers never stall the event loop. Jobs are tracked
+in memory and can be polled or cancelled by id.
+"""
+import contextvars
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+MAX_WORKERS = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 4)))
+# Jobs waiting for a worker; submissions beyond this are rejected.
+MAX_PENDING = int(os.getenv("JOB_QUEUE_LIMIT", "256"))
+# Finished jobs kept around for polling before the oldest are dropped.
+MAX_FINISHED = int(os.getenv("JOB_HISTORY_LIMIT", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_futures: Dict[str, Future] = {}
+_pending = 0
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity."""
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _prune_finished() -> None:
+    finished = [jid for jid, job in _jobs.items() if job["status"] in (DONE, FAILED, CANCELLED)]
+    for jid in finished[: max(0, len(finished) - MAX_FINISHED)]:
+        _jobs.pop(jid, None)
+        _futures.pop(jid, None)
+
+
+def _run(job_id: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    global _pending
+    with _lock:
+        _pending -= 1
+        job = _jobs[job_id]
+        if job["status"] == CANCELLED:
+            return None
+        job["status"] = RUNNING
+        job["startedAt"] = _now()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        with _lock:
+            if job["status"] != CANCELLED:
+                job.update(status=FAILED, error=str(e), finishedAt=_now())
+        raise
+    with _lock:
+        # A cancel that arrives mid-run cannot interrupt the worker; the
+        # result is discarded instead.
+        if job["status"] != CANCELLED:
+            job.update(status=DONE, result=result, finishedAt=_now())
+    return result
+
+
+def submit_job(fn: Callable[..., Any], *args: Any, kind: str = "extract", **kwargs: Any) -> Dict[str, Any]:
+    """Queue ``fn(*args, **kwargs)`` and return the new job record"""
+    global _pending
+    job_id = uuid.uuid4().hex
+    with _lock:
+        if _pending >= MAX_PENDING:
+            raise QueueFullError(f"Job queue is full ({MAX_PENDING} pending)")
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "createdAt": _now(),
+            "startedAt": None,
+            "finishedAt": None,
+            "result": None,
+            "error": None,
+        }
+        _jobs[job_id] = job
+        _pending += 1
+        _prune_finished()
+        # The job sees the submitter's context (request ID, stage timings)
+        context = contextvars.copy_context()
+        _futures[job_id] = _executor.submit(context.run, _run, job_id, fn, args, kwargs)
+    return dict(job)
+
+
+def get_future(job_id: str) -> Optional[Future]:
+    """Get the future backing a job"""
+    with _lock:
+        return _futures.get(job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a snapshot of a job by ID"""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Cancel a job; queued jobs never run, running jobs have their result dropped"""
+    global _pending
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in (QUEUED, RUNNING):
+            future = _futures.get(job_id)
+            if job["status"] == QUEUED and future is not None and future.cancel():
+                _pending -= 1
+            job.update(status=CANCELLED, finishedAt=_now())
+        return dict(job)
+
+
+def queue_stats() -> Dict[str, int]:
+    """Get queue depth and worker counts"""
+    with _lock:
+        running = sum(1 for job in _jobs.values() if job["status"] == RUNNING)
+        return {"workers": MAX_WORKERS, "pending": _pending, "running": running}
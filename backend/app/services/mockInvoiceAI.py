@@ -1,14 +1,24 @@
 """Mock AI Invoice Extractor Service for demo purposes"""
 import random
+import string
 from datetime import datetime
 
+from ..gstin import PAN_HOLDER_TYPES, gstin_check_char
+
 gst_states = ["27", "36", "29", "33", "07"]  # MH, TS, KA, TN, DL
 
 def random_gstin():
-    """Generate a random valid-format GSTIN"""
+    """Generate a random valid GSTIN: state code, PAN, entity number, Z, check character"""
     state = random.choice(gst_states)
-    num = random.randint(100000000, 999999999)
-    return f"{state}ABCDE{num}Z5"
+    pan = (
+        "".join(random.choices(string.ascii_uppercase, k=3))
+        + random.choice(PAN_HOLDER_TYPES)
+        + random.choice(string.ascii_uppercase)
+        + f"{random.randint(0, 9999):04d}"
+        + random.choice(string.ascii_uppercase)
+    )
+    body = f"{state}{pan}{random.randint(1, 9)}Z"
+    return body + gstin_check_char(body)
 
 def random_invoice():
     """Generate a realistic mock invoice extraction"""
@@ -0,0 +1,148 @@
+"""Content-addressed cache for OCR and extraction results.
+
+Entries are keyed on the SHA-256 of the uploaded bytes plus the engine/config
+version, so re-uploads of the same file skip OCR entirely while a config
+change naturally misses. Two tiers: an in-memory LRU and an on-disk JSON store
+with size-based eviction (least recently used first), shared between
+processes.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+MEMORY_ENTRIES = int(os.getenv("OCR_CACHE_MEMORY_ENTRIES", "1024"))
+DISK_DIR = os.getenv("OCR_CACHE_DIR", "cache/ocr")
+DISK_MAX_BYTES = int(os.getenv("OCR_CACHE_DISK_MB", "512")) * 1024 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of raw upload bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, memory_entries: int, disk_dir: Optional[str], disk_max_bytes: int):
+        self.memory_entries = memory_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._disk_sizes: Optional[Dict[Path, int]] = None
+        self._disk_bytes = 0  # sum of _disk_sizes, kept as files come and go
+        self._lock = threading.Lock()
+        self.counters = {"memoryHits": 0, "diskHits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _disk_index(self) -> Dict[Path, int]:
+        # Built lazily from whatever earlier processes left on disk.
+        if self._disk_sizes is None:
+            self._disk_sizes = {}
+            if self.disk_dir is not None and self.disk_dir.exists():
+                for path in self.disk_dir.glob("*/*.json"):
+                    self._disk_sizes[path] = path.stat().st_size
+            self._disk_bytes = sum(self._disk_sizes.values())
+        return self._disk_sizes
+
+    def _remember(self, key: str, value: Dict) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.counters["memoryHits"] += 1
+                return value
+        if self.disk_dir is not None:
+            path = self._path(key)
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path)  # mark as recently used for eviction
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._remember(key, value)
+                    self.counters["diskHits"] += 1
+                return value
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._remember(key, value)
+            self.counters["stores"] += 1
+        if self.disk_dir is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value).encode("utf-8")
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            index = self._disk_index()
+            self._disk_bytes += len(data) - index.get(path, 0)
+            index[path] = len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        index = self._disk_index()
+        # Drop least recently used files until comfortably under the limit.
+        # Only here, once over the limit, are the files' mtimes read.
+        target = self.disk_max_bytes * 0.9
+        by_age = sorted(index, key=lambda p: p.stat().st_mtime if p.exists() else 0)
+        for path in by_age:
+            if self._disk_bytes <= target:
+                break
+            self._disk_bytes -= index.pop(path)
+            path.unlink(missing_ok=True)
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["memoryHits"] + self.counters["diskHits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hitRate": round(hits / lookups, 4) if lookups else 0,
+                "memoryEntries": len(self._memory),
+                "diskEntries": len(self._disk_index()),
+                "diskBytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for path in list(self._disk_index()):
+                path.unlink(missing_ok=True)
+            self._disk_sizes = {}
+            self._disk_bytes = 0
+
+
+_cache = ResultCache(MEMORY_ENTRIES, DISK_DIR or None, DISK_MAX_BYTES)
+
+
+def get_cached(digest: str, version: str) -> Optional[Dict]:
+    """Look up a cached result for upload hash + engine version"""
+    return _cache.get(f"{digest}-{version}")
+
+
+def put_cached(digest: str, version: str, value: Dict) -> None:
+    """Store a result for upload hash + engine version"""
+    _cache.put(f"{digest}-{version}", value)
+
+
+def cache_stats() -> Dict:
+    """Get hit/miss counters and sizes for both tiers"""
+    return _cache.stats()
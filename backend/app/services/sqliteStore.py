@@ -0,0 +1,397 @@
+"""SQLite (WAL) persistence for the invoice store.
+
+Selected with ``INVOICE_STORE=sqlite``; ``invoiceStore`` keeps its API and
+delegates here. Inserts go to a single writer thread that group-commits
+whatever queued up while the previous commit ran (up to ``INVOICE_DB_BATCH``
+rows, optionally waiting ``INVOICE_DB_FLUSH_MS`` for more) in one
+transaction, so concurrent uploads share one fsync. Each invoice is
+serialised before the transaction, and a row the database refuses is found by
+committing the batch one row at a time, so one bad invoice fails only its own
+``add``. Dashboard totals and breakdowns are summary tables updated
+in the same transaction, so reading them stays O(1).
+
+WAL lets readers run alongside the writer and several uvicorn workers share
+one database file: writers serialise on ``BEGIN IMMEDIATE`` and wait out each
+other's locks via ``busy_timeout``, then ``INVOICE_DB_BUSY_RETRIES`` retries.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DB_PATH = os.getenv("INVOICE_DB_PATH", "data/invoices.db")
+BATCH_SIZE = int(os.getenv("INVOICE_DB_BATCH", "256"))
+FLUSH_SECONDS = float(os.getenv("INVOICE_DB_FLUSH_MS", "0")) / 1000
+BUSY_TIMEOUT_MS = 10000
+# Group commits that still find the database locked after busy_timeout are
+# retried this many times, backing off from BUSY_RETRY_SECONDS
+BUSY_RETRIES = int(os.getenv("INVOICE_DB_BUSY_RETRIES", "3"))
+BUSY_RETRY_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    invoice_number TEXT,
+    invoice_date TEXT,
+    period TEXT,
+    seller_gstin TEXT,
+    buyer_gstin TEXT,
+    place_of_supply TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_invoices_number ON invoices (invoice_number);
+CREATE INDEX IF NOT EXISTS ix_invoices_seller ON invoices (seller_gstin);
+CREATE INDEX IF NOT EXISTS ix_invoices_buyer ON invoices (buyer_gstin);
+CREATE INDEX IF NOT EXISTS ix_invoices_date ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS ix_invoices_period ON invoices (period);
+CREATE INDEX IF NOT EXISTS ix_invoices_seller_period ON invoices (seller_gstin, period);
+CREATE INDEX IF NOT EXISTS ix_invoices_status ON invoices (status);
+CREATE INDEX IF NOT EXISTS ix_invoices_pos ON invoices (place_of_supply);
+CREATE TABLE IF NOT EXISTS invoice_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    count INTEGER NOT NULL,
+    taxable_value REAL NOT NULL,
+    total_tax REAL NOT NULL,
+    confidence REAL NOT NULL,
+    valid INTEGER NOT NULL,
+    warning INTEGER NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO invoice_totals (id, count, taxable_value, total_tax, confidence, valid, warning)
+    VALUES (0, 0, 0, 0, 0, 0, 0);
+CREATE TABLE IF NOT EXISTS invoice_breakdowns (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    taxable_value REAL NOT NULL,
+    total_tax REAL NOT NULL,
+    total_amount REAL NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call.
+INSERT_SQL = (
+    "INSERT INTO invoices (id, invoice_number, invoice_date, period, seller_gstin, buyer_gstin,"
+    " place_of_supply, status, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+TOTALS_SQL = (
+    "UPDATE invoice_totals SET count = count + ?, taxable_value = taxable_value + ?,"
+    " total_tax = total_tax + ?, confidence = confidence + ?, valid = valid + ?, warning = warning + ?"
+)
+BREAKDOWN_SQL = (
+    "INSERT INTO invoice_breakdowns VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (name, key) DO UPDATE SET"
+    " count = count + excluded.count, taxable_value = taxable_value + excluded.taxable_value,"
+    " total_tax = total_tax + excluded.total_tax, total_amount = total_amount + excluded.total_amount"
+)
+SELECT_SQL = "SELECT id, data FROM invoices"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # In WAL mode NORMAL only syncs at checkpoints: safe against app crashes,
+    # may lose the last commits on power loss.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def _is_busy(error: Exception) -> bool:
+    message = str(error)
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def _prepare(invoice: Dict, keys: Dict[str, Optional[str]]) -> Tuple[tuple, List[float], Dict]:
+    """Serialise one invoice: its row, its totals increments and its breakdown increments"""
+    data = {k: v for k, v in invoice.items() if k != "_id"}
+    row = (
+        invoice["_id"],
+        invoice.get("invoiceNumber"),
+        invoice.get("invoiceDate"),
+        keys.get("byMonth"),
+        invoice.get("sellerGSTIN"),
+        invoice.get("buyerGSTIN"),
+        invoice.get("placeOfSupply"),
+        invoice.get("status"),
+        json.dumps(data),
+    )
+    taxable = float(invoice.get("taxableValue", 0))
+    tax = float(invoice.get("totalTax", 0))
+    amount = float(invoice.get("totalAmount", 0))
+    totals = [
+        1,
+        taxable,
+        tax,
+        float(invoice.get("confidenceScore", 0)),
+        invoice.get("status") == "valid",
+        invoice.get("status") == "warning",
+    ]
+    breakdowns = {(name, key or "unknown"): [1, taxable, tax, amount] for name, key in keys.items()}
+    return row, totals, breakdowns
+
+
+def _row_to_invoice(row: Tuple[str, str]) -> Dict:
+    return {"_id": row[0], **json.loads(row[1])}
+
+
+class SqliteInvoiceStore:
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        batch_size: int = BATCH_SIZE,
+        flush_seconds: float = FLUSH_SECONDS,
+        on_commit: Optional[Callable[[List[Dict]], None]] = None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        # Called on the writer thread after each commit with the invoices it
+        # stored, in commit order. commit_lock is held meanwhile, so no other
+        # write from this process lands between the commit and the callback.
+        self.on_commit = on_commit
+        self.commit_lock = threading.RLock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = _connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(invoice_totals)")}
+            if "generation" not in columns:
+                # Databases created before clears were counted
+                conn.execute("ALTER TABLE invoice_totals ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        finally:
+            conn.close()
+        self._local = threading.local()
+        self._queue: "queue.Queue[Tuple[Dict, Dict[str, Optional[str]], Future]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="invoice-db-writer", daemon=True)
+        self._writer.start()
+
+    def _reader(self) -> sqlite3.Connection:
+        # One connection per thread; WAL readers never block the writer.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    # -- writes ---------------------------------------------------------
+
+    def add(self, invoice: Dict, keys: Dict[str, Optional[str]]) -> None:
+        """Queue an invoice for the next group commit and wait until it is committed"""
+        future: Future = Future()
+        self._queue.put((invoice, keys, future))
+        future.result()
+
+    def _next_batch(self) -> List[Tuple[Dict, Dict[str, Optional[str]], Future]]:
+        batch = [self._queue.get()]
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get(timeout=self.flush_seconds))
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_loop(self) -> None:
+        conn = _connect(self.path)
+        while True:
+            batch = []
+            for invoice, keys, future in self._next_batch():
+                # A bad invoice fails its own add() without sinking the batch
+                try:
+                    batch.append((invoice, _prepare(invoice, keys), future))
+                except Exception as e:
+                    future.set_exception(e)
+            if not batch:
+                continue
+            try:
+                self._commit_and_notify(conn, batch)
+            except Exception as e:
+                if len(batch) == 1 or _is_busy(e):
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                    continue
+                # Find the row the database refused (e.g. a duplicate id) by
+                # committing one at a time; the rest still go in
+                for item in batch:
+                    try:
+                        self._commit_and_notify(conn, [item])
+                    except Exception as row_error:
+                        item[2].set_exception(row_error)
+
+    def _commit_and_notify(self, conn: sqlite3.Connection, batch: List[Tuple[Dict, tuple, Future]]) -> None:
+        """Commit a batch, run ``on_commit`` and release the waiting ``add`` calls"""
+        with self.commit_lock:
+            self._commit(conn, [prepared for _, prepared, _ in batch])
+            if self.on_commit is not None:
+                try:
+                    self.on_commit([invoice for invoice, _, _ in batch])
+                except Exception:
+                    # The rows are stored; a failing listener must not fail the adds
+                    logger.exception("Invoice commit listener failed")
+        for _, _, future in batch:
+            future.set_result(None)
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[tuple, List[float], Dict]]) -> None:
+        rows = []
+        totals = [0, 0.0, 0.0, 0.0, 0, 0]
+        breakdowns: Dict[Tuple[str, str], List[float]] = {}
+        for row, row_totals, row_breakdowns in batch:
+            rows.append(row)
+            for i, value in enumerate(row_totals):
+                totals[i] += value
+            for key, values in row_breakdowns.items():
+                bucket = breakdowns.setdefault(key, [0, 0, 0, 0])
+                for i, value in enumerate(values):
+                    bucket[i] += value
+
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(INSERT_SQL, rows)
+                conn.execute(TOTALS_SQL, totals)
+                conn.executemany(BREAKDOWN_SQL, [(*key, *bucket) for key, bucket in breakdowns.items()])
+                conn.execute("COMMIT")
+                return
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Another process held the lock past busy_timeout: try again
+                if attempt == BUSY_RETRIES or not _is_busy(e):
+                    raise
+                time.sleep(BUSY_RETRY_SECONDS * 2 ** attempt)
+
+    # -- reads ----------------------------------------------------------
+
+    def _stream(self, sql: str, args: tuple = ()) -> Iterator[tuple]:
+        """
+        Rows of a query on a connection of its own, closed when the generator
+        finishes or is closed. Streaming responses resume generators on any
+        thread, so they must not hold a thread's shared reader mid-query.
+        """
+        conn = _connect(self.path)
+        try:
+            yield from conn.execute(sql, args)
+        finally:
+            conn.close()
+
+    def iter_invoices(self) -> Iterator[Dict]:
+        for row in self._stream(f"{SELECT_SQL} ORDER BY seq DESC"):
+            yield _row_to_invoice(row)
+
+    def iter_after(self, seq: int) -> Iterator[Tuple[int, Dict]]:
+        for row in self._stream("SELECT seq, id, data FROM invoices WHERE seq > ? ORDER BY seq", (seq,)):
+            yield row[0], _row_to_invoice(row[1:])
+
+    def id_at(self, seq: int) -> Optional[str]:
+        row = self._reader().execute("SELECT id FROM invoices WHERE seq = ?", (seq,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, invoice_id: str) -> Optional[Dict]:
+        conn = self._reader()
+        row = conn.execute(f"{SELECT_SQL} WHERE id = ?", (invoice_id,)).fetchone()
+        if row is None:
+            row = conn.execute(
+                f"{SELECT_SQL} WHERE invoice_number = ? ORDER BY seq DESC LIMIT 1", (invoice_id,)
+            ).fetchone()
+        return _row_to_invoice(row) if row else None
+
+    def by_gstin(self, gstin: str, role: str = "any") -> List[Dict]:
+        if role == "seller":
+            where, args = "seller_gstin = ?", (gstin,)
+        elif role == "buyer":
+            where, args = "buyer_gstin = ?", (gstin,)
+        else:
+            # Two indexed lookups instead of an OR that scans the table
+            where = "seq IN (SELECT seq FROM invoices WHERE seller_gstin = ?" \
+                    " UNION SELECT seq FROM invoices WHERE buyer_gstin = ?)"
+            args = (gstin, gstin)
+        rows = self._reader().execute(f"{SELECT_SQL} WHERE {where} ORDER BY seq DESC", args)
+        return [_row_to_invoice(row) for row in rows]
+
+    def iter_period(self, period: str, seller_gstin: Optional[str]) -> Iterator[Dict]:
+        if seller_gstin is None:
+            where, args = "period = ?", (period,)
+        else:
+            where, args = "seller_gstin = ? AND period = ?", (seller_gstin, period)
+        for row in self._stream(f"{SELECT_SQL} WHERE {where} ORDER BY coalesce(buyer_gstin, ''), seq", args):
+            yield _row_to_invoice(row)
+
+    def query(self, limit, after, gstin, status, date_from, date_to, place_of_supply) -> Tuple[List[Dict], Optional[str]]:
+        conn = self._reader()
+        where: List[str] = []
+        args: List = []
+        if after is not None:
+            row = conn.execute("SELECT seq FROM invoices WHERE id = ?", (after,)).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown cursor: {after}")
+            where.append("seq < ?")
+            args.append(row[0])
+        if gstin is not None:
+            where.append("(seller_gstin = ? OR buyer_gstin = ?)")
+            args += [gstin, gstin]
+        for column, op, value in (
+            ("status", "=", status),
+            ("place_of_supply", "=", place_of_supply),
+            ("invoice_date", ">=", date_from),
+            ("invoice_date", "<=", date_to),
+        ):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                args.append(value)
+        sql = SELECT_SQL
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            # One extra row tells whether another page follows
+            sql += " LIMIT ?"
+            args.append(limit + 1)
+        page = [_row_to_invoice(row) for row in conn.execute(sql, args)]
+        if limit is not None and len(page) > limit:
+            del page[limit:]
+            return page, page[-1]["_id"]
+        return page, None
+
+    def version(self) -> str:
+        # max(seq) moves on every insert. seq values are reused after a clear,
+        # so the generation that clear() bumps tells the two apart.
+        row = self._reader().execute("SELECT (SELECT generation FROM invoice_totals), max(seq) FROM invoices").fetchone()
+        return f"{row[0]}-{row[1] or 0}"
+
+    def totals(self) -> Dict[str, float]:
+        row = self._reader().execute(
+            "SELECT count, taxable_value, total_tax, confidence, valid, warning FROM invoice_totals"
+        ).fetchone()
+        return dict(zip(("count", "taxableValue", "totalTax", "confidence", "valid", "warning"), row))
+
+    def breakdowns(self, names) -> Dict[str, List[Dict]]:
+        result: Dict[str, List[Dict]] = {name: [] for name in names}
+        rows = self._reader().execute(
+            "SELECT name, key, count, taxable_value, total_tax, total_amount FROM invoice_breakdowns ORDER BY name, key"
+        )
+        for name, key, count, taxable, tax, amount in rows:
+            if name in result:
+                result[name].append(
+                    {"key": key, "count": count, "taxableValue": taxable, "totalTax": tax, "totalAmount": amount}
+                )
+        return result
+
+    def clear(self) -> None:
+        conn = self._reader()
+        with self.commit_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM invoices")
+            conn.execute("DELETE FROM invoice_breakdowns")
+            conn.execute("UPDATE invoice_totals SET count = 0, taxable_value = 0, total_tax = 0,"
+                         " confidence = 0, valid = 0, warning = 0, generation = generation + 1")
+            conn.execute("COMMIT")
@@ -0,0 +1,136 @@
+"""
+Request IDs, structured logs and HTTP metrics.
+
+:class:`RequestMiddleware` gives every request an ID (the client's
+``X-Request-ID`` when it sends one) and echoes it in the response. It counts
+and times requests per route template, and when the response finishes it logs
+one JSON line with the status, duration and per-stage timings from
+:func:`app.metrics.stage`. Log records from ``app.*`` loggers carry the request
+ID too, including records from job-pool threads working for the request.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from .metrics import LATENCY_BUCKETS, Counter, Gauge, Histogram, stage_timings
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "1") != "0"
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the end of the response body", ("method", "route"), LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served")
+
+logger = logging.getLogger("app.requests")
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra`` fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "requestId": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Send ``app.*`` logs to stderr as JSON (or text) with request IDs; safe to call twice"""
+    root = logging.getLogger("app")
+    if any(isinstance(f, RequestIdFilter) for h in root.handlers for f in h.filters):
+        return
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+
+class RequestMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or uuid.uuid4().hex[:16]
+        rid_token = request_id.set(rid)
+        timings_token = stage_timings.set({})
+        status = 500
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unmatched paths share one label
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc((method, path, str(status)))
+            HTTP_SECONDS.observe(elapsed, (method, path))
+            if LOG_REQUESTS and path != "/metrics":
+                logger.info(
+                    "request",
+                    extra={
+                        "method": method,
+                        "path": scope["path"],
+                        "route": path,
+                        "status": status,
+                        "ms": round(elapsed * 1000, 2),
+                        "stages": stage_timings.get(),
+                    },
+                )
+            stage_timings.reset(timings_token)
+            request_id.reset(rid_token)
@@ -0,0 +1,289 @@
+"""
+Upload spooling and retention.
+
+Request bodies are streamed to ``UPLOAD_DIR`` in chunks without blocking the
+event loop. The first chunk is sniffed for a supported file type, and the size
+cap is enforced as bytes arrive. The SHA-256 is computed while writing.
+
+Upload routes register a body limit with :func:`limit_request_body`, and
+:class:`UploadLimitMiddleware` enforces it before the multipart body is
+parsed: from ``Content-Length`` when given, else while the body streams in.
+So an oversized request gets ``413`` without being spooled to disk first. Files
+are stored under their content hash (or a random UUID with
+``UPLOAD_NAMING=uuid``), so concurrent uploads of ``scan.jpg`` never collide.
+The spooled bytes are handed to OCR in memory, so nothing is read back from
+disk.
+
+``compact_uploads`` enforces the retention window and size budget of the
+directory. :func:`upload_lifespan` runs it periodically;
+``python -m app.uploads`` runs it once.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, FrozenSet, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import stage
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", "20")) * 1024 * 1024
+# ZIP batches hold many invoices, so they get their own cap
+UPLOAD_ZIP_MAX_BYTES = int(os.getenv("UPLOAD_ZIP_MAX_MB", "512")) * 1024 * 1024
+UPLOAD_NAMING = os.getenv("UPLOAD_NAMING", "hash")  # "hash" or "uuid"
+UPLOAD_RETENTION_DAYS = float(os.getenv("UPLOAD_RETENTION_DAYS", "30"))
+UPLOAD_DIR_MAX_BYTES = int(os.getenv("UPLOAD_DIR_MAX_MB", "2048")) * 1024 * 1024
+UPLOAD_COMPACT_INTERVAL = float(os.getenv("UPLOAD_COMPACT_INTERVAL", "3600"))  # seconds, 0 disables
+CHUNK_BYTES = 1024 * 1024
+# Room for multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD = 64 * 1024
+# Partial files older than this belong to a crashed request
+STALE_PART_SECONDS = 3600
+
+# (magic bytes, content type, extension); WEBP is RIFF....WEBP, checked separately
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"II*\x00", "image/tiff", ".tif"),
+    (b"MM\x00*", "image/tiff", ".tif"),
+    (b"BM", "image/bmp", ".bmp"),
+    (b"%PDF-", "application/pdf", ".pdf"),
+    (b"PK\x03\x04", "application/zip", ".zip"),
+)
+IMAGE_TYPES: FrozenSet[str] = frozenset({"image/jpeg", "image/png", "image/tiff", "image/bmp", "image/webp"})
+PDF_TYPES: FrozenSet[str] = frozenset({"application/pdf"})
+ZIP_TYPES: FrozenSet[str] = frozenset({"application/zip"})
+
+
+def sniff_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """(content type, extension) from a file's leading bytes, or None if unsupported"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    for magic, content_type, ext in _SIGNATURES:
+        if head.startswith(magic):
+            return content_type, ext
+    return None
+
+
+@dataclass
+class SpooledUpload:
+    filename: str
+    content_type: str
+    digest: str
+    size: int
+    path: Path
+    content: bytes
+
+    def open(self) -> BinaryIO:
+        """In-memory file handle over the upload, for readers that want one"""
+        return io.BytesIO(self.content)
+
+
+# Request path -> most body bytes accepted, filled by limit_request_body()
+_BODY_LIMITS: Dict[str, int] = {}
+
+
+def limit_request_body(path: str, max_bytes: int) -> str:
+    """Register the body limit for an upload route; returns ``path`` for the route decorator"""
+    _BODY_LIMITS[path] = max_bytes + MULTIPART_OVERHEAD
+    return path
+
+
+class UploadLimitMiddleware:
+    """Pure ASGI middleware rejecting bodies over their route's limit before they are read"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = _BODY_LIMITS.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse({"detail": _too_large(limit).detail}, status_code=413)
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            # Chunked bodies have no length: count as they stream in
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _limit(content_type: str, max_bytes: int) -> int:
+    return max(max_bytes, UPLOAD_ZIP_MAX_BYTES) if content_type in ZIP_TYPES else max_bytes
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {limit // (1024 * 1024)} MB")
+
+
+async def spool_upload(
+    file: UploadFile,
+    allowed: FrozenSet[str] = IMAGE_TYPES,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+) -> SpooledUpload:
+    """
+    Stream an upload to disk, hashing as it goes. Raises 415 for unsupported
+    types (checked on the first chunk), 413 once it passes the size cap and 400
+    for an empty file.
+    """
+    with stage("upload"):
+        return await _spool(file, allowed, max_bytes)
+
+
+async def _spool(file: UploadFile, allowed: FrozenSet[str], max_bytes: int) -> SpooledUpload:
+    # Starlette knows the size once the multipart part is parsed; reject early
+    ceiling = _limit("application/zip", max_bytes) if allowed & ZIP_TYPES else max_bytes
+    if file.size is not None and file.size > ceiling:
+        raise _too_large(ceiling)
+
+    part = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    chunks = []
+    size = 0
+    sniffed = None
+    try:
+        out = await run_in_threadpool(_open_part, part)
+        try:
+            while True:
+                chunk = await file.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                if sniffed is None:
+                    sniffed = sniff_type(chunk)
+                    if sniffed is None or sniffed[0] not in allowed:
+                        raise HTTPException(
+                            status_code=415,
+                            detail=f"Unsupported file type for {file.filename!r}; expected {', '.join(sorted(allowed))}",
+                        )
+                    limit = _limit(sniffed[0], max_bytes)
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(limit)
+                hasher.update(chunk)
+                chunks.append(chunk)
+                await run_in_threadpool(out.write, chunk)
+        finally:
+            await run_in_threadpool(out.close)
+        if sniffed is None:
+            raise HTTPException(status_code=400, detail=f"Empty upload {file.filename!r}")
+
+        digest = hasher.hexdigest()
+        name = digest if UPLOAD_NAMING == "hash" else uuid.uuid4().hex
+        path = UPLOAD_DIR / f"{name}{sniffed[1]}"
+        await run_in_threadpool(_keep_part, part, path)
+    except BaseException:
+        await run_in_threadpool(part.unlink, missing_ok=True)
+        raise
+
+    return SpooledUpload(
+        filename=file.filename or path.name,
+        content_type=sniffed[0],
+        digest=digest,
+        size=size,
+        path=path,
+        content=b"".join(chunks),
+    )
+
+
+def _open_part(part: Path) -> BinaryIO:
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    return open(part, "wb")
+
+
+def _keep_part(part: Path, path: Path) -> None:
+    """Move a finished partial file to its final name"""
+    if path.exists():
+        part.unlink()  # same bytes already stored
+        os.utime(path)  # retention counts from the latest upload
+    else:
+        os.replace(part, path)
+
+
+def compact_uploads(
+    retention_days: float = UPLOAD_RETENTION_DAYS,
+    max_bytes: int = UPLOAD_DIR_MAX_BYTES,
+) -> Dict[str, int]:
+    """
+    Delete abandoned partial files, uploads older than ``retention_days`` and
+    then the oldest uploads until the directory fits in ``max_bytes``.
+    """
+    removed = {"partial": 0, "expired": 0, "evicted": 0, "bytesFreed": 0, "bytesKept": 0}
+    if not UPLOAD_DIR.exists():
+        return removed
+    now = time.time()
+    kept = []
+    for path in UPLOAD_DIR.iterdir():
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # removed meanwhile
+        if not path.is_file():
+            continue
+        if path.name.startswith("."):
+            if now - st.st_mtime > STALE_PART_SECONDS:
+                path.unlink(missing_ok=True)
+                removed["partial"] += 1
+                removed["bytesFreed"] += st.st_size
+            continue
+        if retention_days > 0 and now - st.st_mtime > retention_days * 86400:
+            path.unlink(missing_ok=True)
+            removed["expired"] += 1
+            removed["bytesFreed"] += st.st_size
+            continue
+        kept.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in kept)
+    for _, size, path in sorted(kept):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed["evicted"] += 1
+        removed["bytesFreed"] += size
+    removed["bytesKept"] = total
+    return removed
+
+
+@asynccontextmanager
+async def upload_lifespan(app) -> AsyncIterator[None]:
+    """App lifespan that runs :func:`compact_uploads` every ``UPLOAD_COMPACT_INTERVAL`` seconds"""
+    async def loop() -> None:
+        while True:
+            await run_in_threadpool(compact_uploads)
+            await asyncio.sleep(UPLOAD_COMPACT_INTERVAL)
+
+    task = asyncio.create_task(loop()) if UPLOAD_COMPACT_INTERVAL > 0 else None
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    print(compact_uploads())
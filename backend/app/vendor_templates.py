@@ -0,0 +1,401 @@
+"""
+Vendor templates: extraction rules for suppliers with a fixed layout.
+
+Each ``*.json`` file in ``VENDOR_TEMPLATE_DIR`` describes one vendor, keyed
+by its GSTIN:
+
+.. code-block:: json
+
+    {
+      "gstin": "27ABCPE1234F1ZB",
+      "name": "Example Traders",
+      "fields": {
+        "invoice_no": {"label": "Bill No", "value": "[A-Z]+/[0-9]+"},
+        "invoice_date": {"label": "Dated"},
+        "taxable_value": {"label": "Amount before tax"},
+        "invoice_value": {"label": "Invoice Total", "line": 1}
+      },
+      "regions": [[0, 0, 1, 0.25], [0.5, 0.75, 1, 1]]
+    }
+
+A field rule has a ``label`` (matched case-insensitively) and/or a
+``value`` regex. The value is read from the rest of the label's line, or
+``line`` lines below (negative: above). ``pick`` chooses the ``first`` or
+``last`` match on that line; amounts default to the last, like the generic
+scanner. A rule without a label searches the whole text for ``value``. If
+``value`` has a group, group 1 is the value. ``regions`` are optional
+``[left, top, right, bottom]`` page fractions. For these vendors,
+``roi_ocr`` reads only those regions after finding the GSTIN at the top of
+the page.
+
+All of a template's labels are compiled into one regex, so a page is
+scanned once. :func:`scan_invoice` picks the template of the first GSTIN on
+the page that has one. OCR misreads are mapped back to a vendor through
+``check_gstin``'s suggestions, and the lookup is cached per GSTIN. When the
+template finds the invoice number, date, taxable value, total and either
+IGST or CGST and SGST, the generic scan is skipped. Otherwise it fills the gaps and the template's values win. The directory is re-read at
+most every ``VENDOR_TEMPLATE_RELOAD`` seconds when its files change, so
+templates can be edited without a restart. A broken file is skipped and
+reported, and the others stay loaded.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .gstin import CANDIDATE_CHARS, GSTIN_CACHE_SIZE, check_gstin, is_gstin_candidate
+from .metrics import Counter
+from .scanner import AMOUNT_FIELDS, AMOUNT_TOKEN_RE, TextScan, scan_invoice_text
+
+VENDOR_TEMPLATE_DIR = os.getenv("VENDOR_TEMPLATE_DIR", "vendor_templates")
+VENDOR_TEMPLATE_RELOAD = float(os.getenv("VENDOR_TEMPLATE_RELOAD", "5"))  # seconds between change checks
+# Top of the page OCRed first to find the GSTIN, for vendors with regions
+VENDOR_PROBE_FRACTION = float(os.getenv("VENDOR_PROBE_FRACTION", "0.25"))
+
+TEMPLATE_FIELDS = ("invoice_no", "invoice_date") + AMOUNT_FIELDS
+# A template scan is complete without the generic scan when it has these plus
+# the taxes of one kind: IGST (inter-state) or CGST and SGST (intra-state).
+# total_tax is derived from the components when absent.
+REQUIRED_FIELDS = ("invoice_no", "invoice_date", "taxable_value", "invoice_value")
+TAX_FIELDS = (("igst",), ("cgst", "sgst"))
+_DEFAULT_VALUES = {
+    "invoice_no": r"[A-Za-z0-9][A-Za-z0-9/-]*",
+    "invoice_date": r"\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}",
+    **{name: AMOUNT_TOKEN_RE.pattern for name in AMOUNT_FIELDS},
+}
+# Lookarounds and explicit ranges rather than \b and re.I, which make this slower
+# GSTIN candidates, OCR confusions allowed; is_gstin_candidate picks the real ones
+_GSTIN_RE = re.compile(
+    "(?<![0-9A-Za-z])"
+    + "".join(f"[{chars}{chars.lower()}]" for chars in CANDIDATE_CHARS)
+    + "(?![0-9A-Za-z])"
+)
+
+TEMPLATE_SCANS = Counter(
+    "vendor_template_scans_total",
+    "Invoice texts by how they were scanned: template, template plus generic fallback, or generic",
+    ("result",),
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    field: str
+    label: Optional[str]
+    value: re.Pattern
+    line: int = 0
+    last: bool = False  # take the last match on the line instead of the first
+
+    def read(self, line: str) -> Optional[str]:
+        matches = self.value.finditer(line)
+        for m in reversed(list(matches)) if self.last else matches:
+            text = m.group(1) if self.value.groups else m.group()
+            if self.field not in AMOUNT_FIELDS or _amount(text) is not None:
+                return text
+        return None
+
+
+def _amount(text: str) -> Optional[float]:
+    try:
+        value = float(text.replace(",", ""))
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def _label_pattern(label: str) -> str:
+    # OCR may put any run of spaces between the words, or none
+    return "[ \t]*".join(re.escape(word) for word in label.lower().split())
+
+
+@dataclass(frozen=True)
+class VendorTemplate:
+    gstin: str
+    name: str
+    rules: Tuple[FieldRule, ...]
+    regions: Tuple[Tuple[float, float, float, float], ...] = ()
+    source: str = ""
+    labels: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    # Matched label text, spaces removed -> indexes of the rules with that label
+    label_rules: Dict[str, Tuple[int, ...]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        label_rules: Dict[str, Tuple[int, ...]] = {}
+        for i, rule in enumerate(self.rules):
+            if rule.label:
+                key = "".join(rule.label.lower().split())
+                label_rules[key] = label_rules.get(key, ()) + (i,)
+        # One alternation over every label, longest first and with no groups,
+        # so the regex engine can skip ahead on the first character (see scanner.py)
+        labels = sorted({rule.label.lower() for rule in self.rules if rule.label}, key=len, reverse=True)
+        object.__setattr__(self, "labels", re.compile("|".join(map(_label_pattern, labels))) if labels else None)
+        object.__setattr__(self, "label_rules", label_rules)
+
+    def extract(self, text: str) -> Dict[str, str]:
+        """Field -> value text for every rule that matched"""
+        lines = text.split("\n")
+        found: Dict[str, str] = {}
+        pending = {i for i, rule in enumerate(self.rules) if rule.label}
+        if self.labels is not None:
+            lower = text.lower()
+            line_no = last = 0
+            for m in self.labels.finditer(lower):
+                start, end = m.span()
+                line_no += lower.count("\n", last, start)
+                last = start
+                for index in self.label_rules["".join(m.group().split())]:
+                    if index not in pending:
+                        continue
+                    rule = self.rules[index]
+                    target = line_no + rule.line
+                    if not 0 <= target < len(lines):
+                        continue
+                    if rule.line == 0:
+                        # On the label's own line only the text after the label counts
+                        line = lines[target][end - (lower.rfind("\n", 0, start) + 1):]
+                    else:
+                        line = lines[target]
+                    value = rule.read(line)
+                    if value is not None:
+                        found.setdefault(rule.field, value)
+                        pending.discard(index)
+                if not pending:
+                    break
+        for rule in self.rules:
+            if not rule.label and rule.field not in found:
+                value = rule.read(text)
+                if value is not None:
+                    found[rule.field] = value
+        return found
+
+    @property
+    def fields(self) -> Set[str]:
+        """The fields this template has rules for"""
+        return {rule.field for rule in self.rules}
+
+    def scan(self, text: str, gstins: List[str]) -> Tuple[TextScan, Set[str]]:
+        """
+        The template's fields as a :class:`TextScan`, and the fields still
+        needed for a complete scan (:data:`REQUIRED_FIELDS` and the smaller
+        set of :data:`TAX_FIELDS` left, if neither was found)
+        """
+        found = self.extract(text)
+        scan = TextScan(gstins=gstins, gstin=self.gstin, template=self.gstin)
+        for name in AMOUNT_FIELDS:
+            if name in found:
+                scan.amounts[name] = _amount(found[name])
+        scan.invoice_no = found.get("invoice_no")
+        scan.invoice_date = found.get("invoice_date")
+        if "invoice_value" in found:
+            scan.total_amount = found["invoice_value"].replace(",", "")
+        missing = set(REQUIRED_FIELDS) - set(found)
+        if not any(set(taxes) <= set(found) for taxes in TAX_FIELDS):
+            missing |= min((set(taxes) - set(found) for taxes in TAX_FIELDS), key=len)
+        return scan, missing
+
+    def to_dict(self) -> dict:
+        return {
+            "gstin": self.gstin,
+            "name": self.name,
+            "fields": sorted(self.fields),
+            "regions": [list(region) for region in self.regions],
+            "source": self.source,
+        }
+
+
+def _compile_rule(name: str, spec: dict) -> FieldRule:
+    if name not in TEMPLATE_FIELDS:
+        raise ValueError(f"unknown field {name!r}; expected some of {', '.join(TEMPLATE_FIELDS)}")
+    unknown = set(spec) - {"label", "value", "line", "pick"}
+    if unknown:
+        raise ValueError(f"field {name}: unknown keys {', '.join(sorted(unknown))}")
+    label = spec.get("label")
+    if not label and not spec.get("value"):
+        raise ValueError(f"field {name}: needs a label or a value pattern")
+    pick = spec.get("pick", "last" if name in AMOUNT_FIELDS else "first")
+    if pick not in ("first", "last"):
+        raise ValueError(f"field {name}: pick must be 'first' or 'last'")
+    try:
+        value = re.compile(spec.get("value") or _DEFAULT_VALUES[name])
+    except re.error as e:
+        raise ValueError(f"field {name}: bad value pattern: {e}")
+    return FieldRule(name, label, value, int(spec.get("line", 0)), pick == "last")
+
+
+def compile_template(spec: dict, source: str = "") -> VendorTemplate:
+    """Validate one template definition and compile its rules"""
+    check = check_gstin(str(spec.get("gstin", "")))
+    if not check.valid:
+        raise ValueError(f"invalid GSTIN {check.gstin!r}: {'; '.join(check.errors)}")
+    fields = spec.get("fields")
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError("'fields' must map field names to rules")
+    regions = []
+    for region in spec.get("regions", []):
+        if (
+            len(region) != 4
+            or not all(0 <= v <= 1 for v in region)
+            or region[0] >= region[2]
+            or region[1] >= region[3]
+        ):
+            raise ValueError(f"region {region} is not [left, top, right, bottom] page fractions")
+        regions.append(tuple(float(v) for v in region))
+    rules = tuple(_compile_rule(name, rule) for name, rule in fields.items())
+    return VendorTemplate(check.gstin, spec.get("name") or check.gstin, rules, tuple(regions), source)
+
+
+class TemplateRegistry:
+    """Templates loaded from a directory, reloaded when its files change"""
+
+    def __init__(self, directory: str = VENDOR_TEMPLATE_DIR, interval: float = VENDOR_TEMPLATE_RELOAD):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.templates: Dict[str, VendorTemplate] = {}
+        self.errors: Dict[str, str] = {}
+        self.version = "none"
+        self.loaded_at: Optional[float] = None
+        self._signature: Optional[tuple] = None
+        self._checked = float("-inf")
+        self._lookup = lru_cache(maxsize=GSTIN_CACHE_SIZE)(self._find)
+        self._lock = threading.Lock()
+
+    def _files(self) -> tuple:
+        try:
+            entries = sorted(self.directory.glob("*.json"))
+        except OSError:
+            return ()
+        signature = []
+        for path in entries:
+            try:
+                stat = path.stat()
+            except OSError:  # deleted while listing
+                continue
+            signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self) -> dict:
+        """Re-read every template file now"""
+        with self._lock:
+            signature = self._files()
+            templates: Dict[str, VendorTemplate] = {}
+            errors: Dict[str, str] = {}
+            digest = hashlib.sha1()
+            for name, _, _ in signature:
+                path = self.directory / name
+                try:
+                    raw = path.read_bytes()
+                    template = compile_template(json.loads(raw), name)
+                    if template.gstin in templates:
+                        raise ValueError(f"GSTIN {template.gstin} is already in {templates[template.gstin].source}")
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    errors[name] = str(e)
+                    logger.error("Vendor template skipped", extra={"file": name, "error": str(e)})
+                    continue
+                templates[template.gstin] = template
+                digest.update(raw)
+            # Swapped in whole, so a concurrent scan sees the old set or the new one
+            self.templates, self.errors = templates, errors
+            self._lookup = lru_cache(maxsize=GSTIN_CACHE_SIZE)(self._find)
+            self._signature = signature
+            self._checked = time.monotonic()
+            self.loaded_at = time.time()
+            self.version = digest.hexdigest()[:12] if templates else "none"
+            if self.has_regions():
+                self.version += f"-{VENDOR_PROBE_FRACTION}"
+        logger.info("Vendor templates loaded", extra={"templates": len(templates), "errors": len(errors)})
+        return self.stats()
+
+    def refresh(self) -> None:
+        """Reload if the directory changed, checking at most every ``interval`` seconds"""
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return
+        self._checked = now
+        if self._files() != self._signature:
+            self.reload()
+
+    def has_regions(self) -> bool:
+        return any(template.regions for template in self.templates.values())
+
+    def _find(self, gstin: str) -> Optional[VendorTemplate]:
+        templates = self.templates
+        template = templates.get(gstin)
+        if template is None:
+            known = [templates[s] for s in check_gstin(gstin).suggestions if s in templates]
+            template = known[0] if len(known) == 1 else None
+        return template
+
+    def lookup(self, gstin: str) -> Optional[VendorTemplate]:
+        """Template for ``gstin``, or for the one vendor it may be an OCR misread of (cached until reload)"""
+        return self._lookup(gstin.upper())
+
+    def detect(self, text: str) -> Tuple[Optional[VendorTemplate], List[str]]:
+        """Template of the first GSTIN in ``text`` that has one, and every GSTIN found"""
+        self.refresh()
+        gstins = [m.upper() for m in _GSTIN_RE.findall(text) if is_gstin_candidate(m)]
+        if self.templates:
+            for i, gstin in enumerate(gstins):
+                template = self.lookup(gstin)
+                if template is not None:
+                    gstins[i] = template.gstin  # the vendor's, if this was a misread
+                    return template, gstins
+        return None, gstins
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "version": self.version,
+            "loadedAt": self.loaded_at,
+            "templates": [template.to_dict() for template in self.templates.values()],
+            "errors": self.errors,
+        }
+
+
+registry = TemplateRegistry()
+
+
+@lru_cache(maxsize=64)
+def _scan(text: str, version: str) -> TextScan:
+    template, gstins = registry.detect(text) if registry.templates else (None, [])
+    if template is None:
+        TEMPLATE_SCANS.inc(("generic",))
+        return scan_invoice_text(text)
+    scan, missing = template.scan(text, gstins)
+    if not missing:
+        TEMPLATE_SCANS.inc(("template",))
+        return scan
+    # Fields the template has no rule for, a drifted layout or a garbled
+    # label: the generic scan fills the gaps
+    TEMPLATE_SCANS.inc(("fallback",))
+    generic = scan_invoice_text(text)
+    amounts = {name: scan.amounts[name] if scan.amounts[name] is not None else value for name, value in generic.amounts.items()}
+    return replace(
+        generic,
+        amounts=amounts,
+        gstin=scan.gstin,
+        invoice_no=scan.invoice_no or generic.invoice_no,
+        invoice_date=scan.invoice_date or generic.invoice_date,
+        total_amount=scan.total_amount or generic.total_amount,
+        template=scan.template,
+    )
+
+
+def scan_invoice(text: str) -> TextScan:
+    """
+    Fields of an invoice text: from the vendor's template when the invoice
+    carries a known GSTIN, else from the generic single-pass scanner.
+    Shared via a small cache: treat as read-only.
+    """
+    registry.refresh()
+    return _scan(text, registry.version)
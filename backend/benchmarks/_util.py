@@ -0,0 +1,121 @@
+"""Shared helpers for the benchmark scripts (run from the backend folder)."""
+from __future__ import annotations
+
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from PIL import Image, ImageDraw
+
+try:  # Unix only
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ru_maxrss is in bytes on macOS, KiB on Linux and the BSDs
+_MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp"}
+
+SAMPLE_LINES = [
+    "TAX INVOICE",
+    "GSTIN: 27ABCPE1234F1ZB",
+    "Invoice No: INV-10234   Date: 12/03/2026",
+    "Rice Bags       10 x 250.00      2,500.00",
+    "Cooking Oil      4 x 180.00        720.00",
+    "Taxable Value                    3,220.00",
+    "CGST 9%                            289.80",
+    "SGST 9%                            289.80",
+    "Grand Total                      3,799.60",
+]
+
+
+def render_text_image(lines: Iterable[str] = SAMPLE_LINES, size=(1200, 600)) -> bytes:
+    """Render plain text lines to a PNG, for benchmarks that need no corpus."""
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + i * 50), line, fill=0)
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def load_images(directory: Optional[str], count: int = 20) -> List[bytes]:
+    """Read images from ``directory``, or render ``count`` synthetic ones."""
+    if directory:
+        paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        return [p.read_bytes() for p in paths]
+    return [render_text_image() for _ in range(count)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, or None without ``resource`` (Windows)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_BYTES / 2**20
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process and its finished children (this process only on Windows)."""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class PeakMemory:
+    """
+    Extra peak memory of a ``with`` block in MB (``extra_mb``): the growth of
+    peak RSS, or where that is unavailable the tracemalloc peak, which misses
+    Pillow's pixel buffers and slows the block down (``source`` says which).
+    """
+
+    def __enter__(self) -> "PeakMemory":
+        self.base = peak_rss_mb()
+        self.source = "rss" if self.base is not None else "tracemalloc"
+        if self.base is None:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.base is None:
+            self.extra_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        else:
+            self.extra_mb = peak_rss_mb() - self.base
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def time_each(fn: Callable, items: Iterable) -> List[float]:
+    """Call ``fn`` on every item and return per-call latencies in seconds."""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> dict:
+    total = sum(latencies)
+    row = {
+        "name": name,
+        "n": len(latencies),
+        "per_sec": len(latencies) / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    print(f"{name:<28} n={row['n']:<7} {row['per_sec']:>10.1f}/s  p50={row['p50_ms']:.2f}ms  p99={row['p99_ms']:.2f}ms")
+    return row
@@ -0,0 +1,105 @@
+"""
+Tax analytics over a large invoice set: loading the columnar copy, memory
+per invoice, and group-by queries against the same totals computed with a
+Python loop over the invoice dicts.
+
+Invoices are ``--vendors`` distinct mock invoices repeated ``--count`` times,
+with dates spread over ``--days`` days, so generating them stays cheap.
+
+    python -m benchmarks.bench_analytics [--count 1000000] [--vendors 2000] [--days 730]
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import datetime
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+from app.services.invoiceColumns import InvoiceColumns
+from app.services.mockInvoiceAI import random_invoice
+
+QUERIES = [
+    ("by month", dict(group_by=["month"])),
+    ("by quarter, state", dict(group_by=["quarter", "state"])),
+    ("by seller, top 10 by tax", dict(group_by=["seller"], sort="totalTax", limit=10)),
+    ("by hsn (line items)", dict(group_by=["hsn"])),
+    ("one state, one year, by week", dict(group_by=["week"], date_from="2025-01-01", date_to="2025-12-31")),
+]
+
+
+def make_invoices(count: int, vendors: int, days: int, seed: int) -> list:
+    random.seed(seed)
+    templates = [random_invoice() for _ in range(vendors)]
+    start = datetime.date(2024, 4, 1)
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    rng = random.Random(seed)
+    return [{**rng.choice(templates), "invoiceDate": rng.choice(dates)} for _ in range(count)]
+
+
+def loop_month_state(invoices: list) -> dict:
+    """What the columns replace: one pass over the dicts per query"""
+    totals = defaultdict(lambda: [0, 0.0])
+    for inv in invoices:
+        bucket = totals[(inv["invoiceDate"][:7], inv.get("placeOfSupply"))]
+        bucket[0] += 1
+        bucket[1] += inv.get("totalTax") or 0
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--vendors", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    invoices = make_invoices(args.count, args.vendors, args.days, args.seed)
+    # Repeated invoices share their items and strings, so size up distinct copies
+    sample = [copy.deepcopy(inv) for inv in invoices[:1000]]
+    tracemalloc.start()
+    sample = copy.deepcopy(sample)
+    dict_bytes = tracemalloc.get_traced_memory()[0] / len(sample)
+    tracemalloc.stop()
+
+    columns = InvoiceColumns()
+    start = time.perf_counter()
+    columns.extend(enumerate(invoices, 1))
+    elapsed = time.perf_counter() - start
+    stats = columns.stats()
+    print(f"load {args.count:,} invoices ({stats['items']:,} items)   {elapsed:.2f} s  "
+          f"({args.count / elapsed:,.0f} invoices/s)")
+    print(f"memory per invoice: dicts {dict_bytes:,.0f} B, "
+          f"columns {stats['bytes'] / args.count:,.0f} B")
+
+    state = invoices[0]["placeOfSupply"]
+    queries = QUERIES[:-1] + [(QUERIES[-1][0], {**QUERIES[-1][1], "filters": {"state": state}})]
+    for name, query in queries:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = columns.aggregate(**query)
+            times.append(time.perf_counter() - start)
+        print(f"{name:<30} {min(times) * 1000:>8.1f} ms  ({len(result['groups'])} groups, "
+              f"{result['matched']:,} {result['level']}s)")
+
+    start = time.perf_counter()
+    expected = loop_month_state(invoices)
+    loop_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    result = columns.aggregate(["month", "state"], ["count", "totalTax"])
+    column_ms = (time.perf_counter() - start) * 1000
+    assert len(result["groups"]) == len(expected)
+    for group in result["groups"]:
+        count, tax = expected[(group["month"], group["state"])]
+        assert group["count"] == count and abs(group["totalTax"] - tax) < 0.01 * max(1, abs(tax)) / 1e4
+    print(f"by month, state: python loop {loop_ms:,.0f} ms, columns {column_ms:,.1f} ms "
+          f"({loop_ms / column_ms:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
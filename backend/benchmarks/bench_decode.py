@@ -0,0 +1,123 @@
+"""
+Decode + preprocess cost per photo: the legacy full-resolution decode and
+upscale rule vs the pixel-budgeted decode (JPEG draft mode, ~300 DPI target,
+hard pixel ceiling) with the memory guard.
+
+Each mode runs in a fresh child process over the same images, ``--threads``
+at a time like the job pool, and reports p50/p99 latency and peak RSS. Pass
+``--images`` with a folder of real phone photos; otherwise a synthetic set is
+generated (12 MP and 48 MP photos, a 400x3000 receipt strip, a thumbnail and
+a screenshot).
+
+    python -m benchmarks.bench_decode [--images path/to/photos] [--threads 4] [--ocr]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageOps
+
+from ._util import IMAGE_SUFFIXES, SAMPLE_LINES, PeakMemory, percentile
+
+MODES = ("legacy", "budget")
+
+
+def legacy_preprocess(path: str) -> Image.Image:
+    """The decode and upscale rule before the pixel budget."""
+    from app.preprocess import PREPROCESS_PIPELINE, run_pipeline
+
+    image = Image.open(path)
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("RGB")
+    image = image.convert("L")
+    image = ImageOps.exif_transpose(image)
+    width, height = image.size
+    if width < 1000 or height < 1000:
+        scale = max(2, 2000 // min(width, height))
+        image = image.resize((width * scale, height * scale), Image.Resampling.LANCZOS)
+    return run_pipeline(image, PREPROCESS_PIPELINE)
+
+
+def budget_preprocess(path: str) -> Image.Image:
+    from app.image_budget import estimate_bytes, memory_budget
+    from app.ocr_engine import preprocess_image
+
+    with memory_budget.reserve(estimate_bytes(Image.open(path))):
+        return preprocess_image(path)
+
+
+def _photo(width: int, height: int) -> Image.Image:
+    image = Image.effect_noise((width, height), 24).point(lambda x: min(255, x + 100)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, height - 40, 40):
+        draw.text((60, i + 10), SAMPLE_LINES[(i // 40) % len(SAMPLE_LINES)] * 4, fill=(20, 20, 20))
+    return image
+
+
+def synthetic_set(directory: Path) -> None:
+    for name, size in (("photo12mp_a", (4000, 3000)), ("photo12mp_b", (3000, 4000)),
+                       ("photo48mp", (8000, 6000)), ("receipt_strip", (400, 3000)),
+                       ("thumbnail", (200, 300))):
+        _photo(*size).save(directory / f"{name}.jpg", quality=90)
+    _photo(1200, 1600).save(directory / "screenshot.png")
+
+
+def _child(mode: str, directory: str, threads: int, ocr: bool) -> None:
+    paths = sorted(str(p) for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    prepare = legacy_preprocess if mode == "legacy" else budget_preprocess
+
+    def run(path: str) -> float:
+        start = time.perf_counter()
+        image = prepare(path)
+        if ocr:
+            from app.ocr_engine import recognize
+            recognize(image)
+        return time.perf_counter() - start
+
+    with PeakMemory() as memory, ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(run, paths * 2))
+    print(json.dumps({"latencies": latencies, "extra_mb": memory.extra_mb, "memory": memory.source}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", help="folder of photos (default: synthetic set)")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ocr", action="store_true", help="include Tesseract (needs tesseract)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--generate", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.images, args.threads, args.ocr)
+        return
+    if args.generate:
+        synthetic_set(Path(args.generate))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.images
+        if directory is None:
+            directory = tmp
+            # In a child too: peak RSS carries over from parent to child processes
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_decode", "--generate", tmp], check=True)
+        print(f"{directory}: {args.threads} threads" + (", with OCR" if args.ocr else ""))
+        for mode in MODES:
+            cmd = [sys.executable, "-m", "benchmarks.bench_decode", "--child", mode,
+                   "--images", directory, "--threads", str(args.threads)]
+            out = subprocess.run(cmd + (["--ocr"] if args.ocr else []), check=True, capture_output=True, text=True)
+            row = json.loads(out.stdout)
+            ms = [s * 1000 for s in row["latencies"]]
+            print(f"{mode:<7} p50 {percentile(ms, 50):8.1f} ms  p99 {percentile(ms, 99):8.1f} ms  "
+                  f"peak +{row['extra_mb']:.0f} MB ({row['memory']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare OCR engines on the same corpus: throughput, latency, mean word
+confidence and field-level accuracy.
+
+Images are OCRed by ``--concurrency`` threads at once, so engines that
+micro-batch (rapidocr) get concurrent requests to batch. Accuracy is checked
+against ``--truth``, a JSON object mapping image file names to their expected
+fields (``gstin``, ``invoice_no``, ``taxable_value``, ``invoice_value``).
+Without it, the synthetic corpus' known values are used.
+
+    python -m benchmarks.bench_engines [--images DIR --truth truth.json] [--count 20] [--concurrency 4]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from app.ocr_backends import available_engines, get_engine
+from app.ocr_engine import prepare_image
+from app.scanner import scan_invoice_text
+
+from ._util import IMAGE_SUFFIXES, percentile, render_text_image
+
+FIELDS = ("gstin", "invoice_no", "taxable_value", "invoice_value")
+# Values printed on the synthetic invoice (SAMPLE_LINES)
+SYNTHETIC_TRUTH = {"gstin": "27ABCPE1234F1ZB", "invoice_no": "INV-10234", "taxable_value": 3220.0, "invoice_value": 3799.6}
+
+
+def load_corpus(directory, truth_path, count):
+    if not directory:
+        return [(f"synthetic-{i}", render_text_image(), SYNTHETIC_TRUTH) for i in range(count)]
+    truth = json.loads(Path(truth_path).read_text()) if truth_path else {}
+    paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return [(p.name, p.read_bytes(), truth.get(p.name, {})) for p in paths]
+
+
+def fields(text: str) -> dict:
+    scan = scan_invoice_text(text)
+    return {
+        "gstin": scan.gstin,
+        "invoice_no": scan.invoice_no,
+        "taxable_value": scan.amounts["taxable_value"],
+        "invoice_value": scan.amounts["invoice_value"],
+    }
+
+
+def matches(expected, found) -> bool:
+    if isinstance(expected, (int, float)) and found is not None:
+        return abs(float(expected) - float(found)) < 0.01
+    return str(expected).upper() == str(found or "").upper()
+
+
+def run_engine(name: str, corpus, concurrency: int) -> None:
+    engine = get_engine(name)
+    images = [prepare_image(Image.open(io.BytesIO(data)), binarize=engine.binarize) for _, data, _ in corpus]
+    engine.warmup()
+
+    def timed(image):
+        start = time.perf_counter()
+        result = engine.recognize(image)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, images))
+    wall = time.perf_counter() - start
+
+    latencies = [latency for _, latency in outcomes]
+    confidences = [r.confidence for r, _ in outcomes if r.confidence is not None]
+    correct = dict.fromkeys(FIELDS, 0)
+    checked = dict.fromkeys(FIELDS, 0)
+    for (_, _, truth), (result, _) in zip(corpus, outcomes):
+        found = fields(result.text)
+        for field in FIELDS:
+            if field in truth:
+                checked[field] += 1
+                correct[field] += matches(truth[field], found[field])
+
+    accuracy = "  ".join(f"{f}={correct[f]}/{checked[f]}" for f in FIELDS if checked[f])
+    print(
+        f"{name:<10} {len(images) / wall:>8.2f}/s  p50={percentile(latencies, 50) * 1000:.0f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:.0f}ms  "
+        f"conf={sum(confidences) / len(confidences) if confidences else 0:.1f}  {accuracy}"
+    )
+    batcher = getattr(engine, "batcher", None)
+    if batcher is not None:
+        print(f"{'':<10} micro-batches: {batcher.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", help="directory of invoice images (default: synthetic)")
+    parser.add_argument("--truth", help="JSON of expected fields per file name")
+    parser.add_argument("--count", type=int, default=20, help="synthetic images to render")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--engines", help="comma-separated engines (default: every installed one)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.images, args.truth, args.count)
+    names = args.engines.split(",") if args.engines else available_engines()
+    print(f"{len(corpus)} images, concurrency {args.concurrency}")
+    for name in names:
+        run_engine(name, corpus, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
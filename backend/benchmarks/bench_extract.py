@@ -0,0 +1,176 @@
+"""
+Micro-benchmark: single-pass scanner vs the previous per-field regex scans.
+
+Builds a corpus of OCR-like invoice texts from mockInvoiceAI.random_invoice,
+checks both implementations agree on it and on ``REGRESSION_CASES``, and
+reports invoices/sec. Exits with status 1 if any output differs.
+
+    python -m benchmarks.bench_extract [--count 2000] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+
+from app.extract import extract_amounts, extract_invoice_fields
+from app.extractor import extract_invoice_data
+from app.services.mockInvoiceAI import random_invoice
+
+from ._util import report, time_each
+
+FILLER = [
+    "Thank you for your business",
+    "Terms: payment due within 30 days",
+    "Bank: HDFC A/c 50200012345678 IFSC HDFC0001234",
+    "Subject to Mumbai jurisdiction",
+    "E & O.E.",
+]
+
+# Labels and layouts that broke the scanner once; each must give the baseline's output
+REGRESSION_CASES = [
+    "Total Taxable Value 1,000.00\nCGST 90.00\nSGST 90.00\nGrand Total 1,180.00",
+    "Net Amount Payable 500",
+    "Total Amount Payable: 1200",
+    "Invoice No: INR123\nTotal 100.00",
+    "Invoice No:\n\nABC-1\nInvoice Date:\n\n01/04/2026",
+    "Sub Total 100\nTotal GST 18\nAmount\nPayable 118",
+    "GSTIN 29AINRP1234F1Z5\nGrand Total INR 1,180.00",
+    "GSTIN: 27AAPFUO939F1ZV\nInvoice No: A1\nTotal 100.00",
+]
+_LEGACY_GSTIN_RE = re.compile(r"\d{2}[A-Z]{5}\d{4}[A-Z]\dZ[\dA-Z]")
+
+
+def invoice_text(inv: dict, rng: random.Random) -> str:
+    """Render a mock invoice as OCR-style text with some filler and noise."""
+    lines = [
+        "TAX INVOICE",
+        f"Seller GSTIN: {inv['sellerGSTIN']}",
+        f"Buyer GSTIN {inv['buyerGSTIN']}",
+        f"Invoice No: {inv['invoiceNumber']}",
+        f"Invoice Date: {inv['invoiceDate'][8:10]}/{inv['invoiceDate'][5:7]}/{inv['invoiceDate'][:4]}",
+        "Description  HSN  Qty  Rate  Amount",
+    ]
+    for item in inv["items"]:
+        lines.append(f"{item['description']}  {item['hsn_code']}  {item['quantity']}  {item['rate']}.00  {item['amount']:,}.00")
+    lines += [
+        f"Taxable Value   {inv['taxableValue']:,}.00",
+        f"CGST @9%   {inv['cgst']:,.2f}",
+        f"SGST @9%   {inv['sgst']:,.2f}",
+        f"Total Tax  {inv['totalTax']:,.2f}",
+        f"Grand Total  INR {inv['totalAmount']:,.2f}",
+    ]
+    lines += rng.sample(FILLER * 6, rng.randint(5, 25))
+    return "\n".join(lines)
+
+
+# --- previous implementation, kept here as the baseline -----------------------
+
+_AMOUNT_TOKEN_RE = re.compile(r"(?P<num>\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)")
+
+
+def _legacy_best_amount(text, keyword_re):
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if not keyword_re.search(line):
+            continue
+        candidates = [m.group("num") for m in _AMOUNT_TOKEN_RE.finditer(line)]
+        if not candidates and i + 1 < len(lines):
+            candidates = [m.group("num") for m in _AMOUNT_TOKEN_RE.finditer(lines[i + 1])]
+        for tok in reversed(candidates):
+            val = float(tok.replace(",", ""))
+            if val > 0:
+                return val
+    return None
+
+
+def legacy_extract_amounts(text):
+    t = re.sub(r"[ \t]+", " ", text.replace("₹", "Rs ").replace("INR", "Rs "))
+    return {
+        "invoice_value": _legacy_best_amount(t, re.compile(r"\b(grand\s*total|invoice\s*value|net\s*amount|total\s*amount|amount\s*payable)\b", re.I)),
+        "taxable_value": _legacy_best_amount(t, re.compile(r"\b(taxable\s*value|taxable\s*amount|sub\s*total)\b", re.I)),
+        "cgst": _legacy_best_amount(t, re.compile(r"\bCGST\b", re.I)),
+        "sgst": _legacy_best_amount(t, re.compile(r"\bSGST\b", re.I)),
+        "igst": _legacy_best_amount(t, re.compile(r"\bIGST\b", re.I)),
+        "total_tax": _legacy_best_amount(t, re.compile(r"\b(total\s*tax|gst\s*total|total\s*gst)\b", re.I)),
+    }
+
+
+def legacy_extract_invoice_data(text):
+    gstin_list = _LEGACY_GSTIN_RE.findall(text)
+    invoice_no = re.search(r"Invoice\s*No[:\-]?\s*(\S+)", text, re.IGNORECASE)
+    total = None
+    for pattern in (
+        r"Total[\s:]*(?:Amount)?[\s:]*(?:Rs\.?|INR)?[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)",
+        r"Grand\s*Total[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)",
+        r"Amount\s*Payable[\s:]*(\d+(?:,\d{3})*(?:\.\d{2})?)",
+    ):
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            total = m.group(1).replace(",", "")
+            break
+    date = None
+    for pattern in (r"(?:Invoice\s*)?Date[\s:]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})"):
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            date = m.group(1)
+            break
+    return {
+        "gstin_found": gstin_list,
+        "invoice_number": invoice_no.group(1) if invoice_no else None,
+        "invoice_date": date,
+        "total_amount": total,
+    }
+
+
+def legacy(text):
+    # Before: extract_invoice_fields and extractor.extract_invoice_data each
+    # scanned the text their own way, field by field.
+    re.search(r"\b\d{2}[A-Z]{5}\d{4}[A-Z]\d[Z][A-Z0-9]\b", text.upper())
+    legacy_extract_amounts(text)
+    legacy_extract_invoice_data(text)
+
+
+def differs(text) -> bool:
+    # total_tax differs on purpose when CGST/SGST/IGST are summed
+    amounts = {k: v for k, v in vars(extract_amounts(text)).items() if k != "total_tax"}
+    legacy_amounts = {k: v for k, v in legacy_extract_amounts(text).items() if k != "total_tax"}
+    # and misread GSTINs are collected on purpose, for validation to suggest the real one
+    data = extract_invoice_data(text)
+    data["gstin_found"] = [g for g in data["gstin_found"] if _LEGACY_GSTIN_RE.fullmatch(g)]
+    return amounts != legacy_amounts or data != legacy_extract_invoice_data(text)
+
+
+def current(text):
+    extract_invoice_fields(text)
+    extract_invoice_data(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    corpus = [invoice_text(random_invoice(), rng) for _ in range(args.count)]
+
+    differing = [t for t in corpus + REGRESSION_CASES if differs(t)]
+    print(f"{len(corpus)} texts + {len(REGRESSION_CASES)} regression cases, {len(differing)} with differing output")
+    for t in differing[:5]:
+        print(f"  differs: {t!r}")
+
+    # Regexes are compiled lazily on the first call; warm both paths up.
+    legacy(corpus[0])
+    current(corpus[0])
+    before = report("per-field scans (before)", time_each(legacy, corpus))
+    after = report("single-pass scanner", time_each(current, corpus))
+    print(f"speedup: {after['per_sec'] / before['per_sec']:.2f}x")
+    if differing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+GSTIN validation throughput: the old regex check, the full check (structure,
+state, PAN, checksum) cold and memoised, and the bulk endpoint end to end.
+
+GSTINs come from ``--vendors`` distinct valid ones, drawn with repeats as in
+real filings. ``--corrupt`` of them get one OCR confusion (0/O, 1/I, 5/S, 8/B),
+so the suggestion path runs too.
+
+    python -m benchmarks.bench_gstin [--count 50000] [--vendors 500] [--corrupt 0.05]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from fastapi.testclient import TestClient
+
+from app.factory import create_app
+from app.gstin import CONFUSABLE, check_gstin, check_gstins
+from app.services.mockInvoiceAI import random_gstin
+
+# extractor.validate_gstin before the checksum, state and PAN checks
+_OLD_PATTERN = r'^\d{2}[A-Z]{5}\d{4}[A-Z]\dZ[\dA-Z]$'
+
+
+def old_validate(gstin: str) -> bool:
+    return len(gstin) == 15 and re.match(_OLD_PATTERN, gstin) is not None
+
+
+def corrupt(gstin: str, rng: random.Random) -> str:
+    positions = [i for i, ch in enumerate(gstin) if ch in CONFUSABLE]
+    if not positions:
+        return gstin
+    i = rng.choice(positions)
+    return gstin[:i] + CONFUSABLE[gstin[i]] + gstin[i + 1:]
+
+
+def timed(name: str, fn, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34} {count / elapsed:>12,.0f} GSTINs/s  ({elapsed * 1000:.1f} ms)")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--vendors", type=int, default=500)
+    parser.add_argument("--corrupt", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    vendors = [random_gstin() for _ in range(args.vendors)]
+    gstins = [rng.choice(vendors) for _ in range(args.count)]
+    gstins = [corrupt(g, rng) if rng.random() < args.corrupt else g for g in gstins]
+    unique = [random_gstin() for _ in range(args.count)]
+
+    timed("old regex check", lambda: [old_validate(g) for g in gstins], args.count)
+    check_gstin.cache_clear()
+    timed("full check, all unique (cold)", lambda: check_gstins(unique), args.count)
+    check_gstin.cache_clear()
+    timed(f"full check, {args.vendors} vendors", lambda: check_gstins(gstins), args.count)
+    timed("full check, memoised (warm)", lambda: check_gstins(gstins), args.count)
+
+    checks = check_gstins(gstins)
+    invalid = [c for c in checks if not c.valid]
+    fixed = sum(1 for c in invalid if len(c.suggestions) == 1)
+    print(f"invalid {len(invalid)}, of which {fixed} have exactly one suggestion")
+
+    client = TestClient(create_app("export", warmup=False))
+    for invalid_only in (False, True):
+        check_gstin.cache_clear()
+        name = f"POST /api/gstin/validate{'?invalid_only' if invalid_only else ''}"
+        timed(name, lambda: client.post(
+            "/api/gstin/validate", params={"invalid_only": invalid_only}, json={"gstins": gstins}
+        ).raise_for_status(), args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Peak memory and time to first byte of the GSTR-1 B2B CSV export: the
+buffered JSON endpoint vs the NDJSON streaming one, as the row count grows.
+
+The buffered path holds the request body, the parsed rows and the CSV text at
+once. The streaming path reads the body in 64 KB chunks and emits CSV chunks,
+so its peak should stay flat.
+
+    python -m benchmarks.bench_gstr1_export [--rows 10000,50000,200000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import AsyncIterator, Iterator
+
+from app.csv_export import gzip_stream, iter_ndjson_rows, rows_to_gstr1_b2b_csv, stream_gstr1_b2b_csv
+from app.models import ExportGstr1B2BRequest
+
+BODY_CHUNK = 64 * 1024
+
+
+def make_row(i: int) -> dict:
+    return {
+        "gstin_uin_of_recipient": f"27ABCDE{i % 10000:04d}F1Z5",
+        "receiver_name": f"Buyer {i % 500}",
+        "invoice_number": f"INV-{i}",
+        "invoice_date": "12-03-2026",
+        "invoice_value": 1180.0 + i % 500,
+        "place_of_supply": "27-Maharashtra",
+        "rate": 18,
+        "taxable_value": 1000.0 + i % 500,
+    }
+
+
+def ndjson_chunks(n: int) -> Iterator[bytes]:
+    buf = []
+    size = 0
+    for i in range(n):
+        line = json.dumps(make_row(i)) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= BODY_CHUNK:
+            yield "".join(buf).encode()
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode()
+
+
+async def _as_async(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def buffered(n: int):
+    body = json.dumps({"rows": [make_row(i) for i in range(n)]})
+    start = time.perf_counter()
+    csv_text = rows_to_gstr1_b2b_csv(ExportGstr1B2BRequest.model_validate_json(body).rows)
+    first = time.perf_counter() - start  # the whole CSV exists before any byte is sent
+    return first, len(csv_text)
+
+
+def streaming(n: int, gzip: bool = False):
+    async def run():
+        start = time.perf_counter()
+        first = None
+        size = 0
+        body = stream_gstr1_b2b_csv(iter_ndjson_rows(_as_async(ndjson_chunks(n))))
+        if gzip:
+            body = gzip_stream(body)
+        async for chunk in body:
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(chunk)
+        return first, size
+    return asyncio.run(run())
+
+
+def measure(fn, n: int):
+    # tracemalloc slows allocation-heavy code a lot, so time and trace separately
+    start = time.perf_counter()
+    first, size = fn(n)
+    total = time.perf_counter() - start
+    tracemalloc.start()
+    fn(n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, peak, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="10000,50000,200000")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'mode':>10} {'first byte':>11} {'total':>9} {'peak MB':>8} {'out MB':>7}")
+    for n in (int(r) for r in args.rows.split(",")):
+        for name, fn in (("buffered", buffered), ("stream", streaming),
+                         ("stream+gz", lambda k: streaming(k, gzip=True))):
+            first, total, peak, size = measure(fn, n)
+            print(f"{n:>8} {name:>10} {first * 1000:>9.1f}ms {total:>8.2f}s {peak / 2**20:>8.1f} {size / 2**20:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
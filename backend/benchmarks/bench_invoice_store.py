@@ -0,0 +1,73 @@
+"""
+Insert and lookup latency of the in-memory invoice store as it grows.
+
+At each size checkpoint, times a window of inserts plus random lookups by
+``_id``, invoice number and GSTIN, and dashboard stats; flat numbers across
+sizes mean O(1).
+GSTIN lookups return every invoice of that seller, so they grow with the
+number of matches (n / 5000 here), not with the store size.
+
+    python -m benchmarks.bench_invoice_store [--sizes 1000,10000,100000,1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from app.services import invoiceStore as store
+
+WINDOW = 1000
+
+
+def make_invoice(i: int) -> dict:
+    # Small records keep 1M invoices within a laptop's memory.
+    return {
+        "invoiceNumber": f"INV-{i}",
+        "sellerGSTIN": f"27ABCDE{i % 5000:04d}F1Z5",
+        "buyerGSTIN": f"29PQRSX{i % 20000:04d}K1Z2",
+        "taxableValue": 1000 + i % 500,
+        "totalTax": 180.0,
+        "totalAmount": 1180.0 + i % 500,
+        "invoiceDate": f"2025-{i % 12 + 1:02d}-01",
+        "placeOfSupply": "Maharashtra",
+        "status": "valid",
+    }
+
+
+def _us_per_op(fn, args) -> float:
+    start = time.perf_counter()
+    for a in args:
+        fn(a)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    store.clear_all()
+    rng = random.Random(1)
+    print(f"{'invoices':>10} {'insert':>10} {'by _id':>10} {'by number':>10} {'by gstin':>10} {'stats':>10}   (us/op)")
+    n = 0
+    for size in sizes:
+        while n < size - WINDOW:
+            store.add_invoice(make_invoice(n))
+            n += 1
+        insert = _us_per_op(lambda i: store.add_invoice(make_invoice(i)), range(n, n + WINDOW))
+        n += WINDOW
+        ids = [inv["_id"] for inv in rng.sample(store._invoices_db, WINDOW)]
+        numbers = [f"INV-{rng.randrange(n)}" for _ in range(WINDOW)]
+        gstins = [f"27ABCDE{rng.randrange(5000):04d}F1Z5" for _ in range(100)]
+        by_id = _us_per_op(store.get_invoice_by_id, ids)
+        by_number = _us_per_op(store.get_invoice_by_id, numbers)
+        by_gstin = _us_per_op(lambda g: store.get_invoices_by_gstin(g, "seller"), gstins)
+        stats = _us_per_op(lambda _: store.get_stats(), range(100))
+        print(f"{n:>10} {insert:>10.2f} {by_id:>10.2f} {by_number:>10.2f} {by_gstin:>10.2f} {stats:>10.2f}")
+    store.clear_all()
+
+
+if __name__ == "__main__":
+    main()
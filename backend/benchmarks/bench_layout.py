@@ -0,0 +1,160 @@
+"""
+Structured OCR results: what the word arrays cost, and what they give.
+
+Synthetic invoices from ``mockInvoiceAI.random_invoice`` are laid out as
+words on a monospaced grid (the boxes a clean scan would give), with an
+item table of up to ``--items`` rows. The benchmark reports:
+
+- memory per word as :class:`OcrWords` arrays vs a list of per-word dicts
+- time to build a result, reconstruct the line items and score the fields
+- line-item accuracy (description, HSN, quantity, rate, amount) against the
+  invoice's own items
+
+With ``--ocr``, rendered pages also go through the default engine text-only
+and with words, to show the structured pass costs no extra recognition.
+
+    python -m benchmarks.bench_layout [--count 500] [--items 12] [--seed 7] [--ocr]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import re
+import tracemalloc
+from dataclasses import asdict
+
+from PIL import Image
+
+from app.extract import extract_invoice_fields
+from app.ocr_backends import OcrResult
+from app.ocr_layout import field_confidence, line_items
+from app.services.mockInvoiceAI import random_invoice
+
+from ._util import report, time_each
+
+CHAR, LINE = 12, 40  # grid cell in pixels
+CATALOG = ["Rice Bags", "Cooking Oil", "Detergent Powder", "Green Tea", "Face Cream", "Instant Noodles"]
+
+
+def invoice(items: int) -> dict:
+    inv = random_invoice()
+    inv["items"] = [
+        {"description": random.choice(CATALOG), "hsn_code": random.choice(["1006", "1512", "3402", "0902"]),
+         "quantity": q, "rate": r, "amount": q * r}
+        for q, r in ((random.randint(1, 20), random.randint(50, 500)) for _ in range(random.randint(1, items)))
+    ]
+    return inv
+
+
+def invoice_lines(inv: dict) -> list:
+    lines = [
+        "TAX INVOICE",
+        f"GSTIN: {inv['sellerGSTIN']}",
+        f"Invoice No: {inv['invoiceNumber']}   Date: {inv['invoiceDate']}",
+        f"{'S.No':<6}{'Description':<22}{'HSN/SAC':<10}{'Qty':>5}{'Unit Price':>14}{'Amount':>14}",
+    ]
+    for n, item in enumerate(inv["items"], 1):
+        lines.append(f"{n:<6}{item['description']:<22}{item['hsn_code']:<10}{item['quantity']:>5}"
+                     f"{item['rate']:>14,.2f}{item['amount']:>14,.2f}")
+    lines += [
+        f"{'Taxable Value':<53}{inv['taxableValue']:>18,.2f}",
+        f"{'CGST 9%':<53}{inv['cgst']:>18,.2f}",
+        f"{'SGST 9%':<53}{inv['sgst']:>18,.2f}",
+        f"{'Grand Total':<53}{inv['totalAmount']:>18,.2f}",
+    ]
+    return lines
+
+
+def word_lines(lines: list) -> list:
+    """(block, [(word, box, confidence)]) per line, as an engine would return them"""
+    return [
+        (0, [(m.group(), (40 + m.start() * CHAR, 40 + y * LINE, 40 + m.end() * CHAR, 60 + y * LINE),
+              random.uniform(70, 96)) for m in re.finditer(r"\S+", line)])
+        for y, line in enumerate(lines)
+    ]
+
+
+def as_dicts(lines: list) -> list:
+    return [
+        {"text": text, "box": box, "confidence": conf, "line": n, "block": block}
+        for n, (block, words) in enumerate(lines) for text, box, conf in words
+    ]
+
+
+def allocated(build, items) -> int:
+    tracemalloc.start()
+    kept = [build(item) for item in items]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def structure(result: OcrResult) -> tuple:
+    gstin, amounts, _ = extract_invoice_fields(result.text)
+    return line_items(result), field_confidence(result, {"gstin": gstin, **asdict(amounts)})
+
+
+def item_accuracy(results: list, invoices: list) -> float:
+    hits = total = 0
+    for (items, _), inv in zip(results, invoices):
+        expected = inv["items"]
+        total += len(expected) * 5
+        for got, want in zip(items, expected):
+            hits += (got.description == want["description"]) + (got.hsn == want["hsn_code"])
+            hits += (got.quantity == want["quantity"]) + (got.rate == want["rate"]) + (got.amount == want["amount"])
+        # Extra rows count against the score as missed fields of a missing item
+        total += max(0, len(items) - len(expected)) * 5
+    return hits / total if total else 0.0
+
+
+def ocr_overhead(count: int) -> None:
+    from app.ocr_backends import get_engine
+    from app.ocr_engine import prepare_image
+
+    from ._util import render_text_image
+
+    engine = get_engine()
+    pages = [
+        prepare_image(Image.open(io.BytesIO(render_text_image(invoice_lines(invoice(6)), size=(1240, 700)))))
+        for _ in range(count)
+    ]
+    engine.recognize(pages[0])
+    text_only = report(f"{engine.name} text only", time_each(engine.recognize_text, pages))
+    structured = report(f"{engine.name} words + boxes", time_each(engine.recognize, pages))
+    print(f"structured pass overhead: {(text_only['per_sec'] / structured['per_sec'] - 1) * 100:.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--items", type=int, default=12, help="most line items per invoice")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ocr", action="store_true", help="also time the OCR engine text-only vs with words")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    invoices = [invoice(args.items) for _ in range(args.count)]
+    pages = [word_lines(invoice_lines(inv)) for inv in invoices]
+    words = sum(len(ws) for page in pages for _, ws in page)
+
+    arrays = allocated(lambda page: OcrResult.from_lines(page).words, pages)
+    dicts = allocated(as_dicts, pages)
+    print(f"{words} words: {arrays / words:.0f} B/word as arrays, {dicts / words:.0f} B/word as dicts")
+
+    report("build result", time_each(OcrResult.from_lines, pages))
+    results = [OcrResult.from_lines(page) for page in pages]
+    report("line items + field confidence", time_each(structure, results))
+    structured = [structure(result) for result in results]
+    found = sum(len(items) for items, _ in structured)
+    scored = sum(len(confidence) for _, confidence in structured)
+    print(f"line items: {found}/{sum(len(inv['items']) for inv in invoices)} rows, "
+          f"field accuracy {item_accuracy(structured, invoices):.1%}; {scored / len(results):.1f} fields scored per page")
+
+    if args.ocr:
+        ocr_overhead(min(args.count, 20))
+
+
+if __name__ == "__main__":
+    main()
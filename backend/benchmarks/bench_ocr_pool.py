@@ -0,0 +1,38 @@
+"""
+Compare OCR throughput: persistent tesserocr engine pool vs pytesseract
+(one tesseract process per image).
+
+    python -m benchmarks.bench_ocr_pool [--images DIR] [--count N]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+
+from app.ocr_engine import TESSERACT_CONFIG, preprocess_image, recognize
+from app.ocr_pool import get_pool
+
+from ._util import load_images, report, time_each
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", help="directory of invoice images (default: synthetic)")
+    parser.add_argument("--count", type=int, default=20, help="synthetic images to render")
+    args = parser.parse_args()
+
+    images = [preprocess_image(io.BytesIO(data)) for data in load_images(args.images, args.count)]
+
+    # Warm both paths so one-off start-up is not attributed to the first image.
+    recognize(images[0], use_pool=False)
+    report("pytesseract (subprocess)", time_each(lambda im: recognize(im, use_pool=False), images))
+
+    if get_pool(TESSERACT_CONFIG) is None:
+        print("engine pool unavailable (pip install tesserocr)")
+        return
+    recognize(images[0], use_pool=True)
+    report("tesserocr engine pool", time_each(lambda im: recognize(im, use_pool=True), images))
+
+
+if __name__ == "__main__":
+    main()
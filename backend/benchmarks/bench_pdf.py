@@ -0,0 +1,61 @@
+"""
+Multi-page PDF ingestion: text-layer pages vs OCR, and page-parallel speedup.
+
+Builds an image-only PDF of ``--pages`` synthetic invoice pages (the totals
+on the last one) and OCRs it with 1..``--workers`` page workers, printing
+the wall time and the per-page render/OCR timings of the widest run.
+Needs pypdfium2 and Tesseract.
+
+    python -m benchmarks.bench_pdf [--pages 6] [--workers 4] [--pdf invoice.pdf]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from app.ocr_engine import read_image
+from app.pdf_ingest import read_pdf
+
+from ._util import SAMPLE_LINES, render_text_image
+
+
+def synthetic_pdf(pages: int) -> bytes:
+    body = [line for line in SAMPLE_LINES if "Total" not in line]
+    images = [
+        Image.open(io.BytesIO(render_text_image(body if i < pages - 1 else SAMPLE_LINES, size=(1240, 1754))))
+        for i in range(pages)
+    ]
+    buf = io.BytesIO()
+    images[0].save(buf, "PDF", save_all=True, append_images=images[1:], resolution=150)
+    return buf.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pdf", help="PDF to use instead of the synthetic one")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            pdf = f.read()
+    else:
+        pdf = synthetic_pdf(args.pages)
+
+    pages = []
+    for workers in sorted({1, 2, args.workers}):
+        start = time.perf_counter()
+        result, pages = read_pdf(pdf, read_image, workers=workers)
+        print(f"workers={workers}: {time.perf_counter() - start:.2f}s, {len(pages)} pages read, "
+              f"{len(result.text)} chars, {len(result.words)} words")
+    print(f"{'page':>4} {'source':>6} {'chars':>6} {'text ms':>8} {'render ms':>10} {'ocr ms':>8}")
+    for p in pages:
+        print(f"{p['page']:>4} {p['source']:>6} {p['chars']:>6} {p['textMs']:>8.1f} {p['renderMs']:>10.1f} {p['ocrMs']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+A/B the preprocessing pipelines: latency, peak RSS and (with --ocr) text accuracy.
+
+Each pipeline runs in a fresh child process on a synthetic 12-megapixel
+grayscale photo so peak RSS is not polluted by the other pipeline.
+
+    python -m benchmarks.bench_preprocess [--width 4000 --height 3000] [--repeat 3] [--ocr]
+"""
+from __future__ import annotations
+
+import argparse
+import difflib
+import io
+import json
+import subprocess
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from app.preprocess import PIPELINES, run_pipeline
+
+from ._util import SAMPLE_LINES, PeakMemory, render_text_image
+
+
+def _synthetic_photo(width: int, height: int) -> Image.Image:
+    image = Image.effect_noise((width, height), 24).point(lambda x: min(255, x + 100))
+    draw = ImageDraw.Draw(image)
+    for i in range(0, height - 40, 40):
+        draw.text((60, i + 10), SAMPLE_LINES[(i // 40) % len(SAMPLE_LINES)] * 4, fill=20)
+    return image
+
+
+def _child(pipeline: str, width: int, height: int, repeat: int) -> None:
+    image = _synthetic_photo(width, height)
+    timings = []
+    with PeakMemory() as memory:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_pipeline(image, pipeline)
+            timings.append(time.perf_counter() - start)
+    print(json.dumps({"best_s": min(timings), "extra_mb": memory.extra_mb, "memory": memory.source}))
+
+
+def _ocr_accuracy(pipeline: str) -> float:
+    from app.ocr_engine import extract_text
+
+    text = extract_text(io.BytesIO(render_text_image()), pipeline=pipeline)
+    return difflib.SequenceMatcher(None, text, "\n".join(SAMPLE_LINES)).ratio()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ocr", action="store_true", help="also compare OCR accuracy (needs tesseract)")
+    parser.add_argument("--child", choices=PIPELINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.width, args.height, args.repeat)
+        return
+
+    print(f"{args.width}x{args.height} grayscale, best of {args.repeat}")
+    for pipeline in PIPELINES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_preprocess", "--child", pipeline,
+             "--width", str(args.width), "--height", str(args.height), "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        )
+        row = json.loads(out.stdout)
+        line = f"{pipeline:<8} {row['best_s'] * 1000:8.1f} ms  peak +{row['extra_mb']:.1f} MB ({row['memory']})"
+        if args.ocr:
+            line += f"  text similarity {_ocr_accuracy(pipeline):.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
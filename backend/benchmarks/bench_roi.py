@@ -0,0 +1,75 @@
+"""
+Region-of-interest OCR vs full-page OCR: CPU per page and field agreement.
+
+Every image is preprocessed once, then recognised both ways. CPU time includes
+Tesseract child processes (the pytesseract path) as well as in-process engine
+threads. Fields are the ones ``extract.py`` reports (GSTIN, taxable value,
+invoice value); "agree" counts pages where ROI found the same values as the
+full page. Needs Tesseract.
+
+    python -m benchmarks.bench_roi [--images path/to/invoices] [--count 10] [--items 25]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from app.ocr_engine import get_engine, prepare_image
+from app.roi_ocr import recognize_regions, roi_stats
+from app.scanner import scan_invoice_text
+
+from ._util import SAMPLE_LINES, cpu_seconds, load_images, render_text_image
+
+
+def synthetic_invoice(items: int) -> bytes:
+    """An A4-sized page whose line-item table is most of the text"""
+    body = [f"Item {i:03d}  Widget type {i % 7}   {i % 5 + 1} x 125.00   {(i % 5 + 1) * 125:,.2f}" for i in range(items)]
+    return render_text_image(SAMPLE_LINES[:3] + body + SAMPLE_LINES[5:], size=(1240, 60 + 50 * (items + 8)))
+
+
+def fields(text: str) -> tuple:
+    scan = scan_invoice_text(text)
+    return scan.gstin, scan.amounts["taxable_value"], scan.amounts["invoice_value"]
+
+
+def measure(fn, images):
+    results = []
+    cpu, wall = cpu_seconds(), time.perf_counter()
+    for image in images:
+        results.append(fn(image))
+    return results, (cpu_seconds() - cpu) / len(images), (time.perf_counter() - wall) / len(images)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", help="folder of invoice images (default: synthetic)")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--items", type=int, default=25, help="line items per synthetic invoice")
+    args = parser.parse_args()
+
+    raw = load_images(args.images) if args.images else [synthetic_invoice(args.items) for _ in range(args.count)]
+    images = [prepare_image(Image.open(io.BytesIO(data))) for data in raw]
+    recognize = get_engine().recognize
+    recognize(images[0])  # warm up the engine
+
+    full_results, full_cpu, full_wall = measure(recognize, images)
+    roi_results, roi_cpu, roi_wall = measure(lambda image: recognize_regions(image, recognize), images)
+    full_texts = [r.text for r in full_results]
+    roi_texts = [r.text for r in roi_results]
+
+    found = sum(all(v is not None for v in fields(t)) for t in full_texts)
+    agree = sum(fields(a) == fields(b) for a, b in zip(full_texts, roi_texts))
+    stats = roi_stats.stats()
+    print(f"{'mode':<6} {'cpu ms/page':>12} {'wall ms/page':>13}")
+    print(f"{'full':<6} {full_cpu * 1000:>12.1f} {full_wall * 1000:>13.1f}")
+    print(f"{'roi':<6} {roi_cpu * 1000:>12.1f} {roi_wall * 1000:>13.1f}")
+    print(f"cpu reduction {full_cpu / roi_cpu if roi_cpu else 0:.2f}x, pixels OCRed {stats['ocrPixelRatio']:.0%}, "
+          f"fallbacks {stats['fallbacks']}/{stats['pages']}, full-page OCR pages {stats['pages'] - stats['roiPages']}")
+    print(f"fields: all found on {found}/{len(images)} pages with full OCR, ROI agrees on {agree}/{len(images)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Load test for the SQLite (WAL) invoice store shared by several processes.
+
+Starts ``--workers`` processes, as uvicorn ``--workers N`` would, each
+inserting from ``--threads`` threads (like the job pool) for ``--seconds``,
+while one more process times reads (by ``_id``, by invoice number and
+dashboard stats). Reports sustained inserts/sec across all writers and read
+latency percentiles under that load.
+
+    python -m benchmarks.bench_sqlite_store [--workers 4] [--threads 8] [--seconds 10]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from ._util import percentile
+
+
+def _use_database(path: str):
+    # The backend is chosen at import time, so only import inside the child.
+    os.environ["INVOICE_STORE"] = "sqlite"
+    os.environ["INVOICE_DB_PATH"] = path
+    from app.services import invoiceStore
+    return invoiceStore
+
+
+def writer(path: str, worker: int, threads: int, seconds: float, counts) -> None:
+    store = _use_database(path)
+    deadline = time.perf_counter() + seconds
+    done = [0] * threads
+
+    def run(t: int) -> None:
+        n = 0
+        while time.perf_counter() < deadline:
+            store.add_invoice({
+                "invoiceNumber": f"INV-{worker}-{t}-{n}",
+                "invoiceDate": f"2025-{n % 12 + 1:02d}-01",
+                "sellerGSTIN": f"27ABCDE{n % 5000:04d}F1Z5",
+                "buyerGSTIN": f"29PQRSX{n % 20000:04d}K1Z2",
+                "placeOfSupply": "Maharashtra",
+                "taxableValue": 1000 + n % 500,
+                "totalTax": 180.0,
+                "totalAmount": 1180.0 + n % 500,
+                "confidenceScore": 0.9,
+                "status": "valid",
+            })
+            n += 1
+        done[t] = n
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    counts.put(sum(done))
+
+
+def reader(path: str, seconds: float, results) -> None:
+    store = _use_database(path)
+    rng = random.Random(1)
+    lookups, stats = [], []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        number = f"INV-0-0-{rng.randrange(1000)}"
+        start = time.perf_counter()
+        store.get_invoice_by_id(number)
+        lookups.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        store.get_stats()
+        stats.append(time.perf_counter() - start)
+        time.sleep(0.001)
+    results.put((lookups, stats))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--db", help="database file (default: a fresh temp file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "invoices.db")
+    ctx = multiprocessing.get_context("spawn")
+    counts, results = ctx.Queue(), ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(path, w, args.threads, args.seconds, counts))
+             for w in range(args.workers)]
+    procs.append(ctx.Process(target=reader, args=(path, args.seconds, results)))
+    for p in procs:
+        p.start()
+    inserted = sum(counts.get() for _ in range(args.workers))
+    lookups, stats = results.get()
+    for p in procs:
+        p.join()
+
+    print(f"database: {path}")
+    print(f"{args.workers} workers x {args.threads} threads: {inserted} inserts, "
+          f"{inserted / args.seconds:,.0f} inserts/s")
+    for name, samples in (("get_invoice_by_id", lookups), ("get_stats", stats)):
+        ms = [s * 1000 for s in samples]
+        print(f"{name:>18}: p50 {percentile(ms, 50):.3f} ms  p99 {percentile(ms, 99):.3f} ms  ({len(ms)} reads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Vendor templates vs the generic scanner on invoices with vendor-specific
+labels ("Bill No", "Amount before tax", "Central Tax", a total on the line
+below its label), which the generic keywords miss.
+
+``--vendors`` suppliers each get a label set and a template file in a
+temporary directory. Every invoice text is then extracted both ways and
+scored against the invoice it came from. Texts from as many suppliers
+without a template show what detection costs when it finds nothing.
+
+    python -m benchmarks.bench_templates [--count 2000] [--vendors 200] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app import vendor_templates
+from app.scanner import scan_invoice_text
+from app.services.mockInvoiceAI import random_invoice
+
+from ._util import report, time_each
+
+# Label variants per field; each vendor prints one of each
+LABELS = {
+    "invoice_no": ["Bill No", "Voucher No", "Doc Ref"],
+    "invoice_date": ["Dated", "Bill Date", "Doc Date"],
+    "taxable_value": ["Amount before tax", "Assessable Value", "Goods Value"],
+    "cgst": ["Central Tax", "C.GST Amt", "Central GST"],
+    "sgst": ["State Tax", "S.GST Amt", "State GST"],
+    "invoice_value": ["Invoice Total", "Bill Amount", "Net Receivable"],
+}
+FIELDS = tuple(LABELS)
+
+
+def vendor_layout(rng: random.Random) -> dict:
+    return {name: rng.choice(options) for name, options in LABELS.items()}
+
+
+def invoice_text(inv: dict, labels: dict) -> str:
+    date = f"{inv['invoiceDate'][8:10]}-{inv['invoiceDate'][5:7]}-{inv['invoiceDate'][:4]}"
+    lines = [
+        "TAX INVOICE",
+        f"GSTIN {inv['sellerGSTIN']}",
+        f"{labels['invoice_no']} {inv['invoiceNumber']}    {labels['invoice_date']} {date}",
+        f"Bill to GSTIN {inv['buyerGSTIN']}",
+    ]
+    for item in inv["items"]:
+        lines.append(f"{item['description']}  {item['hsn_code']}  {item['quantity']}  {item['amount']:,}.00")
+    lines += [
+        f"{labels['taxable_value']}   {inv['taxableValue']:,}.00",
+        f"{labels['cgst']} @9%   {inv['cgst']:,.2f}",
+        f"{labels['sgst']} @9%   {inv['sgst']:,.2f}",
+        labels["invoice_value"],
+        f"Rs {inv['totalAmount']:,.2f}",
+        "Subject to local jurisdiction",
+    ]
+    return "\n".join(lines)
+
+
+def template(gstin: str, labels: dict) -> dict:
+    fields = {name: {"label": label} for name, label in labels.items()}
+    fields["invoice_value"]["line"] = 1
+    return {"gstin": gstin, "name": gstin, "fields": fields}
+
+
+def truth(inv: dict) -> dict:
+    return {
+        "invoice_no": inv["invoiceNumber"],
+        "invoice_date": f"{inv['invoiceDate'][8:10]}-{inv['invoiceDate'][5:7]}-{inv['invoiceDate'][:4]}",
+        "taxable_value": float(inv["taxableValue"]),
+        "cgst": inv["cgst"],
+        "sgst": inv["sgst"],
+        "invoice_value": inv["totalAmount"],
+    }
+
+
+def fields_of(scan) -> dict:
+    return {"invoice_no": scan.invoice_no, "invoice_date": scan.invoice_date, **scan.amounts}
+
+
+def accuracy(scans: list, truths: list) -> float:
+    hits = sum(fields_of(scan)[name] == expected[name] for scan, expected in zip(scans, truths) for name in FIELDS)
+    return hits / (len(truths) * len(FIELDS))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    vendors = [(random_invoice()["sellerGSTIN"], vendor_layout(rng)) for _ in range(args.vendors)]
+    others = [(random_invoice()["sellerGSTIN"], vendor_layout(rng)) for _ in range(args.vendors)]
+    known, unknown = [], []
+    for _ in range(args.count):
+        gstin, labels = rng.choice(vendors)
+        inv = {**random_invoice(), "sellerGSTIN": gstin}
+        known.append((invoice_text(inv, labels), truth(inv)))
+        gstin, labels = rng.choice(others)
+        unknown.append(invoice_text({**random_invoice(), "sellerGSTIN": gstin}, labels))
+    texts = [text for text, _ in known]
+    truths = [expected for _, expected in known]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for gstin, labels in vendors:
+            Path(directory, f"{gstin}.json").write_text(json.dumps(template(gstin, labels)))
+        registry = vendor_templates.registry
+        registry.directory, registry.interval = Path(directory), 3600
+        start = time.perf_counter()
+        registry.reload()
+        print(f"load {len(registry.templates)} templates: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        generic = [scan_invoice_text(text) for text in texts]
+        templated = [vendor_templates.scan_invoice(text) for text in texts]
+        used = sum(scan.template is not None for scan in templated)
+        print(f"field accuracy: generic {accuracy(generic, truths):.1%}, "
+              f"templates {accuracy(templated, truths):.1%} ({used}/{len(texts)} by template)")
+
+        scan_invoice_text.cache_clear()
+        vendor_templates._scan.cache_clear()
+        before = report("generic scan", time_each(scan_invoice_text, texts))
+        after = report("template scan", time_each(vendor_templates.scan_invoice, texts))
+        print(f"speedup: {after['per_sec'] / before['per_sec']:.2f}x")
+
+        scan_invoice_text.cache_clear()
+        vendor_templates._scan.cache_clear()
+        plain = report("generic, no template", time_each(scan_invoice_text, unknown))
+        scan_invoice_text.cache_clear()
+        detected = report("detect + generic", time_each(vendor_templates.scan_invoice, unknown))
+        print(f"detection overhead on other vendors: {(plain['per_sec'] / detected['per_sec'] - 1) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
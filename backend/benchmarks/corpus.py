@@ -0,0 +1,199 @@
+"""
+Synthetic invoice corpus with ground truth.
+
+Invoices come from ``mockInvoiceAI.random_invoice`` and are rendered to A4
+pages at 150 DPI with Pillow's built-in font. Layouts vary the way vendors'
+do: the taxable value and total labels ("Total Taxable Value", "Net Amount
+Payable", ...), invoice numbers starting with ``INR``, and figures printed on
+the line after their label. Pages are then degraded like real scans:
+Gaussian noise, a small rotation, blur and JPEG compression. ``truth.json``
+maps every file name to its expected fields and to the exact text printed on
+the page. ``bench_engines --truth`` and the benchmark suite both read it.
+Runs offline with no assets beyond Pillow and NumPy.
+
+    python -m benchmarks.corpus --out corpus/ [--count 50] [--seed 7] [--profile scan]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from app.services.mockInvoiceAI import random_invoice
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 DPI
+MARGIN = 90
+FONT_SIZE = 26
+LINE_HEIGHT = 44
+# Left edges of the line-item columns; the last (amount) is right-aligned
+ITEM_COLUMNS = (0, 360, 500, 620, None)
+
+TAXABLE_LABELS = ("Taxable Value", "Total Taxable Value", "Taxable Amount", "Sub Total")
+TOTAL_LABELS = ("Grand Total", "Net Amount Payable", "Total Amount Payable", "Invoice Value")
+# Share of invoices whose number starts with INR, and of layouts with figures below their labels
+INR_NUMBER_SHARE = 0.2
+VALUE_BELOW_SHARE = 0.25
+
+
+@dataclass
+class Layout:
+    taxable_label: str = TAXABLE_LABELS[0]
+    total_label: str = TOTAL_LABELS[0]
+    value_below: bool = False  # summary figures on the line after their label
+
+
+@dataclass
+class Degradation:
+    noise: float  # standard deviation of Gaussian noise, in grey levels
+    max_rotation: float  # degrees, either way
+    blur: float  # Gaussian blur radius, px
+    jpeg_quality: int
+
+
+PROFILES: Dict[str, Degradation] = {
+    "clean": Degradation(noise=0, max_rotation=0, blur=0, jpeg_quality=95),
+    "scan": Degradation(noise=8, max_rotation=1.5, blur=0.6, jpeg_quality=85),
+    "photo": Degradation(noise=18, max_rotation=4, blur=1.2, jpeg_quality=70),
+}
+
+
+def _dmy(iso_date: str) -> str:
+    return f"{iso_date[8:10]}/{iso_date[5:7]}/{iso_date[:4]}"
+
+
+def sample_invoice(rng: random.Random) -> Tuple[dict, Layout]:
+    """A random invoice and the layout to print it in"""
+    inv = random_invoice()
+    if rng.random() < INR_NUMBER_SHARE:
+        inv["invoiceNumber"] = "INR" + inv["invoiceNumber"].split("-")[-1]
+    layout = Layout(rng.choice(TAXABLE_LABELS), rng.choice(TOTAL_LABELS), rng.random() < VALUE_BELOW_SHARE)
+    return inv, layout
+
+
+def invoice_rows(inv: dict, layout: Optional[Layout] = None) -> List[List[str]]:
+    """The text printed on an invoice page, one list of cells per row, top to bottom"""
+    layout = layout or Layout()
+    rows = [
+        ["TAX INVOICE"],
+        [f"Seller GSTIN: {inv['sellerGSTIN']}"],
+        [f"Invoice No: {inv['invoiceNumber']}   Invoice Date: {_dmy(inv['invoiceDate'])}"],
+        [f"Buyer GSTIN: {inv['buyerGSTIN']}"],
+        [f"Place of Supply: {inv['placeOfSupply']}"],
+        [],
+        ["Description", "HSN", "Qty", "Rate", "Amount"],
+    ]
+    for item in inv["items"]:
+        rows.append([item["description"], item["hsn_code"], str(item["quantity"]), f"{item['rate']:.2f}", f"{item['amount']:,.2f}"])
+    summary = [
+        (layout.taxable_label, inv["taxableValue"]),
+        # Below its label, the rate would be read as the figure
+        ("CGST" if layout.value_below else "CGST 9%", inv["cgst"]),
+        ("SGST" if layout.value_below else "SGST 9%", inv["sgst"]),
+        (layout.total_label, inv["totalAmount"]),
+    ]
+    rows.append([])
+    for label, value in summary:
+        if layout.value_below:
+            rows += [[label], ["", f"{value:,.2f}"]]
+        else:
+            rows.append([label, f"{value:,.2f}"])
+    return rows
+
+
+def ground_truth(inv: dict) -> dict:
+    """Fields the extractors should find, keyed like ``bench_engines`` expects"""
+    return {
+        "gstin": inv["sellerGSTIN"],
+        "buyer_gstin": inv["buyerGSTIN"],
+        "invoice_no": inv["invoiceNumber"],
+        "invoice_date": _dmy(inv["invoiceDate"]),
+        "taxable_value": float(inv["taxableValue"]),
+        "cgst": inv["cgst"],
+        "sgst": inv["sgst"],
+        "invoice_value": inv["totalAmount"],
+    }
+
+
+def _font() -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=FONT_SIZE)
+    except TypeError:  # Pillow < 10.1 has only the small bitmap font
+        return ImageFont.load_default()
+
+
+def render_invoice(rows: List[List[str]]) -> Image.Image:
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    font = _font()
+    width = PAGE_SIZE[0] - 2 * MARGIN
+    for i, cells in enumerate(rows):
+        y = MARGIN + i * LINE_HEIGHT
+        if len(cells) == 1:
+            draw.text((MARGIN, y), cells[0], fill=0, font=font)
+            continue
+        # Label on the left, figures right-aligned in columns
+        columns = ITEM_COLUMNS if len(cells) == len(ITEM_COLUMNS) else (0, None)
+        for cell, x in zip(cells, columns):
+            if x is None:
+                x = width - draw.textlength(cell, font=font)
+            draw.text((MARGIN + x, y), cell, fill=0, font=font)
+    return image
+
+
+def degrade(image: Image.Image, profile: Degradation, rng: random.Random) -> bytes:
+    """Apply a degradation profile and encode as JPEG"""
+    if profile.max_rotation:
+        angle = rng.uniform(-profile.max_rotation, profile.max_rotation)
+        image = image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+    if profile.blur:
+        image = image.filter(ImageFilter.GaussianBlur(profile.blur))
+    if profile.noise:
+        noise = np.random.default_rng(rng.getrandbits(32)).normal(0, profile.noise, (image.height, image.width))
+        image = Image.fromarray(np.clip(np.asarray(image, dtype=np.float32) + noise, 0, 255).astype(np.uint8))
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=profile.jpeg_quality)
+    return buf.getvalue()
+
+
+def generate(count: int, seed: int = 7, profile: str = "scan") -> List[Tuple[str, bytes, dict]]:
+    """``count`` (file name, JPEG bytes, truth) triples; the same seed gives the same corpus"""
+    random.seed(seed)  # random_invoice draws from the module-level generator
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        inv, layout = sample_invoice(rng)
+        rows = invoice_rows(inv, layout)
+        truth = {**ground_truth(inv), "text": "\n".join("  ".join(cells) for cells in rows)}
+        corpus.append((f"invoice-{i:04d}.jpg", degrade(render_invoice(rows), PROFILES[profile], rng), truth))
+    return corpus
+
+
+def write_corpus(out: Path, corpus: List[Tuple[str, bytes, dict]]) -> None:
+    out.mkdir(parents=True, exist_ok=True)
+    for name, data, _ in corpus:
+        (out / name).write_bytes(data)
+    (out / "truth.json").write_text(json.dumps({name: truth for name, _, truth in corpus}, indent=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", required=True, help="directory for the images and truth.json")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="scan")
+    args = parser.parse_args()
+
+    corpus = generate(args.count, args.seed, args.profile)
+    write_corpus(Path(args.out), corpus)
+    print(f"wrote {len(corpus)} invoices and truth.json to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+End-to-end benchmark suite with a saved baseline.
+
+Stages, each timed per call (throughput, p50/p95/p99) and then re-run once
+under tracemalloc for peak Python memory:
+
+- ``ocr``: ``ocr_engine.extract_text`` on a rendered corpus (see
+  ``benchmarks.corpus``). Skipped when no OCR engine is installed.
+- ``fields``: ``extract.extract_invoice_fields`` per invoice text
+- ``extractor``: ``extractor.extract_invoice_data`` per invoice text
+- ``csv``: ``csv_export.rows_to_gstr1_b2b_csv`` per batch of ``--csv-rows`` rows
+- ``store_add`` / ``store_query`` / ``store_stats``: ``invoiceStore`` insert,
+  filtered page and dashboard stats (in-memory store only)
+
+Field accuracy is scored against the corpus ground truth: on the OCR text when
+the ``ocr`` stage ran, otherwise on the printed text (the parser alone). Text
+stages use the OCR output, or ``--texts`` printed texts without OCR.
+
+``--save`` writes the results as JSON. ``--compare`` diffs against a saved run
+and exits with status 1 when a stage's throughput or p50 worsens by more than
+``--tolerance`` or a field's accuracy drops. Everything runs offline.
+
+    python -m benchmarks.suite [--images 20] [--texts 2000] [--save results/baseline.json] [--compare results/baseline.json]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.csv_export import rows_to_gstr1_b2b_csv
+from app.extract import extract_invoice_fields
+from app.extractor import extract_invoice_data
+from app.gstr1_export import iter_b2b_rows
+from app import vendor_templates
+from app.scanner import scan_invoice_text
+from app.services import invoiceStore as store
+
+from . import corpus as corpus_mod
+from ._util import peak_rss_mb, percentile
+
+FIELDS = ("gstin", "invoice_no", "invoice_date", "taxable_value", "cgst", "sgst", "invoice_value")
+
+
+def clear_scan_caches() -> None:
+    # Both the scanner and the template dispatch in front of it cache recent
+    # texts; every timed call should do the work
+    scan_invoice_text.cache_clear()
+    vendor_templates._scan.cache_clear()
+
+
+def run_stage(name: str, fn: Callable, items: Sequence, memory: bool = True, per_item: int = 1) -> dict:
+    """Time ``fn`` on every item, then measure its peak Python allocation in a second pass"""
+    latencies = []
+    for item in items:
+        clear_scan_caches()
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        for item in items:
+            clear_scan_caches()
+            fn(item)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    row = {
+        "n": len(items) * per_item,
+        "per_sec": len(items) * per_item / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_mb": peak_mb,
+    }
+    peak = f"{peak_mb:.2f}MB" if peak_mb is not None else "-"
+    print(
+        f"{name:<12} n={row['n']:<7} {row['per_sec']:>12.1f}/s  p50={row['p50_ms']:.3f}ms  "
+        f"p95={row['p95_ms']:.3f}ms  p99={row['p99_ms']:.3f}ms  peak={peak}"
+    )
+    return row
+
+
+def scan_fields(text: str) -> dict:
+    scan = scan_invoice_text(text)
+    return {
+        "gstin": scan.gstin,
+        "invoice_no": scan.invoice_no,
+        "invoice_date": scan.invoice_date,
+        "taxable_value": scan.amounts["taxable_value"],
+        "cgst": scan.amounts["cgst"],
+        "sgst": scan.amounts["sgst"],
+        "invoice_value": scan.amounts["invoice_value"],
+    }
+
+
+def _same(expected, found) -> bool:
+    if isinstance(expected, (int, float)):
+        return found is not None and abs(float(found) - expected) < 0.01
+    return found is not None and str(found).upper() == str(expected).upper()
+
+
+def field_accuracy(texts: List[str], truths: List[dict]) -> Dict[str, float]:
+    correct = dict.fromkeys(FIELDS, 0)
+    for text, truth in zip(texts, truths):
+        found = scan_fields(text)
+        for field in FIELDS:
+            correct[field] += _same(truth[field], found[field])
+    accuracy = {field: correct[field] / len(texts) for field in FIELDS}
+    print("accuracy     " + "  ".join(f"{f}={v:.1%}" for f, v in accuracy.items()))
+    return accuracy
+
+
+def ocr_available() -> Optional[str]:
+    """None if the default OCR engine works here, else why not"""
+    from PIL import Image
+
+    from app.ocr_backends import get_engine
+
+    try:
+        get_engine().recognize_text(Image.new("L", (64, 32), 255))
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def printed_texts(count: int, seed: int) -> List[tuple]:
+    random.seed(seed)
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        inv, layout = corpus_mod.sample_invoice(rng)
+        rows = corpus_mod.invoice_rows(inv, layout)
+        out.append(("\n".join("  ".join(cells) for cells in rows), corpus_mod.ground_truth(inv), inv))
+    return out
+
+
+def run(args) -> dict:
+    results: Dict = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "images": args.images,
+            "texts": args.texts,
+            "profile": args.profile,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": {},
+        "accuracy": {},
+    }
+    stages = results["stages"]
+
+    samples = printed_texts(args.texts, args.seed)
+    texts = [text for text, _, _ in samples]
+    truths = [truth for _, truth, _ in samples]
+    results["accuracy_source"] = "printed"
+
+    skip = "disabled with --no-ocr" if args.no_ocr else ocr_available()
+    if skip:
+        print(f"ocr          skipped ({skip})")
+    else:
+        from app.ocr_engine import extract_text
+
+        images = corpus_mod.generate(args.images, args.seed, args.profile)
+        ocr_texts: List[str] = []
+        stages["ocr"] = run_stage(
+            "ocr", lambda item: ocr_texts.append(extract_text(io.BytesIO(item[1]))), images, memory=False
+        )
+        texts = ocr_texts
+        truths = [truth for _, _, truth in images]
+        results["accuracy_source"] = "ocr"
+
+    stages["fields"] = run_stage("fields", extract_invoice_fields, texts)
+    stages["extractor"] = run_stage("extractor", extract_invoice_data, texts)
+    results["accuracy"] = field_accuracy(texts, truths)
+
+    invoices = [inv for _, _, inv in samples]
+    rows = list(iter_b2b_rows(invoices))
+    batches = [rows[i:i + args.csv_rows] for i in range(0, len(rows), args.csv_rows)]
+    stages["csv"] = run_stage("csv", rows_to_gstr1_b2b_csv, batches, per_item=args.csv_rows)
+
+    if store.STORE_BACKEND != "memory":
+        print(f"store_*      skipped (INVOICE_STORE={store.STORE_BACKEND}; the suite only clears the in-memory store)")
+    else:
+        store.clear_all()
+        stages["store_add"] = run_stage("store_add", lambda inv: store.add_invoice(dict(inv)), invoices, memory=False)
+        gstins = [inv["sellerGSTIN"] for inv in invoices[:200]]
+        stages["store_query"] = run_stage("store_query", lambda g: store.query_invoices(limit=50, gstin=g), gstins)
+        stages["store_stats"] = run_stage("store_stats", lambda _: store.get_stats(), range(1000))
+        store.clear_all()
+
+    results["max_rss_mb"] = peak_rss_mb()
+    if results["max_rss_mb"] is not None:
+        print(f"max RSS {results['max_rss_mb']:.0f} MB")
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of ``current`` against ``baseline``, printed as a table"""
+    regressions = []
+    print(f"\n{'stage':<12} {'per_sec':>22} {'p50_ms':>24}")
+    for name, row in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            print(f"{name:<12} (not in baseline)")
+            continue
+        speed = row["per_sec"] / base["per_sec"] - 1 if base["per_sec"] else 0.0
+        p50 = row["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        flag = ""
+        if speed < -tolerance or p50 > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<12} {row['per_sec']:>12.1f} ({speed:+6.1%}) {row['p50_ms']:>12.3f} ({p50:+6.1%}){flag}")
+    if current.get("accuracy_source") == baseline.get("accuracy_source"):
+        for field, value in current["accuracy"].items():
+            before = baseline.get("accuracy", {}).get(field)
+            if before is not None and value < before - 1e-9:
+                print(f"accuracy {field}: {before:.1%} -> {value:.1%}  REGRESSION")
+                regressions.append(f"accuracy:{field}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20, help="rendered invoices for the OCR stage")
+    parser.add_argument("--texts", type=int, default=2000, help="invoice texts for the text stages without OCR")
+    parser.add_argument("--csv-rows", type=int, default=100, help="rows per CSV export call")
+    parser.add_argument("--profile", choices=sorted(corpus_mod.PROFILES), default="scan")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-ocr", action="store_true", help="skip the OCR stage even if an engine is installed")
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before flagging (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(results, indent=1))
+        print(f"saved {args.save}")
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Shared setup for the backend tests (run ``python -m pytest`` from the backend
+folder). Uploads, caches, the SQLite file and vendor templates go to a
+temporary directory, set before any app module reads its settings.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+_TMP = Path(tempfile.mkdtemp(prefix="byteslayers-tests-"))
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+os.environ.update({
+    "UPLOAD_DIR": str(_TMP / "uploads"),
+    "UPLOAD_COMPACT_INTERVAL": "0",
+    "OCR_CACHE_DIR": str(_TMP / "ocr-cache"),
+    "INVOICE_DB_PATH": str(_TMP / "invoices.db"),
+    "VENDOR_TEMPLATE_DIR": str(_TMP / "vendor_templates"),
+    "LOG_REQUESTS": "0",
+})
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
@@ -0,0 +1,63 @@
+import pytest
+
+from app.gstr1_export import iter_b2b_rows
+from app.services import invoiceStore
+from app.services.mockInvoiceAI import random_invoice
+
+GSTIN = "27AAPFU0939F1ZV"
+EXPORT = "/api/gstr1/b2b/export"
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    invoiceStore.clear_all()
+    yield
+    invoiceStore.clear_all()
+
+
+def test_export_filename_uses_the_validated_gstin(client):
+    response = client.get(EXPORT, params={"gstin": GSTIN.lower(), "period": "032026"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == f'attachment; filename="gstr1_b2b_{GSTIN}_032026.csv"'
+
+
+@pytest.mark.parametrize("gstin", ['a";filename=evil.exe', GSTIN + "\r\nX-Injected: 1", "€", GSTIN[:14] + "A"])
+def test_export_rejects_invalid_gstins(client, gstin):
+    response = client.get(EXPORT, params={"gstin": gstin, "period": "032026"})
+    assert response.status_code == 400
+    assert "content-disposition" not in response.headers
+
+
+@pytest.mark.parametrize("period", ["132026", "2026-3", "032026\n", "03/2026"])
+def test_export_rejects_invalid_periods(client, period):
+    assert client.get(EXPORT, params={"gstin": GSTIN, "period": period}).status_code == 400
+
+
+def test_ndjson_stream_export(client):
+    rows = [row.model_dump_json() for row in iter_b2b_rows([random_invoice() for _ in range(5)])]
+    response = client.post("/api/gstr1/b2b/stream", content="\n".join(rows).encode())
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 1 + len(rows)
+
+
+def test_ndjson_stream_rejects_an_overlong_line(client):
+    response = client.post("/api/gstr1/b2b/stream", content=b"x" * (64 * 1024 + 1))
+    assert response.status_code == 422
+    assert "longer than" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("params", [{"date_from": "garbage"}, {"date_to": "2026-02-31"}])
+def test_invoice_list_rejects_bad_dates(client, params):
+    assert client.get("/api/invoices", params=params).status_code == 400
+
+
+def test_invoice_list_etag(client):
+    invoiceStore.add_invoice({"invoiceNumber": "INV-1", "invoiceDate": "2026-03-01", "status": "processed"})
+    etag = client.get("/api/invoices").headers["etag"]
+    for header in (etag, f'"other", {etag}', etag[2:], "*"):
+        assert client.get("/api/invoices", headers={"If-None-Match": header}).status_code == 304
+    for header in (etag[:-2] + '"', '"other"'):
+        assert client.get("/api/invoices", headers={"If-None-Match": header}).status_code == 200
+    page = client.get("/api/invoices", params={"date_from": "2026-03-01", "date_to": "2026-03-31"}).json()
+    assert [inv["invoiceNumber"] for inv in page["invoices"]] == ["INV-1"]
+    assert page["stats"]["totalInvoices"] == 1
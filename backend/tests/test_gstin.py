@@ -0,0 +1,31 @@
+from app.gstin import check_gstin, gstin_check_char, suggest_corrections
+
+VALID = "27AAPFU0939F1ZV"
+
+
+def test_check_character_is_mod_36():
+    assert gstin_check_char(VALID[:14]) == "V"
+    assert check_gstin(VALID).valid
+    assert check_gstin(VALID).state == "Maharashtra"
+
+
+def test_wrong_check_character_is_reported():
+    check = check_gstin(VALID[:14] + "A")
+    assert not check.valid
+    assert check.errors == ("check character is 'A', expected 'V'",)
+
+
+def test_input_is_normalised():
+    assert check_gstin(" 27aapfu 0939f1zv ").gstin == VALID
+    assert check_gstin(" 27aapfu 0939f1zv ").valid
+
+
+def test_ocr_confusions_are_suggested():
+    # 0 read as O in the PAN's digits, and 1 read as I in the entity number
+    assert check_gstin("27AAPFUO939F1ZV").suggestions == (VALID,)
+    assert VALID in suggest_corrections("27AAPFU0939FIZV")
+
+
+def test_no_suggestions_without_a_confusable_fix():
+    assert suggest_corrections("27AAPFU0939F1ZA") == ()
+    assert suggest_corrections("27AAPFU0939F1Z") == ()
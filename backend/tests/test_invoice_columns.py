@@ -0,0 +1,66 @@
+import pytest
+
+from app.services.invoiceColumns import InvoiceColumns, _iso_date
+
+INVOICES = [
+    {"_id": "a", "invoiceDate": "2026-01-05", "taxableValue": 100.0, "totalTax": 18.0, "status": "processed",
+     "items": [{"hsn_code": "1006", "amount": 75.0}, {"hsn_code": "1514", "amount": 25.0}]},
+    {"_id": "b", "invoiceDate": "20/01/2026", "taxableValue": 200.0, "totalTax": 36.0, "status": "processed",
+     "items": [{"hsn_code": "1006", "amount": 200.0}]},
+    {"_id": "c", "invoiceDate": "2026-02-10", "taxableValue": 50.0, "totalTax": 9.0, "status": "review"},
+    {"_id": "d", "invoiceDate": "31/02/2026", "taxableValue": 10.0, "totalTax": 1.8, "status": "review"},
+]
+
+
+@pytest.fixture
+def columns():
+    table = InvoiceColumns()
+    table.extend(enumerate(INVOICES, start=1))
+    return table
+
+
+def test_iso_dates_and_impossible_dates():
+    assert _iso_date("2026-01-05") == "2026-01-05"
+    assert _iso_date("5/1/2026") == "2026-01-05"
+    assert _iso_date("31/02/2026") == "NaT"
+    assert _iso_date("2026-13-01") == "NaT"
+    assert _iso_date(None) == "NaT"
+
+
+def test_month_aggregates(columns):
+    groups = columns.aggregate(("month",), ("count", "taxableValue", "totalTax"))["groups"]
+    assert groups == [
+        {"month": None, "count": 1, "taxableValue": 10.0, "totalTax": 1.8},
+        {"month": "2026-01", "count": 2, "taxableValue": 300.0, "totalTax": 54.0},
+        {"month": "2026-02", "count": 1, "taxableValue": 50.0, "totalTax": 9.0},
+    ]
+
+
+def test_filters_and_sort(columns):
+    result = columns.aggregate(
+        ("status",), ("count", "taxableValue"), date_from="2026-01-01", date_to="2026-01-31", sort="taxableValue"
+    )
+    assert result["matched"] == 2
+    assert result["groups"] == [{"status": "processed", "count": 2, "taxableValue": 300.0}]
+
+
+def test_hsn_aggregates_split_invoices_by_item_share(columns):
+    result = columns.aggregate(("hsn",), ("count", "taxableValue", "totalTax"))
+    assert result["level"] == "item"
+    assert result["groups"] == [
+        {"hsn": "1006", "count": 2, "taxableValue": 275.0, "totalTax": 49.5},
+        {"hsn": "1514", "count": 1, "taxableValue": 25.0, "totalTax": 4.5},
+    ]
+
+
+def test_a_bad_value_leaves_the_tables_and_sync_position_alone(columns):
+    with pytest.raises(ValueError):
+        columns.extend([(5, {"_id": "e", "taxableValue": "abc"})])
+    assert (columns.last_seq, columns.last_id) == (4, "d")
+    assert columns.stats()["invoices"] == 4
+    assert columns.stats()["items"] == 3
+
+
+def test_unknown_group_key_is_rejected(columns):
+    with pytest.raises(ValueError):
+        columns.aggregate(("colour",))
@@ -0,0 +1,49 @@
+from app.services.invoiceFeed import InvoiceFeed
+
+
+def _ids(events):
+    return [seq for seq, _ in events]
+
+
+def test_resume_replays_only_missed_events():
+    feed = InvoiceFeed(replay=10)
+    for n in range(5):
+        feed.publish("invoice", {"n": n})
+    assert _ids(feed.since(2)) == [3, 4, 5]
+    assert feed.since(5) == []
+    message = feed.since(4)[0][1].decode()
+    assert message.startswith("id: 5\nevent: invoice\n")
+    assert '"n":4' in message
+
+
+def test_resume_past_the_ring_or_from_a_restart_needs_a_reset():
+    feed = InvoiceFeed(replay=3)
+    for n in range(5):
+        feed.publish("invoice", {"n": n})
+    assert _ids(feed.since(2)) == [3, 4, 5]
+    assert feed.since(1) is None  # event 2 has been dropped
+    assert feed.since(9) is None  # an id from before a restart
+
+
+def test_stats_go_out_as_changes_unless_full():
+    feed = InvoiceFeed()
+    feed.publish("invoice", {}, {"totalInvoices": 1, "totalTax": 18.0})
+    feed.publish("invoice", {}, {"totalInvoices": 2, "totalTax": 18.0})
+    feed.publish("reset", {}, {"totalInvoices": 0, "totalTax": 18.0}, full=True)
+    first, second, reset = (message.decode() for _, message in feed.since(0))
+    assert '"stats":{"totalInvoices":1,"totalTax":18.0}' in first
+    assert '"stats":{"totalInvoices":2}' in second
+    assert '"stats":{"totalInvoices":0,"totalTax":18.0}' in reset
+
+
+def test_clearing_the_store_publishes_a_full_reset():
+    from app.services import invoiceStore
+    from app.services.invoiceFeed import feed
+
+    invoiceStore.add_invoice({"invoiceNumber": "INV-1", "taxableValue": 100.0, "status": "processed"})
+    last = feed.last_id
+    invoiceStore.clear_all()
+    (seq, message), = feed.since(last)
+    assert seq == last + 1
+    assert message.decode().startswith(f"id: {seq}\nevent: reset\n")
+    assert '"totalInvoices":0' in message.decode()
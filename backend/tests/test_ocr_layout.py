@@ -0,0 +1,69 @@
+from app.ocr_backends import OcrResult
+from app.ocr_layout import field_confidence, line_items
+
+# Left edge of each column on the synthetic page
+COLUMNS = {"description": 50, "hsn": 400, "qty": 550, "rate": 650, "amount": 800}
+
+
+def _line(y, cells, conf=90.0):
+    """One OCR line: each (column, text) cell's words laid out from that column's left edge"""
+    words = []
+    for column, text in cells:
+        left = COLUMNS[column]
+        for word in text.split():
+            words.append((word, (left, y, left + 10 * len(word), y + 20), conf))
+            left += 10 * len(word) + 6
+    return 0, words
+
+
+def _page(*rows):
+    return OcrResult.from_lines(_line(100 + 40 * i, cells) for i, cells in enumerate(rows))
+
+
+HEADER = [("description", "Description"), ("hsn", "HSN"), ("qty", "Qty"), ("rate", "Rate"), ("amount", "Amount")]
+
+
+def test_rows_become_line_items():
+    result = _page(
+        [("description", "TAX INVOICE")],
+        HEADER,
+        [("description", "Rice Bags"), ("hsn", "1006"), ("qty", "10"), ("rate", "250.00"), ("amount", "2,500.00")],
+        [("description", "Cooking Oil"), ("hsn", "1514"), ("qty", "4"), ("rate", "180.00"), ("amount", "720.00")],
+        [("description", "Taxable Value"), ("amount", "3,220.00")],
+        [("description", "CGST 9%"), ("amount", "289.80")],
+    )
+    items = line_items(result)
+    assert [(i.description, i.hsn, i.quantity, i.rate, i.amount) for i in items] == [
+        ("Rice Bags", "1006", 10.0, 250.0, 2500.0),
+        ("Cooking Oil", "1514", 4.0, 180.0, 720.0),
+    ]
+    assert items[0].box == [50, 180, 880, 200]
+    assert items[0].page == 1
+
+
+def test_wrapped_description_joins_the_row_above():
+    result = _page(
+        HEADER,
+        [("description", "Basmati Rice"), ("hsn", "1006"), ("qty", "2"), ("rate", "90.00"), ("amount", "180.00")],
+        [("description", "(25 kg bag)")],
+        [("description", "Total"), ("amount", "180.00")],
+    )
+    (item,) = line_items(result)
+    assert item.description == "Basmati Rice (25 kg bag)"
+    assert item.box[3] == 200
+
+
+def test_no_table_no_items():
+    assert line_items(_page([("description", "Invoice No INV-1")], [("description", "Total"), ("amount", "10.00")])) == []
+    assert line_items(OcrResult("text layer only")) == []
+
+
+def test_field_confidence_is_the_lowest_word_behind_a_value():
+    result = OcrResult.from_lines([
+        (0, [("GSTIN", (0, 0, 50, 20), 95.0), ("27AAPFU0939F1ZV", (60, 0, 210, 20), 71.5)]),
+        (0, [("Total", (0, 40, 50, 60), 90.0), ("1,180.00", (60, 40, 140, 60), 88.0)]),
+    ])
+    assert field_confidence(result, {"gstin": "27AAPFU0939F1ZV", "invoice_value": 1180.0, "cgst": None}) == {
+        "gstin": 71.5,
+        "invoice_value": 88.0,
+    }